@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+File size and encode/decode throughput of the storage file, in JSON
+(as `FileStorage` writes and streams it) and in the binary format of
+`models/engine/binary_format.py`.
+
+Usage (from the repository root):
+    python3 -m benchmarks.binary_format [count]
+"""
+import io
+import json
+import sys
+import time
+from models.engine import binary_format
+from models.engine.json_stream import iter_items
+from models.place import Place
+from models.review import Review
+
+
+def records(count):
+    """Returns `count` Place and Review `(key, dictionary)` pairs"""
+    items = []
+    place = Place().to_dict()
+    for i in range(count):
+        if i % 2:
+            d = Review().to_dict()
+            d.update(place_id=place["id"], user_id=place["id"],
+                     text="Great stay, would come back")
+        else:
+            d = Place().to_dict()
+            d.update(city_id=place["id"], user_id=place["id"],
+                     name="Cottage", number_rooms=3, price_by_night=120,
+                     latitude=37.77, longitude=-122.41)
+        items.append(("{}.{}".format(d["__class__"], d["id"]), d))
+    return items
+
+
+def timed(func):
+    """Returns the seconds `func()` takes (best of 3)"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(count):
+    """Prints the size and throughput of both formats"""
+    items = records(count)
+
+    def json_dumps():
+        return "{" + ", ".join("{}: {}".format(json.dumps(key),
+                                               json.dumps(d))
+                               for key, d in items) + "}"
+
+    text = json_dumps()
+    data = binary_format.dumps(items)
+    rows = (
+        ("json", len(text.encode("utf-8")), timed(json_dumps),
+         timed(lambda: list(iter_items(io.StringIO(text))))),
+        ("binary", len(data), timed(lambda: binary_format.dumps(items)),
+         timed(lambda: list(binary_format.iter_items(io.BytesIO(data))))),
+    )
+    print("{} objects".format(count))
+    for name, size, encode, decode in rows:
+        print("{:>7}: {:8.1f} MB  encode {:8.0f} obj/s  decode {:8.0f} "
+              "obj/s".format(name, size / 1e6, count / encode,
+                             count / decode))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""
+Memory per instance of every model class, plain and compact
+(`HBNB_COMPACT=1`), for instances rebuilt from a dictionary as
+`reload()` does.
+
+Usage (from the repository root):
+    python3 -m benchmarks.compact_memory [count]
+"""
+import sys
+import tracemalloc
+from models.base_model import BaseModel, classes
+from models.compact import compact_class
+
+VALUES = {
+        "name": "Some name",
+        "email": "someone@example.com",
+        "city_id": "city-1",
+        "user_id": "user-1",
+        "state_id": "state-1",
+        "place_id": "place-1",
+        "description": "A quiet place",
+        "text": "Great stay",
+        "number_rooms": 2,
+        "max_guest": 4,
+        "price_by_night": 100,
+        "latitude": 1.5,
+        "longitude": 2.5
+        }
+
+
+def bytes_per_instance(cls, record, count):
+    """Returns the traced memory of `count` instances of `cls` built
+    from `record`, divided by `count`
+    """
+    tracemalloc.start()
+    instances = [cls(**record) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del instances
+    return size / count
+
+
+def main(count):
+    """Prints a table of bytes per instance for every class"""
+    print("{:>10} {:>12} {:>12}".format("class", "plain (B)", "compact (B)"))
+    for name, cls in classes.items():
+        if cls is BaseModel:
+            continue
+        record = cls().to_dict()
+        record.update({key: value for key, value in VALUES.items()
+                       if hasattr(cls, key)})
+        print("{:>10} {:>12.0f} {:>12.0f}".format(
+            name, bytes_per_instance(cls, record, count),
+            bytes_per_instance(compact_class(cls), record, count)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Peak RSS of `FileStorage.reload()` on a store of Reviews pointing to
+a few thousand Places (and Users), with and without the interning of
+the foreign keys.
+
+Usage (from the repository root):
+    python3 -m benchmarks.intern_memory [reviews [places]]
+
+Every measurement runs in a fresh process so the peak RSS
+(`ru_maxrss`) only covers that one reload.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import uuid
+
+
+def write_store(path, reviews, places):
+    """Writes a `file.json` with `reviews` Reviews spread over
+    `places` Places and as many Users
+    """
+    place_ids = [str(uuid.uuid4()) for _ in range(places)]
+    user_ids = [str(uuid.uuid4()) for _ in range(places)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(reviews):
+            obj_id = str(uuid.uuid4())
+            record = {
+                    "id": obj_id,
+                    "created_at": "2024-01-01T00:00:00.000000",
+                    "updated_at": "2024-01-01T00:00:00.000000",
+                    "place_id": place_ids[i % places],
+                    "user_id": user_ids[i * 7 % places],
+                    "text": "Great",
+                    "__class__": "Review"
+                    }
+            f.write("{}{}: {}".format(", " if i else "",
+                                      json.dumps("Review." + obj_id),
+                                      json.dumps(record)))
+        f.write("}")
+
+
+def child(mode, path):
+    """Reloads `path` in this process and prints the peak RSS (KiB)"""
+    from models.engine.file_storage import FileStorage
+
+    FileStorage._FileStorage__file_path = path
+    if mode == "plain":
+        FileStorage._intern = lambda self, instance: None
+    FileStorage().reload()
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main(reviews, places):
+    """Prints the peak RSS of both reloads"""
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json")
+        write_store(path, reviews, places)
+        print("{} Reviews, {} Places".format(reviews, places))
+        for mode in ("plain", "interned"):
+            out = subprocess.check_output(
+                    [sys.executable, "-m", "benchmarks.intern_memory",
+                     "--child", mode, path],
+                    cwd=tmp, env=dict(os.environ, PYTHONPATH=root))
+            peak = int(out.split()[-1]) / 1024
+            print("{:>9}: {:8.1f} MiB ({:.0f} bytes/review)".format(
+                mode, peak, peak * 1024 * 1024 / reviews))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+             int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Start-up time and memory of `FileStorage.reload()` in the eager and
+lazy modes, against the number of stored Places.
+
+Usage (from the repository root):
+    python3 -m benchmarks.lazy_startup [count ...]
+
+Every measurement runs in a fresh process. "lazy, scan" is the first
+lazy start, which scans the file and saves the positions of its
+records (`<file>.keys`); "lazy" is every later start. Then come the
+time of a first `get()` (one record decoded in lazy mode), of a first
+`lookup()` by foreign key (which builds the attribute indexes of the
+class in lazy mode), and the memory used after the reload and after
+the lookup: the RSS without its file-backed pages (the pages of the
+mapped file, read or not, which the kernel can drop at any time).
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.reload_memory import write_store
+
+COUNTS = (10000, 50000, 100000, 200000)
+MODES = ("eager", "lazy, scan", "lazy")
+
+
+def rss():
+    """Returns the current RSS of this process without its file-backed
+    pages, in KiB
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            _, resident, shared = f.read().split()[:3]
+        pages = int(resident) - int(shared)
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        # Not Linux: the peak RSS, file-backed pages included
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode, path):
+    """Reloads `path` in this process and prints the times (ms) of
+    the reload, a first `get()` and a first `lookup()`, and the RSS
+    (KiB) after the reload and after the lookup
+    """
+    from models.engine.file_storage import FileStorage
+
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__lazy = mode != "eager"
+    storage = FileStorage()
+    start = time.perf_counter()
+    storage.reload()
+    reloaded = time.perf_counter()
+    reloaded_rss = rss()
+    storage.get("Place", "00000007-0000-4000-8000-000000000000")
+    got = time.perf_counter()
+    storage.lookup("Place", "city_id", "city-7")
+    looked_up = time.perf_counter()
+    print((reloaded - start) * 1000, (got - reloaded) * 1000,
+          (looked_up - got) * 1000, reloaded_rss, rss())
+
+
+def main(counts):
+    """Prints a table of start-up time and RSS per object count and
+    mode
+    """
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json")
+        print("{:>8} {:>11} {:>12} {:>9} {:>12} {:>13} {:>13}".format(
+            "objects", "mode", "reload (ms)", "get (ms)", "lookup (ms)",
+            "memory (MiB)", "after lookup"))
+        for count in counts:
+            write_store(path, count)
+            for mode in MODES:
+                out = subprocess.check_output(
+                        [sys.executable, "-m", "benchmarks.lazy_startup",
+                         "--child", mode, path],
+                        cwd=tmp, env=dict(os.environ, PYTHONPATH=root))
+                values = [float(value) for value in out.split()[-5:]]
+                print("{:>8} {:>11} {:>12.1f} {:>9.2f} {:>12.1f} {:>13.1f} "
+                      "{:>13.1f}".format(count, mode, *values[:3],
+                                         values[3] / 1024, values[4] / 1024))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or COUNTS)
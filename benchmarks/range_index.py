@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Range queries and top-k on `Place.price_by_night`, with the sorted
+index of `FileStorage` (`HBNB_SORTED_INDEXES`) and with a scan.
+
+Usage (from the repository root):
+    python3 -m benchmarks.range_index [count]
+"""
+import heapq
+import random
+import sys
+import time
+from models.engine import query
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def timed(func, repeat=3):
+    """Returns the result of `func()` and the seconds it takes (best
+    of `repeat`)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def main(count):
+    """Prints the time of each query with the index and with a scan"""
+    FileStorage._FileStorage__sorted_attributes = {
+            "Place": ("price_by_night",)}
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__indexed = None
+    storage = FileStorage()
+    record = Place().to_dict()
+    rng = random.Random(0)
+    for i in range(count):
+        record["id"] = "place-{}".format(i)
+        record["price_by_night"] = rng.randrange(10000)
+        storage.new(Place(**record))
+    places = list(storage.by_class("Place").values())
+    print("{} Places".format(count))
+
+    _, build = timed(lambda: next(storage.ordered("Place",
+                                                  "price_by_night")),
+                     repeat=1)
+    print("{:>28}: {:9.3f} ms".format("first query (sorts)", build * 1e3))
+
+    condition = "price_by_night >= 100 and price_by_night <= 102"
+    rows = [
+        ("100 <= price <= 102",
+         lambda: list(query.where("Place", condition, storage=storage)),
+         lambda: [pl for pl in places if 100 <= pl.price_by_night <= 102]),
+        ("cheapest 20",
+         lambda: list(query.where("Place", order_by="price_by_night",
+                                  limit=20, storage=storage)),
+         lambda: heapq.nsmallest(20, places,
+                                 key=lambda pl: pl.price_by_night)),
+    ]
+    for name, indexed, scan in rows:
+        found, indexed_time = timed(indexed)
+        expected, scan_time = timed(scan)
+        assert len(found) == len(expected)
+        print("{:>28}: {:9.3f} ms indexed, {:9.3f} ms scan ({} rows)".format(
+            name, indexed_time * 1e3, scan_time * 1e3, len(found)))
+
+    start = time.perf_counter()
+    for pl in places[:1000]:
+        pl.price_by_night = rng.randrange(10000)
+    update = (time.perf_counter() - start) / 1000
+    print("{:>28}: {:9.3f} ms".format("update one price", update * 1e3))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
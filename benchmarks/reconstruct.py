@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""
+Time to rebuild one instance from its dictionary, with the
+previous `strptime()` parsing of the timestamps and with the
+current `fromisoformat()` path of `BaseModel.__init__`.
+
+Usage (from the repository root):
+    python3 -m benchmarks.reconstruct [count]
+"""
+import sys
+import timeit
+from datetime import datetime
+from models.base_model import BaseModel
+from models.place import Place
+
+
+def strptime_init(self, **kwargs):
+    """`BaseModel.__init__` for dictionaries, as it parsed timestamps
+    before the fast path
+    """
+    for key, value in kwargs.items():
+        if key != "__class__":
+            if key in ("created_at", "updated_at") and isinstance(value, str):
+                value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
+            object.__setattr__(self, key, value)
+
+
+class StrptimePlace(Place, register=False):
+    """A `Place` rebuilt with the previous timestamp parsing"""
+    __init__ = strptime_init
+
+
+def main(count):
+    """Prints the time per instance for both paths"""
+    record = Place().to_dict()
+    record.update(city_id="city", user_id="user", name="Cottage",
+                  price_by_night=100, latitude=1.5, longitude=2.5)
+    for name, cls in (("strptime", StrptimePlace), ("fromisoformat", Place)):
+        seconds = min(timeit.repeat(lambda: cls(**record),
+                                    number=count, repeat=5))
+        print("{:>14}: {:.2f} us/object".format(name, seconds / count * 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
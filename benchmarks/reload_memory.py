@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Peak RSS of `FileStorage.reload()` against the number of stored
+objects, for the previous `json.load` path and the streaming one.
+
+Usage (from the repository root):
+    python3 -m benchmarks.reload_memory [count ...]
+
+Every measurement runs in a fresh process so the peak RSS
+(`ru_maxrss`) only covers that one reload.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+COUNTS = (10000, 50000, 100000, 200000)
+
+
+def write_store(path, count):
+    """Writes a `file.json` with `count` Places"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i in range(count):
+            obj_id = "{:08d}-0000-4000-8000-000000000000".format(i)
+            record = {
+                    "id": obj_id,
+                    "created_at": "2024-01-01T00:00:00.000000",
+                    "updated_at": "2024-01-01T00:00:00.000000",
+                    "city_id": "city-{}".format(i % 1000),
+                    "user_id": "user-{}".format(i % 5000),
+                    "name": "Place number {}".format(i),
+                    "description": "A quiet place " * 8,
+                    "price_by_night": i % 500,
+                    "__class__": "Place"
+                    }
+            f.write("{}{}: {}".format(", " if i else "",
+                                      json.dumps("Place." + obj_id),
+                                      json.dumps(record)))
+        f.write("}")
+
+
+def child(mode, path):
+    """Reloads `path` in this process and prints the peak RSS (KiB)"""
+    from models.engine.file_storage import FileStorage
+    from models.place import Place
+
+    FileStorage._FileStorage__file_path = path
+    if mode == "json.load":
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        objects = {key: Place(**value) for key, value in records.items()}
+    else:
+        FileStorage().reload()
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main(counts):
+    """Prints a table of peak RSS per object count and path"""
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json")
+        print("{:>10} {:>16} {:>16}".format(
+            "objects", "json.load (MiB)", "streaming (MiB)"))
+        for count in counts:
+            write_store(path, count)
+            peaks = []
+            for mode in ("json.load", "streaming"):
+                out = subprocess.check_output(
+                        [sys.executable, "-m", "benchmarks.reload_memory",
+                         "--child", mode, path],
+                        cwd=tmp, env=dict(os.environ, PYTHONPATH=root))
+                peaks.append(int(out.split()[-1]) / 1024)
+            print("{:>10} {:>16.1f} {:>16.1f}".format(count, *peaks))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or COUNTS)
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Start-up time and peak RSS of a reader process that runs one `count`
+and one `show`, with `FileStorage.reload()` and with the memory-mapped
+snapshot of `models/engine/snapshot.py`.
+
+Usage (from the repository root):
+    python3 -m benchmarks.snapshot_reader [count ...]
+
+Every measurement runs in a fresh process so the peak RSS
+(`ru_maxrss`) only covers that one reader.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.reload_memory import write_store
+
+COUNTS = (10000, 100000, 200000)
+
+
+def child(mode, path):
+    """Starts a reader on `path`, runs `count Place` and `show Place
+    <id>`, and prints the start-up time (ms) and the peak RSS (KiB)
+    """
+    start = time.perf_counter()
+    if mode == "reload":
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__file_path = path
+        storage = FileStorage()
+    else:
+        from models.engine.snapshot import SnapshotStorage
+        SnapshotStorage._SnapshotStorage__path = path
+        storage = SnapshotStorage()
+    storage.reload()
+    startup = time.perf_counter() - start
+    len(storage.by_class("Place"))
+    storage.get("Place", "00000042-0000-4000-8000-000000000000")
+    print(startup * 1000,
+          resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main(counts):
+    """Prints a table of start-up time and peak RSS per object count"""
+    root = os.getcwd()
+    env = dict(os.environ, PYTHONPATH=root)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json")
+        snapshot_path = os.path.join(tmp, "store.snapshot")
+        print("{:>10} {:>13} {:>12} {:>15} {:>14}".format(
+            "objects", "reload (ms)", "reload (MiB)", "snapshot (ms)",
+            "snapshot (MiB)"))
+        for count in counts:
+            write_store(path, count)
+            subprocess.check_call(
+                    [sys.executable, "-m", "models.engine.snapshot", path,
+                     snapshot_path], cwd=tmp, env=env)
+            row = []
+            for mode, store in (("reload", path),
+                                ("snapshot", snapshot_path)):
+                out = subprocess.check_output(
+                        [sys.executable, "-m", "benchmarks.snapshot_reader",
+                         "--child", mode, store], cwd=tmp, env=env)
+                ms, rss = out.split()[-2:]
+                row += [float(ms), int(rss) / 1024]
+            print("{:>10} {:>13.1f} {:>12.1f} {:>15.1f} {:>14.1f}".format(
+                count, *row))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or COUNTS)
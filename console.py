@@ -6,7 +6,10 @@ import cmd
 import sys
 import shlex
 import re
-from models.base_model import BaseModel
+import ast
+import json
+from itertools import islice
+from models.base_model import BaseModel, classes
 from models.user import User
 from models.state import State
 from models.city import City
@@ -14,6 +17,7 @@ from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
 from models import storage
+from models.engine import geo, query, text_search
 
 
 class HBNBCommand(cmd.Cmd):
@@ -21,15 +25,12 @@ class HBNBCommand(cmd.Cmd):
     the interpreter
     """
     prompt = "(hbnb) "
-    all_classes = [
-            "BaseModel",
-            "User",
-            "State",
-            "City",
-            "Amenity",
-            "Place",
-            "Review"
-            ]
+    all_classes = list(classes)
+    # `all` writes its rows to stdout by chunks of this many rows
+    rows_per_write = 1000
+    # Type of the value of each option of `where(...)`, `near(...)`...
+    option_types = {"limit": int, "offset": int, "order_by": str,
+                    "fields": str, "format": str}
 
     def precmd(self, line):
         """Split the input into command and arguments
@@ -37,17 +38,29 @@ class HBNBCommand(cmd.Cmd):
         """
         if not sys.stdin.isatty():
             print()
+        storage.refresh()   # See the changes of other processes
         return line
 
+    def onecmd(self, line):
+        """Runs a command, reporting the writes that a read-only
+        storage (the snapshot engine) refuses instead of exiting
+        """
+        try:
+            return super().onecmd(line)
+        except PermissionError as error:
+            print("** {} **".format(error))
+
     def default(self, line):
         """Handles commands with the form
         `<class_name>.<method> (<arg1>, arg2>, ...)`
         """
-        command_parts = line.split(".")
+        command_parts = line.split(".", 1)
+        if len(command_parts) < 2:
+            print(f"*** Unknown syntax: {line}")
+            return
 
         # Map method names to corresponding methods
         method_mapping = {
-                "all()": self.do_all,
                 "count()": self.do_count
             }
 
@@ -58,6 +71,22 @@ class HBNBCommand(cmd.Cmd):
             if command_parts[1] in method_mapping:
                 method = method_mapping[command_parts[1]]
                 method(f"{command_parts[0]} {command_parts[1]}")
+            elif command_parts[1].startswith("all("):
+                # all(limit=100, after="<id>", ...) -> all <class> limit=100 ..
+                options = self._arguments(command_parts[1])
+                self.do_all(" ".join([command_parts[0]] + [
+                    "{}={}".format(name, value)
+                    for name, value in options.items()]))
+            elif command_parts[1].startswith("where("):
+                self._where(command_parts[0], command_parts[1])
+            elif command_parts[1].startswith(("near(", "within(")):
+                self._geo(command_parts[0], command_parts[1])
+            elif command_parts[1].startswith("search("):
+                self._search(command_parts[0], command_parts[1])
+            elif command_parts[1].startswith("count("):
+                # count(city_id="<id>", ...)
+                print(storage.count(command_parts[0],
+                                    **self._arguments(command_parts[1])))
             elif command_parts[1].startswith("show"):
                 # Extract the ID from the show command
                 instance_id = command_parts[1].split('"')[1]
@@ -67,6 +96,27 @@ class HBNBCommand(cmd.Cmd):
                 instance_id = command_parts[1].split('"')[1]
                 self.do_destroy(f"{command_parts[0]} {instance_id}")
             elif command_parts[1].startswith("update"):
+                if "{" in command_parts[1]:
+                    # Dictionary form: update("<id>", {"<name>": <value>})
+                    inst_id = command_parts[1].split('"')[1]
+                    start = command_parts[1].index("{")
+                    end = command_parts[1].rfind("}") + 1
+                    try:
+                        attributes = ast.literal_eval(
+                                command_parts[1][start:end])
+                    except (ValueError, SyntaxError):
+                        attributes = None
+                    if not isinstance(attributes, dict):
+                        print("** invalid dictionary **")
+                        return
+                    # One save for all the attributes
+                    with storage.batch():
+                        for att_name, att_value in attributes.items():
+                            self.do_update("{} {} {} {}".format(
+                                command_parts[0], inst_id,
+                                shlex.quote(str(att_name)),
+                                shlex.quote(str(att_value))))
+                    return
                 # Extract various parts of the update command
                 arguments = re.findall(r'\b(?:\w+-)*\w+\b|\d+',
                                        command_parts[1])
@@ -82,24 +132,28 @@ class HBNBCommand(cmd.Cmd):
                             f"{class_name} {inst_id} {att_name} {att_value}"
                     )
                 elif len(arguments) == 6:
-                    # Two extra arguments so we call do_update twice
+                    # Two extra arguments so we call do_update twice,
+                    # with a single save for both
                     att_name1 = arguments[4]
                     att_value1 = arguments[5]
-                    self.do_update(
+                    with storage.batch():
+                        self.do_update(
                             f"{class_name} {inst_id} {att_name} {att_value}"
-                    )
-                    self.do_update(
+                        )
+                        self.do_update(
                             f"{class_name} {inst_id} {att_name1} {att_value1}"
-                    )
+                        )
 
     def do_quit(self, arg):
         """Quit command to exit the program
         """
+        storage.flush()     # Write the saves still pending
         return True
 
     def do_EOF(self, arg):
         """(Ctrl + D) to force the program to exit
         """
+        storage.flush()     # Write the saves still pending
         return True
 
     def do_create(self, arg):
@@ -110,8 +164,8 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
             return
 
-        if arg in HBNBCommand.all_classes and isinstance(globals()[arg], type):
-            my_instance = globals()[arg]()  # Equivalent to my_instance = arg()
+        if arg in classes:
+            my_instance = classes[arg]()  # Equivalent to my_instance = arg()
             my_instance.save()
             print(my_instance.id)
         else:
@@ -132,35 +186,67 @@ class HBNBCommand(cmd.Cmd):
             class_name = args[0]
             instance_id = args[1]
 
-            if (
-                class_name in globals()
-                and isinstance(globals()[class_name], type)
-            ):
-                all_objs = storage.all()
-                instance_found = False
-
-                for obj_id, obj in all_objs.items():
-                    if (
-                        obj.id == instance_id
-                        and isinstance(obj, globals()[class_name])
-                    ):
-                        print(str(obj))
-                        instance_found = True
-                        break
-
-                if not instance_found:
+            if class_name in classes:
+                # One key lookup; every class (and shard) is only
+                # searched for an instance of a subclass
+                obj = storage.get(class_name, instance_id)
+                if obj is None:
+                    obj = next((other for other in
+                                storage.by_id(instance_id).values()
+                                if isinstance(other, classes[class_name])),
+                               None)
+
+                if obj is not None:
+                    print(str(obj))
+                else:
                     print("** no instance found **")
 
             else:
                 print("** class doesn't exist **")
 
     def do_count(self, line):
-        """Returns the number of instances of a class
-        Usage: <class_name>.count()
+        """Returns the number of instances of a class, optionally of
+        those whose attributes have the given values
+        Usage: <class_name>.count() or <class_name>.count(city_id="<id>")
+        or count <class_name> [<attribute>=<value> ...]
         """
-        numb_instances = len([value for key, value in storage.all().items()
-                              if key.startswith(line[0])])
-        print(numb_instances)
+        args = shlex.split(line) if line else []
+        if not args:
+            print("** class name missing **")
+            return
+        class_name = args[0]
+        if class_name not in classes:
+            print("** class doesn't exist **")
+            return
+        filters = {}
+        for arg in args[1:]:
+            if "=" in arg:
+                name, value = arg.split("=", 1)
+                filters[name] = self._literal(value)
+        # Constant time without filters (live per-class counts)
+        print(storage.count(class_name, **filters))
+
+    def _arguments(self, call):
+        """Returns the `name=value` arguments of a call such as
+        `all(limit=100, after="<id>")` as a dictionary. Quoted values
+        are strings, other values are read as Python literals if they
+        are ones
+        """
+        arguments = {}
+        for name, double, single, bare in re.findall(
+                r'(\w+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^,\s)]+))', call):
+            arguments[name] = self._literal(bare) if bare else double + single
+        return arguments
+
+    @staticmethod
+    def _literal(value):
+        """Returns the Python literal written in `value` (a number,
+        True, ...), or `value` itself if it is not one
+        """
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
 
     def do_destroy(self, line):
         """Deletes an instance based on the class name and id
@@ -172,7 +258,7 @@ class HBNBCommand(cmd.Cmd):
             return
 
         class_name = args[0]
-        if class_name not in globals():
+        if class_name not in classes:
             print("** class doesn't exist **")
             return
 
@@ -181,37 +267,184 @@ class HBNBCommand(cmd.Cmd):
             return
 
         obj_id = args[1]
-        all_objs = storage.all()
+        obj = storage.get(class_name, obj_id)
 
-        key = f"{class_name}.{obj_id}"
-        if key in all_objs:
-            del all_objs[key]   # Delete the instance from storage
+        if obj is not None:
+            storage.delete(obj)     # Delete the instance from storage
             storage.save()      # Save the changes to the storage
         else:
             print("** no instance found **")
 
     def do_all(self, line):
         """Prints all string representation of all
-        instances based or not on the class name.
+        instances based or not on the class name. Rows are streamed:
+        `limit=<n>` and `offset=<n>` select a page, `after=<id>`
+        resumes after that instance, `format=json` prints JSON lines.
+        Ex: $ all Place limit=100 after=1234-1234-1234
         """
-        args = line.split()
-        list = []
+        class_name = None
+        options = {}
+        for arg in line.split():
+            if "=" in arg:
+                name, value = arg.split("=", 1)
+                options[name] = value
+            else:
+                class_name = arg
+        if class_name is not None and class_name not in self.all_classes:
+            print("** class doesn't exist **")
+            return
+        unknown = set(options) - {"limit", "offset", "after", "format"}
+        if unknown:
+            print("** unknown option: {} **".format(sorted(unknown)[0]))
+            return
+        try:
+            limit = int(options["limit"]) if "limit" in options else None
+            offset = int(options.get("offset", 0))
+            if offset < 0 or limit is not None and limit < 0:
+                raise ValueError("Negative limit or offset")
+        except ValueError:
+            print("** limit and offset must be non-negative integers **")
+            return
+        if options.get("format", "json") != "json":
+            print("** unknown format: {} **".format(options["format"]))
+            return
 
-        if not args:
-            all_objs = storage.all().values()
-        else:
-            class_name = args[0]
-            if class_name not in self.all_classes:
-                print("** class doesn't exist **")
+        after = options.get("after")
+        if after is not None:
+            # The cursor is the key of the last instance shown
+            if class_name is not None:
+                obj = storage.get(class_name, after)
+                after = None if obj is None else class_name + "." + after
+            else:
+                after = next(iter(storage.by_id(after)), None)
+            if after is None:
+                print("** no instance found **")
                 return
-            all_objs = [obj for obj in storage.all().values()
-                        if obj.__class__.__name__ == class_name]
 
-        objs_formatted = [f"[{str(obj)} {obj.to_dict()}]"
-                          for obj in all_objs]
+        rows = islice(storage.stream(class_name, after), offset,
+                      None if limit is None else offset + limit)
+        if options.get("format") == "json":
+            lines = (json.dumps(obj.to_dict()) for _, obj in rows)
+        else:
+            lines = (f"[{str(obj)} {obj.to_dict()}]" for _, obj in rows)
+        self._write_rows(lines)
+
+    def _where(self, class_name, call):
+        """Prints the instances matching a query, written as
+        `where("<condition>", order_by="-<attribute>,...",
+        fields="<attribute>,...", limit=<n>, format="json")`, e.g.
+        Place.where("price_by_night < 100 and max_guest >= 4")
+        (see `models/engine/query.py`)
+        """
+        try:
+            args, options = self._call(call, {"order_by", "fields",
+                                              "limit", "format"})
+            if len(args) > 1:
+                raise ValueError("Unexpected arguments")
+            rows = query.where(class_name, args[0] if args else "",
+                               order_by=options.get("order_by"),
+                               fields=options.get("fields"),
+                               limit=options.get("limit"))
+        except (SyntaxError, ValueError, AttributeError) as error:
+            print("** invalid query: {} **".format(error))
+            return
+        as_json = options.get("format") == "json"
+        if options.get("fields"):
+            lines = (json.dumps(row) if as_json else str(row)
+                     for row in rows)
+        else:
+            lines = (json.dumps(obj.to_dict()) if as_json else str(obj)
+                     for obj in rows)
+        self._write_rows(lines)
 
-        for obj in objs_formatted:
-            print(obj)
+    def _geo(self, class_name, call):
+        """Prints the instances near a location or in a bounding box,
+        written as `near(<latitude>, <longitude>, <km>, limit=<n>,
+        format="json")` (nearest first, with their distance) or
+        `within(<south>, <west>, <north>, <east>, limit=<n>,
+        format="json")`, e.g. Place.near(48.8566, 2.3522, 5)
+        (see `models/engine/geo.py`)
+        """
+        try:
+            args, options = self._call(call, {"limit", "format"})
+            if call.startswith("near("):
+                if len(args) != 3:
+                    raise ValueError("Expected latitude, longitude, km")
+                rows = geo.near(class_name, *args,
+                                limit=options.get("limit"))
+            else:
+                if len(args) != 4:
+                    raise ValueError("Expected south, west, north, east")
+                rows = ((obj, None) for obj in geo.within(
+                    class_name, *args, limit=options.get("limit")))
+        except (SyntaxError, ValueError, AttributeError) as error:
+            print("** invalid query: {} **".format(error))
+            return
+        if options.get("format") == "json":
+            lines = (json.dumps(dict(obj.to_dict(), distance_km=km)
+                                if km is not None else obj.to_dict())
+                     for obj, km in rows)
+        else:
+            lines = ("{:.3f} km {}".format(km, obj) if km is not None
+                     else str(obj) for obj, km in rows)
+        self._write_rows(lines)
+
+    def _search(self, class_name, call):
+        """Prints the instances whose text matches words, best first
+        with their score, written as `search("<words>", limit=<n>,
+        format="json")`, e.g. Review.search("quiet clean", limit=10)
+        (see `models/engine/text_search.py`)
+        """
+        try:
+            args, options = self._call(call, {"limit", "format"})
+            if len(args) != 1 or not isinstance(args[0], str):
+                raise ValueError("Expected the words to search")
+            rows = text_search.search(class_name, args[0],
+                                      limit=options.get("limit"))
+        except (SyntaxError, ValueError, AttributeError) as error:
+            print("** invalid query: {} **".format(error))
+            return
+        if options.get("format") == "json":
+            lines = (json.dumps(dict(obj.to_dict(), score=score))
+                     for obj, score in rows)
+        else:
+            lines = ("{:.3f} {}".format(score, obj) for obj, score in rows)
+        self._write_rows(lines)
+
+    @staticmethod
+    def _call(call, names):
+        """Returns the positional arguments and the `{name: value}`
+        options of a call such as `where("...", limit=10)`, all
+        literals. Raises ValueError for an option not in `names`, or
+        whose value is not of its type in `option_types`
+        """
+        tree = ast.parse(call, mode="eval").body
+        args = [ast.literal_eval(arg) for arg in tree.args]
+        options = {keyword.arg: ast.literal_eval(keyword.value)
+                   for keyword in tree.keywords}
+        if set(options) - names:
+            raise ValueError("Unexpected arguments")
+        for name, value in options.items():
+            expected = HBNBCommand.option_types.get(name, object)
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError("{} must be {}".format(
+                    name, "an integer" if expected is int else "a string"))
+        return args, options
+
+    def _write_rows(self, lines):
+        """Writes the lines to stdout as they come, by chunks of
+        `rows_per_write` lines (one write per chunk rather than per
+        line)
+        """
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) == self.rows_per_write:
+                sys.stdout.write("\n".join(chunk) + "\n")
+                chunk = []
+        if chunk:
+            sys.stdout.write("\n".join(chunk) + "\n")
+        sys.stdout.flush()
 
     def do_update(self, arg):
         """
@@ -223,36 +456,35 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
         else:
             class_name = args[0]
-            if (class_name in globals() and
-                    isinstance(globals()[class_name], type)):
+            if class_name in classes:
                 if len(args) < 2:
                     print("** instance id missing **")
                 else:
                     instance_id = args[1]
-                    all_objs = storage.all()
-                    instance_found = False
-                    for obj_id, obj in all_objs.items():
-                        if obj.id == instance_id:
-                            if len(args) < 3:
-                                print("** attribute name missing **")
-                            else:
-                                if len(args) < 4:
-                                    print("** value missing **")
-                                else:
-                                    attr_name = args[2]
-                                    attr_value = args[3]
-                                    if (attr_name not in
-                                            ('id',
-                                             'created_at',
-                                             'updated_at')):
-                                        if (isinstance(attr_value,
-                                                       (str, int, float))):
-                                            setattr(obj, attr_name, attr_value)
-                                            obj.save()
-                            instance_found = True
-                            break
-                    if not instance_found:
+                    # Else any instance with this id, whatever its class
+                    obj = storage.get(class_name, instance_id)
+                    if obj is None:
+                        obj = next(iter(storage.by_id(instance_id).values()),
+                                   None)
+                    if obj is None:
                         print("** no instance found **")
+                    elif len(args) < 3:
+                        print("** attribute name missing **")
+                    elif len(args) < 4:
+                        print("** value missing **")
+                    else:
+                        attr_name = args[2]
+                        attr_value = args[3]
+                        attr = getattr(type(obj), attr_name, None)
+                        if isinstance(attr, property) or callable(attr):
+                            # E.g. `Place.reviews`, or a method
+                            print("** {} can't be updated **".format(
+                                attr_name))
+                        elif (attr_name not in
+                                ('id', 'created_at', 'updated_at')):
+                            if isinstance(attr_value, (str, int, float)):
+                                setattr(obj, attr_name, attr_value)
+                                obj.save()
             else:
                 print("** class doesn't exist **")
 
@@ -265,4 +497,9 @@ class HBNBCommand(cmd.Cmd):
 
 
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    if sys.stdin.isatty():
+        HBNBCommand().cmdloop()
+    else:
+        # Non-interactive (piped script): save once, at EOF
+        with storage.batch():
+            HBNBCommand().cmdloop()
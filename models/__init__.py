@@ -1,10 +1,25 @@
 #!/usr/bin/python3
 """
 This module always runs at the start of the
-program, and loads the stored instances to memory
+program, and loads the stored instances to memory.
+Set `HBNB_TYPE_STORAGE=db` to use the SQLite storage
+engine instead of the JSON file, `HBNB_TYPE_STORAGE=snapshot`
+to read a memory-mapped snapshot (read-only), and `HBNB_COMPACT=1` to
+store instances in their compact (`__slots__`) variant
 """
-from models.engine import file_storage
+import os
 
 
-storage = file_storage.FileStorage()
+if os.getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine import db_storage
+    storage = db_storage.DBStorage()
+elif os.getenv("HBNB_TYPE_STORAGE") == "snapshot":
+    from models.engine import snapshot
+    storage = snapshot.SnapshotStorage()
+else:
+    from models.engine import file_storage
+    storage = file_storage.FileStorage()
+if os.getenv("HBNB_COMPACT") == "1":
+    from models import compact
+    compact.install()
 storage.reload()
@@ -9,65 +9,131 @@ import models
 from datetime import datetime
 from datetime import timedelta
 
+# Registry of the model classes by name, filled as they are defined
+classes = {}
+
 
 class BaseModel:
     """This class defines all common attributes/methods
     for other classes
     """
+    # `_repr_cache` memoizes `to_dict()` and `__str__()` (see
+    # `_repr()`) outside of `__dict__`, which holds the attributes only
+    __slots__ = ("_repr_cache", "__dict__", "__weakref__")
+
+    def __init_subclass__(cls, register=True, **kwargs):
+        """Adds every subclass to `classes` so that storage and the
+        console resolve class names with one dictionary lookup
+        """
+        super().__init_subclass__(**kwargs)
+        if register:
+            classes[cls.__name__] = cls
+
     def __init__(self, *args, **kwargs):
         """Converts `datetime` attributes to string representation
         for existing instances, or instantiates a new instance of
         the class
         """
-        str_format = "%Y-%m-%dT%H:%M:%S.%f"
         if kwargs:
             # Not a new instance (from a dictionary representation)
             for key, value in kwargs.items():
                 if key != "__class__":
                     if (
-                        key == "created_at" or
-                        key == "updated_at" and
+                        (key == "created_at" or key == "updated_at") and
                         isinstance(value, str)
                     ):
-                        value = datetime.strptime(value, str_format)
-                    setattr(self, key, value)
+                        # Reverses `isoformat()` (with or without
+                        # microseconds) much faster than `strptime()`
+                        value = datetime.fromisoformat(value)
+                    # Bypass `__setattr__`: not tracked by storage yet
+                    try:
+                        super().__setattr__(key, value)
+                    except AttributeError:
+                        # Hidden by a read-only property of the class
+                        # (e.g. `Place.reviews`), from a file written
+                        # before it existed: kept, and saved back
+                        self.__dict__[key] = value
         else:
             #  A new instance (not from a dictionary representation)
-            self.id = str(uuid.uuid4())
-            self.created_at = datetime.today()
-            self.updated_at = datetime.today()
+            super().__setattr__("id", str(uuid.uuid4()))
+            super().__setattr__("created_at", datetime.today())
+            super().__setattr__("updated_at", datetime.today())
 
             # In addition to the above attributes, load the previous attributes
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """Sets the attribute and marks the instance as dirty so
+        that storage only re-serializes the instances that changed.
+        Note: in-place changes (e.g. `place.amenity_ids.append()`)
+        are not seen here; `save()` the instance afterwards
+        """
+        super().__setattr__(name, value)
+        object.__setattr__(self, "_repr_cache", None)
+        models.storage.mark_dirty(self, name)
+
     def __str__(self):
         """Returns a meaningful string representation of the istance
         """
-        return "[{}] ({}) {}".format(
-                self.__class__.__name__,
-                self.id,
-                self.__dict__)
+        cache = self._repr()
+        if cache[1] is None:
+            cache[1] = "[{}] ({}) {}".format(
+                    self.__class__.__name__,
+                    self.id,
+                    self._attributes())
+        return cache[1]
+
+    def _repr(self):
+        """Returns the `[to_dict(), __str__()]` results memoized since
+        the last change of an attribute (None until computed). The
+        list is attached before they are computed, so a change made
+        meanwhile (e.g. while storage writes from another thread)
+        detaches it instead of being overwritten by stale results.
+        Note: in-place changes are not seen, as for `__setattr__`
+        """
+        try:
+            cache = self._repr_cache
+        except AttributeError:
+            cache = None
+        if cache is None:
+            cache = [None, None]
+            object.__setattr__(self, "_repr_cache", cache)
+        return cache
+
+    def _attributes(self):
+        """Returns the attributes of the instance (its `__dict__`)
+        """
+        return self.__dict__
 
     def save(self):
         """Changes the `updated_at` time and then saves
         the instance to `storage` _from the `FileStorage` module
         """
-        self.updated_at = datetime.today()
+        self.updated_at = datetime.today()     # Marks the instance dirty
         models.storage.save()   # Responsible for persisting the data
 
     def to_dict(self):
         """Converts an instance to a dictionary containing all
         keys/values _from `__dict__` of the instance, and adds
-        a keys/value pair labelling the instance with the class name
+        a keys/value pair labelling the instance with the class name.
+        The dictionary is memoized until an attribute changes; each
+        call returns a (shallow) copy of it
         """
-        updated_dict = {}
+        cache = self._repr()
+        if cache[0] is None:
+            updated_dict = {}
+
+            # A copy: storage may serialize from a background thread
+            for key, value in self._attributes().copy().items():
+                if isinstance(value, datetime):
+                    updated_dict[key] = value.isoformat()
+                else:
+                    updated_dict[key] = value
+
+            updated_dict['__class__'] = self.__class__.__name__
+            cache[0] = updated_dict
 
-        for key, value in self.__dict__.items():
-            if isinstance(value, datetime):
-                updated_dict[key] = value.isoformat()
-            else:
-                updated_dict[key] = value
+        return dict(cache[0])
 
-        updated_dict['__class__'] = self.__class__.__name__
 
-        return updated_dict
+classes["BaseModel"] = BaseModel
@@ -3,6 +3,7 @@
 This module provides the class `City` which inherits
 from the class `BaseModel`
 """
+import models
 from models.base_model import BaseModel
 
 
@@ -12,3 +13,11 @@ class City(BaseModel):
     """
     name = ""
     state_id = ""
+
+    @property
+    def places(self):
+        """Returns the list of the places of the city, from the
+        `city_id` index of the storage
+        """
+        return list(models.storage.lookup("Place", "city_id",
+                                          self.id).values())
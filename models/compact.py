@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""
+This module provides compact (`__slots__`-based) variants of the
+model classes, used when `HBNB_COMPACT=1`. A compact instance keeps
+`id`, `created_at`, `updated_at` and the attributes declared by its
+class in slots; attributes added with `update` go to a small
+overflow dictionary, created only when needed
+"""
+import sys
+import models
+from models.base_model import BaseModel, classes
+
+
+class _Compact:
+    """Behaviour shared by the compact classes. They derive from the
+    model class they replace, so `isinstance()` checks still hold
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        """Keeps the attributes without a slot out of `__dict__`
+        """
+        extra = {key: value for key, value in kwargs.items()
+                 if key not in self._fields and key != "__class__"}
+        for key in extra:
+            del kwargs[key]
+        super().__init__(*args, **kwargs)
+        if extra:
+            object.__setattr__(self, "_extra", extra)
+
+    def __getattr__(self, name):
+        """Called for unset slots and overflow attributes
+        """
+        if name in self._fields:
+            # Unset slot: the class default, as for a plain instance
+            return getattr(self._model, name)
+        if name != "_extra":
+            try:
+                return self._extra[name]
+            except (AttributeError, KeyError):
+                pass
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            self.__class__.__name__, name))
+
+    def __setattr__(self, name, value):
+        """Stores attributes without a slot in the overflow dictionary
+        """
+        if name in self._fields:
+            super().__setattr__(name, value)
+            return
+        try:
+            extra = object.__getattribute__(self, "_extra")
+        except AttributeError:
+            extra = {}
+            object.__setattr__(self, "_extra", extra)
+        extra[name] = value
+        object.__setattr__(self, "_repr_cache", None)
+        models.storage.mark_dirty(self, name)
+
+    def _attributes(self):
+        """Returns the set slots followed by the overflow attributes
+        """
+        attributes = {}
+        for name in self._fields:
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        try:
+            attributes.update(object.__getattribute__(self, "_extra"))
+        except AttributeError:
+            pass
+        return attributes
+
+
+def compact_class(cls):
+    """Returns the compact variant of the model class `cls`. It has
+    the same name, so instances are stored under the same keys
+    """
+    fields = ["id", "created_at", "updated_at"]
+    for base in reversed(cls.__mro__):
+        for name, value in vars(base).items():
+            if (
+                not name.startswith("_") and name not in fields and
+                not callable(value) and
+                not isinstance(value, (property, staticmethod, classmethod))
+            ):
+                fields.append(name)
+    return type(cls.__name__, (_Compact, cls), {
+        "__slots__": tuple(fields) + ("_extra",),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__doc__": cls.__doc__,
+        # Ordered like the attributes of a plain instance
+        "_fields": dict.fromkeys(fields),
+        "_model": cls
+        }, register=False)
+
+
+def install():
+    """Replaces the registered model classes by their compact
+    variants, so that the console and the storage engines create
+    compact instances. `BaseModel` itself is kept, being only
+    used for ad-hoc attributes.
+    From Python 3.11 plain instances keep their attributes inline,
+    without a dictionary of their own, and are already smaller than
+    the compact variants (see `benchmarks/compact_memory.py`), so
+    nothing is replaced there
+    """
+    if sys.version_info >= (3, 11):
+        return
+    for name, cls in list(classes.items()):
+        if cls is not BaseModel and not issubclass(cls, _Compact):
+            classes[name] = compact_class(cls)
@@ -0,0 +1,366 @@
+#!/usr/bin/python3
+"""
+This module provides a compact binary format for the storage file,
+and a converter from/to JSON:
+    python3 -m models.engine.binary_format to-binary file.json file.bin
+    python3 -m models.engine.binary_format to-json file.bin file.json
+
+A file starts with `MAGIC` and the table of the attribute names (and
+class names), then holds one record per instance. Names are written
+once and referenced by their position in the table, UUID strings are
+packed into 16 bytes, timestamps are stored as integer microseconds
+and integers as variable-length integers
+"""
+import json
+import struct
+import sys
+from datetime import datetime, timedelta
+
+MAGIC = b"HBNB\x00\x01"
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+TIMESTAMPS = ("created_at", "updated_at")
+
+# Value tags
+(NONE, FALSE, TRUE, INT, FLOAT, STR, UUID, DATETIME, LIST, DICT,
+ NAME) = range(11)
+# Record flags: how the key is stored
+KEY_EXPLICIT, KEY_FROM_CLASS_AND_ID = range(2)
+
+_double = struct.Struct("<d")
+# Tags followed by a variable-length integer, read inline by
+# `Decoder.record()`
+_varint = frozenset((STR, NAME, INT, DATETIME))
+
+
+class Encoder:
+    """Encodes records, collecting the names they use in a table that
+    is written in front of them by `header()`. Names keep their
+    position, so encoded records can be cached and reused
+    """
+    def __init__(self, names=()):
+        """Starts with the name table `names` (e.g. the one of a file,
+        so that its records can be copied as they are), empty by
+        default
+        """
+        self.names = []
+        self.__positions = {}
+        for name in names:
+            self.position(name)
+
+    def header(self):
+        """Returns the start of the file: `MAGIC` and the name table"""
+        out = bytearray(MAGIC)
+        _write_uint(out, len(self.names))
+        for name in self.names:
+            _write_str(out, name)
+        return bytes(out)
+
+    def record(self, key, record):
+        """Returns the encoded record for the dictionary `record`
+        (as returned by `to_dict()`) stored under `key`
+        """
+        out = bytearray()
+        if (
+            key == "{}.{}".format(record.get("__class__"), record.get("id"))
+        ):
+            _write_uint(out, KEY_FROM_CLASS_AND_ID)
+        else:
+            _write_uint(out, KEY_EXPLICIT)
+            self.value(out, key)
+        _write_uint(out, len(record))
+        for name, value in record.items():
+            _write_uint(out, self.position(name))
+            if name in TIMESTAMPS and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            elif name == "__class__" and isinstance(value, str):
+                out.append(NAME)
+                _write_uint(out, self.position(value))
+                continue
+            self.value(out, value)
+        return bytes(out)
+
+    def position(self, name):
+        """Returns the position of `name` in the table, adding it"""
+        position = self.__positions.get(name)
+        if position is None:
+            position = self.__positions[name] = len(self.names)
+            self.names.append(name)
+        return position
+
+    def value(self, out, value):
+        """Appends the encoded `value` to the bytearray `out`"""
+        if value is None:
+            out.append(NONE)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            out.append(INT)
+            _write_uint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out += _double.pack(value)
+        elif isinstance(value, str):
+            packed = _pack_uuid(value)
+            if packed is not None:
+                out.append(UUID)
+                out += packed
+            else:
+                out.append(STR)
+                _write_str(out, value)
+        elif isinstance(value, datetime):
+            out.append(DATETIME)
+            micros = (value - EPOCH) // MICROSECOND
+            _write_uint(out, micros * 2 if micros >= 0 else -micros * 2 - 1)
+        elif isinstance(value, (list, tuple)):
+            out.append(LIST)
+            _write_uint(out, len(value))
+            for item in value:
+                self.value(out, item)
+        elif isinstance(value, dict):
+            out.append(DICT)
+            _write_uint(out, len(value))
+            for name, item in value.items():
+                _write_str(out, str(name))
+                self.value(out, item)
+        else:
+            raise TypeError("Cannot encode {!r}".format(value))
+
+
+def is_binary(start):
+    """Checks if the bytes `start` of a file begin with `MAGIC`"""
+    return start[:len(MAGIC)] == MAGIC
+
+
+def dumps(items):
+    """Returns the binary file for the `(key, dictionary)` pairs"""
+    encoder = Encoder()
+    body = b"".join([encoder.record(key, record) for key, record in items])
+    return encoder.header() + body
+
+
+def iter_items(f):
+    """Yields the `(key, dictionary)` pairs of the binary file `f`
+    (opened in binary mode). Timestamps are returned as `datetime`
+    objects, which `BaseModel` takes as they are
+    """
+    data = f.read()
+    if not is_binary(data):
+        raise ValueError("Not a binary storage file")
+    decoder = Decoder(data, len(MAGIC))
+    names = [decoder.str() for _ in range(decoder.uint())]
+    while decoder.pos < len(data):
+        yield decoder.record(names)
+
+
+class Decoder:
+    """Reads values from `data` (bytes, or any buffer such as an
+    `mmap`), starting at `pos`
+    """
+    def __init__(self, data, pos):
+        """Starts decoding `data` at `pos`"""
+        self.data = data
+        self.pos = pos
+
+    def record(self, names):
+        """Reads a record written by `Encoder.record()` with the name
+        table `names`, and returns its `(key, dictionary)` pair
+        """
+        explicit_key = self.uint() == KEY_EXPLICIT
+        key = self.value(names) if explicit_key else None
+        record = {}
+        # The common values (one-byte positions; names, UUIDs,
+        # strings, numbers and timestamps) are read inline: a method
+        # call per value would make decoding slower than JSON
+        data = self.data
+        count = self.uint()
+        pos = self.pos
+        for _ in range(count):
+            position = data[pos]
+            if position >= 0x80:
+                self.pos = pos
+                name = names[self.uint()]
+                record[name] = self.value(names)
+                pos = self.pos
+                continue
+            tag = data[pos + 1]
+            pos += 2
+            if tag == UUID:
+                h = data[pos:pos + 16].hex()
+                value = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+                pos += 16
+            elif tag in _varint:
+                # Variable-length unsigned integer (see `uint()`)
+                value = data[pos]
+                pos += 1
+                if value >= 0x80:
+                    value &= 0x7f
+                    shift = 7
+                    while True:
+                        byte = data[pos]
+                        pos += 1
+                        value |= (byte & 0x7f) << shift
+                        if byte < 0x80:
+                            break
+                        shift += 7
+                if tag == STR:
+                    end = pos + value
+                    value = data[pos:end].decode("utf-8")
+                    pos = end
+                elif tag == NAME:
+                    value = names[value]
+                else:
+                    value = (value >> 1 if not value & 1
+                             else -((value + 1) >> 1))
+                    if tag == DATETIME:
+                        value = EPOCH + value * MICROSECOND
+            elif tag == FLOAT:
+                value = _double.unpack_from(data, pos)[0]
+                pos += 8
+            else:
+                self.pos = pos - 1
+                value = self.value(names)
+                pos = self.pos
+            record[names[position]] = value
+        self.pos = pos
+        if key is None:
+            key = "{}.{}".format(record["__class__"], record["id"])
+        return key, record
+
+    def uint(self):
+        """Reads a variable-length unsigned integer"""
+        data = self.data
+        byte = data[self.pos]
+        if byte < 0x80:
+            # Most integers (name positions, lengths) fit in one byte
+            self.pos += 1
+            return byte
+        result = shift = 0
+        while True:
+            byte = data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def int(self):
+        """Reads a variable-length signed (zigzag) integer"""
+        value = self.uint()
+        return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+    def str(self):
+        """Reads a length-prefixed UTF-8 string"""
+        size = self.uint()
+        start = self.pos
+        self.pos += size
+        return self.data[start:self.pos].decode("utf-8")
+
+    def value(self, names):
+        """Reads a tagged value"""
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == NAME:
+            return names[self.uint()]
+        if tag == UUID:
+            start = self.pos
+            self.pos += 16
+            return _unpack_uuid(self.data[start:self.pos])
+        if tag == STR:
+            return self.str()
+        if tag == DATETIME:
+            return EPOCH + self.int() * MICROSECOND
+        if tag == INT:
+            return self.int()
+        if tag == FLOAT:
+            value = _double.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return value
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == LIST:
+            return [self.value(names) for _ in range(self.uint())]
+        if tag == DICT:
+            return {self.str(): self.value(names)
+                    for _ in range(self.uint())}
+        raise ValueError("Unknown tag {} at {}".format(tag, self.pos - 1))
+
+
+def _write_uint(out, value):
+    """Appends a variable-length unsigned integer to `out`"""
+    if value < 0x80:
+        out.append(value)
+        return
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out, value):
+    """Appends a length-prefixed UTF-8 string to `out`"""
+    data = value.encode("utf-8")
+    _write_uint(out, len(data))
+    out += data
+
+
+def _pack_uuid(value):
+    """Returns the 16 bytes of `value` if it is a UUID written in its
+    canonical (lowercase, hyphenated) form, else None
+    """
+    if (
+        len(value) != 36 or value[8] != "-" or value[13] != "-" or
+        value[18] != "-" or value[23] != "-" or value != value.lower()
+    ):
+        return None
+    try:
+        # Much faster than `uuid.UUID(value)`
+        packed = bytes.fromhex(value[:8] + value[9:13] + value[14:18] +
+                               value[19:23] + value[24:])
+    except ValueError:
+        return None
+    # `fromhex()` skips whitespace
+    return packed if len(packed) == 16 else None
+
+
+def _unpack_uuid(packed):
+    """Returns the canonical form of the UUID of 16 bytes `packed`"""
+    h = packed.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _to_json(value):
+    """`json.dump()` default: timestamps back to `isoformat()`"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("Cannot encode {!r}".format(value))
+
+
+def main(argv):
+    """Converts a storage file between JSON and the binary format"""
+    if len(argv) != 4 or argv[1] not in ("to-binary", "to-json"):
+        print("Usage: python3 -m models.engine.binary_format "
+              "to-binary|to-json <source> <destination>")
+        return 1
+    if argv[1] == "to-binary":
+        from models.engine.json_stream import iter_items as json_items
+        with open(argv[2], "r", encoding="utf-8") as f:
+            data = dumps(json_items(f))
+        with open(argv[3], "wb") as f:
+            f.write(data)
+    else:
+        with open(argv[2], "rb") as f:
+            records = dict(iter_items(f))
+        with open(argv[3], "w", encoding="utf-8") as f:
+            json.dump(records, f, default=_to_json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,357 @@
+#!/usr/bin/python3
+"""
+This module provides a storage engine backed by SQLite. It has
+the same interface as `FileStorage`, but reads and writes single
+instances instead of the whole store
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from models.base_model import BaseModel, classes
+from models.engine import query
+# The model modules are imported so that they register in `classes`
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+
+
+class DBStorage:
+    """The class `DBStorage` keeps one table per class in the
+    SQLite database `__db_path`. Each row holds the id, the
+    timestamps, the foreign keys (indexed) and the JSON of the
+    instance. Instances read from the database are kept in
+    `__objects`, so that an instance is only built once
+    """
+    __db_path = os.getenv("HBNB_DB_PATH", "hbnb.db")
+    __objects = {}
+    __foreign_keys = {
+            "City": ("state_id",),
+            "Place": ("city_id", "user_id"),
+            "Review": ("place_id", "user_id")
+            }
+    # Instances added, changed or deleted since the last save:
+    # key -> obj (or None once deleted)
+    __dirty = {}
+    # Nesting depth of `batch()`, and whether a save was deferred
+    __batch_depth = 0
+    __batch_saved = False
+    # True once every row is in `__objects`
+    __complete = False
+    __connection = None
+
+    def all(self):
+        """Returns a dictionary of all the instances, reading the
+        ones not read yet from the database
+        """
+        if not DBStorage.__complete:
+            for class_name in classes:
+                self.by_class(class_name)
+            DBStorage.__complete = True
+        return DBStorage.__objects
+
+    def new(self, obj):
+        """Adds an instance (obj) to the storage. It is written to
+        the database on the next call to `save()`
+        """
+        key_str = obj.__class__.__name__ + "." + obj.id
+        DBStorage.__objects[key_str] = obj
+        DBStorage.__dirty[key_str] = obj
+
+    def mark_dirty(self, obj, attr=None):
+        """Flags a stored instance (obj) as changed so that it is
+        written on the next call to `save()`
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        key_str = obj.__class__.__name__ + "." + obj_id
+        if DBStorage.__objects.get(key_str) is obj:
+            DBStorage.__dirty[key_str] = obj
+
+    def delete(self, obj):
+        """Removes an instance (obj) from the storage. The row is
+        deleted on the next call to `save()`
+        """
+        key_str = obj.__class__.__name__ + "." + obj.id
+        DBStorage.__objects.pop(key_str, None)
+        DBStorage.__dirty[key_str] = None
+
+    def save(self):
+        """Writes the instances added, changed or deleted since the
+        last save, in one transaction
+        """
+        if DBStorage.__batch_depth:
+            DBStorage.__batch_saved = True
+            return
+        if not DBStorage.__dirty:
+            return
+        with self._connection() as connection:
+            for key, obj in DBStorage.__dirty.items():
+                class_name, obj_id = key.split(".", 1)
+                if class_name not in classes:
+                    continue
+                if obj is None:
+                    connection.execute(
+                            'DELETE FROM "{}" WHERE id = ?'.format(
+                                class_name), (obj_id,))
+                    continue
+                columns = self._columns(class_name)
+                obj_dict = obj.to_dict()
+                values = [obj_dict.get(column) for column in columns[:-1]]
+                values.append(json.dumps(obj_dict))
+                connection.execute(
+                        'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                            class_name, ", ".join(columns),
+                            ", ".join("?" * len(columns))), values)
+        DBStorage.__dirty = {}
+
+    def refresh(self):
+        """Forgets the instances read so far that have no unsaved
+        change, so that they are read again (with the changes of other
+        processes) the next time they are needed
+        """
+        DBStorage.__objects = {key: obj for key, obj
+                               in DBStorage.__objects.items()
+                               if key in DBStorage.__dirty}
+        DBStorage.__complete = False
+
+    def flush(self):
+        """Saves are written synchronously: nothing is ever pending
+        """
+        pass
+
+    @contextmanager
+    def batch(self):
+        """Context manager deferring every `save()` made inside it to
+        one transaction when the (outermost) block exits
+        """
+        DBStorage.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            DBStorage.__batch_depth -= 1
+            if not DBStorage.__batch_depth and DBStorage.__batch_saved:
+                DBStorage.__batch_saved = False
+                self.save()
+
+    def reload(self):
+        """Opens the database (creating the tables and indexes if
+        needed) and forgets the instances read so far. Instances
+        are then read on demand
+        """
+        connection = self._connection()
+        with connection:
+            for class_name in classes:
+                columns = self._columns(class_name)
+                connection.execute(
+                        'CREATE TABLE IF NOT EXISTS "{}" ('
+                        'id TEXT PRIMARY KEY, {})'.format(
+                            class_name,
+                            ", ".join(column + " TEXT"
+                                      for column in columns[1:])))
+                for column in DBStorage.__foreign_keys.get(class_name, ()):
+                    connection.execute(
+                            'CREATE INDEX IF NOT EXISTS "{0}_{1}" '
+                            'ON "{0}" ({1})'.format(class_name, column))
+        DBStorage.__objects = {}
+        DBStorage.__dirty = {}
+        DBStorage.__complete = False
+
+    def get(self, class_name, obj_id):
+        """Returns the instance of class `class_name` with id
+        `obj_id`, or None
+        """
+        key_str = class_name + "." + obj_id
+        if key_str in DBStorage.__objects:
+            return DBStorage.__objects[key_str]
+        if class_name not in classes:
+            return None
+        return self._select(class_name, "id", obj_id).get(key_str)
+
+    def by_class(self, class_name):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` (not of its subclasses)
+        """
+        if class_name not in classes:
+            return {}
+        return self._select(class_name)
+
+    def by_id(self, obj_id):
+        """Returns a dictionary `{key: obj}` of the instances with
+        id `obj_id`, whatever their class
+        """
+        objs = {}
+        for class_name in classes:
+            obj = self.get(class_name, obj_id)
+            if obj is not None:
+                objs[class_name + "." + obj_id] = obj
+        return objs
+
+    def lookup(self, class_name, attr, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` equals `value`.
+        Foreign keys are answered from an indexed column
+        """
+        if attr in DBStorage.__foreign_keys.get(class_name, ()):
+            return self._select(class_name, attr, value)
+        return {key: obj for key, obj in self.by_class(class_name).items()
+                if getattr(obj, attr, None) == value}
+
+    def select(self, class_name, attr, op, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` compares to `value`
+        with `op` (see `models/engine/query.py`) if an indexed column
+        answers it, else None: the id and foreign keys answer `==` and
+        `in`
+        """
+        if (
+            op not in ("==", "in") or class_name not in classes or
+            attr not in ("id",) + DBStorage.__foreign_keys.get(class_name,
+                                                               ())
+        ):
+            return None
+        if op == "in" and not isinstance(value, (list, tuple, set)):
+            return {}
+        objs = {}
+        for value in [value] if op == "==" else value:
+            if isinstance(value, str):
+                objs.update(self._select(class_name, attr, value))
+        return objs
+
+    def ordered(self, class_name, attr, reverse=False):
+        """There is no sorted index here: returns None"""
+        return None
+
+    def box(self, class_name, south, west, north, east):
+        """There is no spatial index here: returns None"""
+        return None
+
+    def search(self, class_name, text, limit=None):
+        """There is no text index here: returns None"""
+        return None
+
+    def count(self, class_name, **filters):
+        """Returns the number of instances of class `class_name`
+        whose attributes equal `filters` (compared as by `where()`).
+        Counted by the database (through the indexed columns of the
+        foreign keys, for string values), unless unsaved changes of
+        the class or other attributes require a scan
+        """
+        if class_name not in classes:
+            return 0
+        foreign_keys = DBStorage.__foreign_keys.get(class_name, ())
+        pending = any(key_str.startswith(class_name + ".")
+                      for key_str in DBStorage.__dirty)
+        if (
+            pending or any(attr not in foreign_keys for attr in filters) or
+            # Values SQLite cannot bind (e.g. lists)
+            not all(isinstance(value, str) for value in filters.values())
+        ):
+            return sum(1 for _, obj in self.stream(class_name)
+                       if all(query.equal(getattr(obj, attr, None), value)
+                              for attr, value in filters.items()))
+        sql = 'SELECT COUNT(*) FROM "{}"'.format(class_name)
+        if filters:
+            sql += " WHERE " + " AND ".join(
+                    '"{}" = ?'.format(attr) for attr in filters)
+        return self._connection().execute(
+                sql, tuple(filters.values())).fetchone()[0]
+
+    def stream(self, class_name=None, after=None):
+        """Yields the `(key, obj)` pairs of the instances of class
+        `class_name` (of every class if None) one at a time, starting
+        after the key `after` if given. Rows are read in `rowid` order
+        as they are yielded, followed by the instances not saved yet.
+        Instances read here are not kept in `__objects`
+        """
+        names = [class_name] if class_name is not None else list(classes)
+        for name in names:
+            if name not in classes:
+                continue
+            cls = classes[name]
+            sql = 'SELECT id, data FROM "{}"'.format(name)
+            params = ()
+            cursor = after
+            if after is not None:
+                if not after.startswith(name + "."):
+                    continue    # The cursor is in a later class
+                sql += (' WHERE rowid > (SELECT rowid FROM "{}"'
+                        ' WHERE id = ?)').format(name)
+                params = (after.split(".", 1)[1],)
+                after = None
+            sql += " ORDER BY rowid"
+            for obj_id, data in self._connection().execute(sql, params):
+                key_str = name + "." + obj_id
+                obj = DBStorage.__objects.get(key_str)
+                if obj is None:
+                    if key_str in DBStorage.__dirty:
+                        continue    # Deleted, not saved yet
+                    obj = cls(**json.loads(data))
+                yield key_str, obj
+            pending = [key_str for key_str, obj in DBStorage.__dirty.items()
+                       if obj is not None and
+                       obj.__class__.__name__ == name and
+                       not self._saved(name, obj.id)]
+            if cursor in pending:
+                # The cursor itself is not saved yet
+                pending = pending[pending.index(cursor) + 1:]
+            for key_str in pending:
+                yield key_str, DBStorage.__objects[key_str]
+
+    def _saved(self, class_name, obj_id):
+        """Checks if the table of `class_name` has a row `obj_id`"""
+        return self._connection().execute(
+                'SELECT 1 FROM "{}" WHERE id = ?'.format(class_name),
+                (obj_id,)).fetchone() is not None
+
+    def _connection(self):
+        """Returns the connection to the database, opening it in
+        WAL mode the first time
+        """
+        if DBStorage.__connection is None:
+            connection = sqlite3.connect(DBStorage.__db_path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            DBStorage.__connection = connection
+        return DBStorage.__connection
+
+    def _columns(self, class_name):
+        """Returns the columns of the table of `class_name`; the
+        JSON of the instance is always last
+        """
+        return (("id", "created_at", "updated_at") +
+                DBStorage.__foreign_keys.get(class_name, ()) + ("data",))
+
+    def _select(self, class_name, attr=None, value=None):
+        """Returns a dictionary `{key: obj}` of the instances of
+        `class_name` (whose `attr` equals `value`, if given). Instances
+        already read are reused, and changes not saved yet are taken
+        into account
+        """
+        cls = classes[class_name]
+        sql = 'SELECT id, data FROM "{}"'.format(class_name)
+        params = ()
+        if attr is not None:
+            sql += ' WHERE "{}" = ?'.format(attr)
+            params = (value,)
+        objs = {}
+        for obj_id, data in self._connection().execute(sql, params):
+            key_str = class_name + "." + obj_id
+            obj = DBStorage.__objects.get(key_str)
+            if obj is None:
+                if key_str in DBStorage.__dirty:
+                    continue    # Deleted, not saved yet
+                obj = cls(**json.loads(data))
+                DBStorage.__objects[key_str] = obj
+            objs[key_str] = obj
+        for key_str, obj in DBStorage.__dirty.items():
+            if obj is not None and obj.__class__.__name__ == class_name:
+                objs[key_str] = obj
+        if attr is not None:
+            objs = {key_str: obj for key_str, obj in objs.items()
+                    if getattr(obj, attr, None) == value}
+        return objs
@@ -4,10 +4,27 @@ This module provides a class that handles file
 storage. The methods in this class are responsible for
 both serialization and deserialization of JSON files
 """
+import atexit
+import io
 import json
+import marshal
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:     # Not available on Windows
+    fcntl = None
 from datetime import datetime
-from models.base_model import BaseModel
+from models.engine import binary_format, query, record_map
+from models.engine.index import (TEXTS, GridIndex, Index, SortedIndex,
+                                 TextIndex)
+from models.engine.json_stream import iter_items
+from models.base_model import BaseModel, classes
+# The model modules are imported so that they register in `classes`
 from models.user import User
 from models.state import State
 from models.city import City
@@ -16,19 +33,164 @@ from models.place import Place
 from models.review import Review
 
 
+def _sorted_attributes(spec):
+    """Returns `{class name: (attribute, ...)}` for the comma-separated
+    `<class name>.<attribute>` names of `spec`
+    """
+    attributes = {}
+    for name in spec.split(","):
+        if "." in name:
+            class_name, attr = name.strip().split(".", 1)
+            attributes[class_name] = attributes.get(class_name, ()) + (attr,)
+    return attributes
+
+
 class FileStorage:
     """The class `FileStorage` has two private class
     attributes, one that specifies the file (path) to
     be used for storage and the other which stores
     instances
+
+    In journaled mode (`HBNB_JOURNAL=1`), `save()` appends one
+    record per changed instance to a log next to `__file_path`
+    instead of rewriting the whole file. The log is replayed by
+    `reload()` and compacted into `__file_path` in the background
+    once it grows past `__journal_limit` bytes
+
+    In lazy mode (`HBNB_LAZY=1`), `reload()` maps `__file_path` in
+    memory and only reads the keys of its instances, from positions
+    saved next to it (see `record_map`): an instance is decoded and
+    recreated the first time it is looked up, and the attribute
+    indexes of a class are built the first time they are queried;
+    `all()` recreates every remaining instance. Journaled and sharded
+    stores keep the raw dictionaries instead
+
+    Files are replaced atomically (written to a temporary file that
+    is renamed), optionally fsync-ed (`HBNB_FSYNC=1`). With
+    `HBNB_COMMIT_WINDOW=<seconds>`, the saves made within that window
+    after a write are merged into one write at the end of the window.
+    With `HBNB_FLUSH_INTERVAL=<seconds>`, `save()` returns at once and
+    a background thread writes, at most once per interval; `flush()`
+    (also called at exit) writes what is still pending
+
+    With `HBNB_SHARED=1`, several processes can use the same file:
+    reads and writes hold `fcntl` locks, and a process that finds the
+    file changed by another one merges it instance by instance (see
+    `_merge()`) before writing, or when `refresh()` is called
+
+    In sharded mode (`HBNB_SHARD_DIR=<directory>`), each class has
+    its own file `<directory>/<class name>.json`. A save only rewrites
+    the files of the classes that changed. `reload()` reads all files
+    in parallel, or, in lazy mode, each file when first needed.
+    Sharded mode replaces the journaled and shared modes
+
+    `__file_path` is JSON, or, for a store created with
+    `HBNB_FORMAT=binary`, the compact format of `binary_format`.
+    `reload()` detects the format, which an existing file keeps
+    (`python3 -m models.engine.binary_format` converts a file).
+    Journaled and sharded stores are always JSON
+
+    Instances are also indexed by class name and by the foreign keys
+    listed in `__foreign_keys`, which `by_class()` and `lookup()` use
+    instead of scanning `__objects` (`by_id()` tries the key of each
+    class).
+    The numeric attributes named in `HBNB_SORTED_INDEXES` (e.g.
+    `Place.price_by_night,Place.max_guest`) get a sorted index, which
+    answers the range conditions of `select()` and the orders of
+    `ordered()`. The locations of the classes listed in
+    `__locations` are indexed by a grid, which answers the bounding
+    boxes of `box()`, and the words of the attributes listed in
+    `__texts` by an inverted index, which ranks the results of
+    `search()`. The inverted index is saved at exit next to
+    `__file_path` (see `_save_texts()`), and loaded back by `reload()`
+    when the file did not change since.
+    The class names and foreign keys read from disk are interned, so
+    that every reference to an instance shares one string
     """
     __file_path = "file.json"
     __objects = {}
+    __journal = os.getenv("HBNB_JOURNAL") == "1"
+    __journal_limit = 4 * 1024 * 1024
+    __journal_lock = threading.Lock()
+    __compactor = None
+    __lazy = os.getenv("HBNB_LAZY") == "1"
+    # Lazy mode: the instances not recreated yet, as their number in
+    # `__mapped` (the `RecordMap` of the file read by `reload()`), or
+    # as raw dictionaries (journaled, sharded or merged instances)
+    __raw = {}
+    __mapped = None
+    # Instances added, changed or deleted since the last save:
+    # key -> obj (or None once deleted)
+    __dirty = {}
+    # Attributes of each class that reference other instances
+    __foreign_keys = {
+            "City": ("state_id",),
+            "Place": ("city_id", "user_id"),
+            "Review": ("place_id", "user_id")
+            }
+    # Numeric attributes of each class with a sorted (range) index
+    __sorted_attributes = _sorted_attributes(
+            os.getenv("HBNB_SORTED_INDEXES", ""))
+    # Latitude and longitude attributes of the located classes
+    __locations = {"Place": ("latitude", "longitude")}
+    # Free-text attributes of each class, searched by `search()`
+    __texts = TEXTS
+    # The indexes whose text indexes were searched or loaded (the only
+    # ones worth saving), and the stamp of `__file_path` they were
+    # last saved or loaded for
+    __texts_live = None
+    __texts_stamp = None
+    __indexes = {}
+    # The `__objects` dictionary that `__indexes` describe
+    __indexed = None
+    # Lazy mode: the indexes of `__indexes` not filled yet with the
+    # mapped instances of their class (name -> class name)
+    __unindexed = {}
+    # Names of the attribute indexes of each class (see `_index()`)
+    __index_names = {}
+    # Format of `__file_path` ("json" or "binary"), and the encoder
+    # (name table) of the binary records
+    __format = os.getenv("HBNB_FORMAT", "json")
+    __encoder = binary_format.Encoder()
+    # Cache of already encoded `"<key>": {...}` JSON members (or
+    # binary records)
+    __fragments = {}
+    # Durability: fsync written files (`HBNB_FSYNC=1`), and merge the
+    # saves made within `__commit_window` seconds into one write
+    __fsync = os.getenv("HBNB_FSYNC") == "1"
+    __commit_window = float(os.getenv("HBNB_COMMIT_WINDOW", "0"))
+    __commit_timer = None
+    __last_flush = 0.0
+    __flush_lock = threading.RLock()
+    # Write-behind: with `HBNB_FLUSH_INTERVAL=<seconds>` a background
+    # thread writes the saves, at most once per interval
+    __flush_interval = float(os.getenv("HBNB_FLUSH_INTERVAL", "0"))
+    __flush_event = threading.Event()
+    __flusher = None
+    # True while a save was delayed and not written yet
+    __save_pending = False
+    # Sharded mode (`HBNB_SHARD_DIR=<directory>`): one file per class,
+    # and the classes whose file was read
+    __shard_dir = os.getenv("HBNB_SHARD_DIR")
+    __loaded_shards = set()
+    # Several processes sharing `__file_path` (`HBNB_SHARED=1`): the
+    # (inode, mtime, size) of the file when this process last read
+    # or wrote it, to detect the writes of other processes
+    __shared = os.getenv("HBNB_SHARED") == "1"
+    __disk_stamp = None
+    # Nesting depth of `batch()`, and whether a save was deferred
+    __batch_depth = 0
+    __batch_saved = False
 
     def all(self):
         """Returns all instances stored in the
         private class attribute `__objects`
         """
+        self._load_shards()
+        if FileStorage.__raw:
+            # Lazy mode: every instance is needed now
+            for key in list(FileStorage.__raw):
+                self._materialize(key)
         return FileStorage.__objects
 
     def new(self, obj):
@@ -36,45 +198,1020 @@ class FileStorage:
         `<obj class name>.id` . e.g. BaseModel.122354: {obj}
         """
         key_str = obj.__class__.__name__ + "." + obj.id
+        FileStorage.__raw.pop(key_str, None)
         FileStorage.__objects[key_str] = obj
+        FileStorage.__dirty[key_str] = obj
+        self._index(key_str, obj)
+
+    def mark_dirty(self, obj, attr=None):
+        """Flags a stored instance (obj) as changed so that its
+        JSON is re-encoded on the next call to `save()`. If `attr`
+        (the name of the changed attribute) is indexed, the index
+        is updated as well
+        """
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None:
+            return
+        class_name = obj.__class__.__name__
+        key_str = class_name + "." + obj_id
+        if FileStorage.__objects.get(key_str) is not obj:
+            return
+        FileStorage.__dirty[key_str] = obj
+        if (
+            attr is None or
+            attr in FileStorage.__foreign_keys.get(class_name, ()) or
+            attr in FileStorage.__sorted_attributes.get(class_name, ()) or
+            attr in FileStorage.__locations.get(class_name, ()) or
+            attr in FileStorage.__texts.get(class_name, ())
+        ):
+            self._index(key_str, obj)
+
+    def delete(self, obj):
+        """Removes an instance (obj) from `__objects`. The change
+        is persisted on the next call to `save()`
+        """
+        key_str = obj.__class__.__name__ + "." + obj.id
+        indexes = self._indexes()
+        if FileStorage.__objects.pop(key_str, None) is not None:
+            FileStorage.__dirty[key_str] = None
+            for index in indexes.values():
+                index.remove(key_str)
+
+    def get(self, class_name, obj_id):
+        """Returns the instance of class `class_name` with id
+        `obj_id`, or None
+        """
+        self._load_shards(class_name)
+        return self._materialize(class_name + "." + obj_id)
+
+    def by_class(self, class_name):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` (not of its subclasses)
+        """
+        self._load_shards(class_name)
+        keys = self._indexes()["__class__"].get(class_name)
+        return {key: self._materialize(key) for key in keys}
+
+    def by_id(self, obj_id):
+        """Returns a dictionary `{key: obj}` of the instances with
+        id `obj_id`, whatever their class
+        """
+        self._load_shards()
+        keys = [class_name + "." + obj_id
+                for class_name in self._indexes()["__class__"].values()]
+        objs = {key: self._materialize(key) for key in keys}
+        return {key: obj for key, obj in objs.items() if obj is not None}
+
+    def lookup(self, class_name, attr, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` equals `value`.
+        Foreign keys are answered from an index, other attributes
+        by scanning the instances of the class
+        """
+        self._load_shards(class_name)
+        indexes = self._indexes()
+        index = self._filled(class_name + "." + attr)
+        if index is not None:
+            keys = index.get(value)
+        else:
+            keys = [key for key in indexes["__class__"].get(class_name)
+                    if self._value(self._record(key), attr) == value]
+        return {key: self._materialize(key) for key in keys}
+
+    def select(self, class_name, attr, op, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` compares to `value`
+        with `op` (see `models/engine/query.py`) if an index answers
+        it, else None: the id and foreign keys answer `==` and `in`,
+        sorted indexes also answer `<`, `<=`, `>`, `>=` and `between`
+        (`value` is `(low, high)`, both inclusive)
+        """
+        self._load_shards(class_name)
+        if attr == "id":
+            return self._select_ids(class_name, op, value)
+        index = self._filled(class_name + "." + attr)
+        if index is None:
+            return None
+        if isinstance(index, SortedIndex):
+            keys = self._range(index, op, value)
+            if keys is None:
+                return None
+        else:
+            if op not in ("==", "in"):
+                return None
+            values = [value] if op == "==" else value
+            try:
+                keys = [key for value in values for key in index.get(value)
+                        if key.startswith(class_name + ".")]
+            except TypeError:
+                return {}   # Unhashable value: nothing is indexed under it
+        return {key: self._materialize(key) for key in keys}
+
+    def _select_ids(self, class_name, op, value):
+        """Returns a dictionary `{key: obj}` of the instances of class
+        `class_name` whose id is `value` (`op` "==") or in `value`
+        (`op` "in"), found by their keys, or None for another `op`
+        """
+        if op not in ("==", "in"):
+            return None
+        values = [value] if op == "==" else value
+        keys = [class_name + "." + value for value in values
+                if isinstance(value, str)]
+        objs = {key: self._materialize(key) for key in keys}
+        return {key: obj for key, obj in objs.items() if obj is not None}
+
+    def ordered(self, class_name, attr, reverse=False):
+        """Returns an iterator over the instances of class `class_name`
+        sorted by their attribute `attr` (descending if `reverse`) if a
+        sorted index covers every instance of the class, else None
+        """
+        self._load_shards(class_name)
+        indexes = self._indexes()
+        index = self._filled(class_name + "." + attr)
+        if (
+            not isinstance(index, SortedIndex) or
+            len(index) != len(indexes["__class__"].get(class_name))
+        ):
+            return None
+        return (self._materialize(key)
+                for key in index.scan(reverse=reverse))
+
+    def box(self, class_name, south, west, north, east):
+        """Returns a dictionary `{key: obj}` of the instances of class
+        `class_name` located in a bounding box (see `GridIndex.box()`)
+        if their locations are indexed, else None
+        """
+        self._load_shards(class_name)
+        attrs = FileStorage.__locations.get(class_name)
+        if attrs is None:
+            return None
+        index = self._filled(class_name + "." + ",".join(attrs))
+        return {key: self._materialize(key)
+                for key in index.box(south, west, north, east)}
+
+    def search(self, class_name, text, limit=None):
+        """Returns the `(obj, score)` pairs of the instances of class
+        `class_name` whose text attributes contain words of `text`,
+        best first (BM25), at most `limit` of them, or None if the
+        class has no text attributes
+        """
+        self._load_shards(class_name)
+        if class_name not in FileStorage.__texts:
+            return None
+        index = self._filled("text:" + class_name)
+        self._live_texts(self._indexes())
+        found = index.search(text, limit)
+        return [(self._materialize(key), score) for key, score in found]
+
+    def _range(self, index, op, value):
+        """Returns the keys of the sorted `index` whose value compares
+        to `value` with `op`, or None if `op` is not a range condition
+        or `value` is not a number
+        """
+        try:
+            if op in ("in", "between"):
+                values = [float(item) for item in value]
+            else:
+                value = float(value)
+        except (TypeError, ValueError):
+            return None
+        if op == "between":
+            return index.range(*values) if len(values) == 2 else None
+        if op == "==":
+            return index.get(value)
+        if op == "in":
+            return [key for item in set(values) for key in index.get(item)]
+        if op in ("<", "<="):
+            return index.range(high=value, high_inclusive=op == "<=")
+        if op in (">", ">="):
+            return index.range(low=value, low_inclusive=op == ">=")
+        return None
+
+    def count(self, class_name, **filters):
+        """Returns the number of instances of class `class_name`
+        whose attributes equal `filters` (e.g. `city_id="..."`, compared
+        as by `where()`), without materializing them. The class index
+        keeps a live count per class; the smallest index of a filtered
+        attribute gives the candidates, and only the remaining filters
+        are checked
+        """
+        self._load_shards(class_name)
+        indexes = self._indexes()
+        keys = indexes["__class__"].get(class_name)
+        checks = dict(filters)
+        for attr, value in filters.items():
+            index = self._filled(class_name + "." + attr)
+            # Sorted indexes compare numbers, not exact values
+            if not isinstance(index, Index):
+                continue
+            try:
+                found = index.get(value)
+            except TypeError:
+                return 0    # Unhashable value: nothing is indexed under it
+            if len(found) <= len(keys):
+                keys = found
+                checks = dict(filters)
+                del checks[attr]
+        if not checks:
+            return len(keys)
+        return sum(1 for key in keys
+                   if all(query.equal(self._value(self._record(key), attr),
+                                      value)
+                          for attr, value in checks.items()))
+
+    def stream(self, class_name=None, after=None):
+        """Yields the `(key, obj)` pairs of the instances of class
+        `class_name` (of every class if None) one at a time, starting
+        after the key `after` if given. Instances come by class, then
+        in the order they were stored, so that a listing can resume
+        from the last key it showed. As when iterating a dictionary,
+        instances must not be added or deleted meanwhile
+        """
+        names = [class_name] if class_name is not None else list(classes)
+        for name in names:
+            if after is not None and not after.startswith(name + "."):
+                continue    # The cursor is in a later class
+            self._load_shards(name)
+            keys = self._indexes()["__class__"].get(name)
+            if FileStorage.__shared:
+                # A copy: a background save may merge the changes of
+                # other processes into the index meanwhile
+                keys = list(keys)
+            keys = iter(keys)
+            if after is not None:
+                # Consumes the keys up to the cursor
+                if after not in keys:
+                    return
+                after = None
+            for key in keys:
+                obj = self._materialize(key)
+                if obj is not None:
+                    yield key, obj
 
     def save(self):
         """Serializes a python dictionary - stored in the
         private class attribute `__objects` to the file
-        specified in `__file_path`
+        specified in `__file_path`. Only instances that changed
+        since the last save are encoded again.
+        With a commit window, a save made less than `__commit_window`
+        seconds after the previous write is delayed to the end of the
+        window, together with the saves that follow it
+        """
+        if FileStorage.__batch_depth:
+            FileStorage.__batch_saved = True
+            return
+
+        if FileStorage.__flush_interval > 0:
+            FileStorage.__save_pending = True
+            if FileStorage.__flusher is None:
+                FileStorage.__flusher = threading.Thread(
+                        target=self._flush_behind, daemon=True)
+                FileStorage.__flusher.start()
+                atexit.register(self.flush)
+            FileStorage.__flush_event.set()
+            return
+
+        if FileStorage.__commit_window > 0:
+            with FileStorage.__flush_lock:
+                if FileStorage.__commit_timer is not None:
+                    return      # Already scheduled
+                wait = (FileStorage.__last_flush +
+                        FileStorage.__commit_window - time.monotonic())
+                if wait > 0:
+                    FileStorage.__save_pending = True
+                    FileStorage.__commit_timer = threading.Timer(
+                            wait, self._flush_reporting, (self._flush,))
+                    FileStorage.__commit_timer.start()
+                    return
+
+        self._flush()
+
+    def flush(self):
+        """Writes now the saves delayed by the commit window or not
+        yet written by the background thread
+        """
+        with FileStorage.__flush_lock:
+            if FileStorage.__commit_timer is not None:
+                FileStorage.__commit_timer.cancel()
+            if FileStorage.__save_pending:
+                self._flush()
+
+    def _flush_behind(self):
+        """Body of the background thread: writes the pending saves,
+        then sleeps for the interval so that the saves made meanwhile
+        are written together
+        """
+        while True:
+            FileStorage.__flush_event.wait()
+            FileStorage.__flush_event.clear()
+            self._flush_reporting(self.flush)
+            time.sleep(FileStorage.__flush_interval)
+
+    def _flush_reporting(self, flush):
+        """Runs `flush` in a background thread (write-behind or commit
+        window), reporting a failed write instead of ending the
+        thread. The changes stay pending and are written again by the
+        next save or flush
+        """
+        try:
+            flush()
+        except Exception as error:
+            sys.stderr.write("** save failed: {} **\n".format(error))
+
+    def _flush(self):
+        """Writes the changes: appends them to the journal, or
+        replaces `__file_path` with a new version of the file
+        """
+        with FileStorage.__flush_lock:
+            FileStorage.__commit_timer = None
+            FileStorage.__save_pending = False
+            FileStorage.__last_flush = time.monotonic()
+            dirty = FileStorage.__dirty
+            FileStorage.__dirty = {}
+            try:
+                with self._file_lock(exclusive=True):
+                    if FileStorage.__shard_dir:
+                        self._write_shards(dirty)
+                    elif FileStorage.__journal:
+                        self._append_journal(dirty)
+                    else:
+                        if self._disk_changed():
+                            self._merge(dirty)
+                        self._write_objects(dirty)
+                        FileStorage.__disk_stamp = self._disk_stamp()
+            except BaseException:
+                # Not written: pending again, unless changed since
+                for key, obj in dirty.items():
+                    FileStorage.__dirty.setdefault(key, obj)
+                FileStorage.__save_pending = True
+                raise
+
+    def refresh(self):
+        """In shared mode, merges the instances that other processes
+        added, changed or deleted since this process last read or
+        wrote the file. Costs one `stat()` when nothing changed
+        """
+        if not FileStorage.__shared or FileStorage.__journal:
+            return
+        with FileStorage.__flush_lock, self._file_lock(exclusive=False):
+            if self._disk_changed():
+                self._merge()
+                FileStorage.__disk_stamp = self._disk_stamp()
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """In shared mode, holds an advisory `fcntl` lock (exclusive
+        for writers, shared for readers) on `<__file_path>.lock`
+        """
+        if not FileStorage.__shared or fcntl is None:
+            yield
+            return
+        with open(FileStorage.__file_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _disk_stamp(self):
+        """Returns the (inode, mtime, size) of `__file_path`, which
+        changes with every write since files are replaced by a rename
+        """
+        try:
+            stat = os.stat(FileStorage.__file_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _disk_changed(self):
+        """Checks, in shared mode, if another process wrote the file
+        """
+        return (FileStorage.__shared and
+                self._disk_stamp() != FileStorage.__disk_stamp)
+
+    def _merge(self, saving=None):
+        """Merges the file written by another process, instance by
+        instance: the instances changed here and not saved yet (or
+        being saved: `saving`) are kept, every other instance takes
+        its version from the file (and is dropped if the file no
+        longer has it)
+        """
+        dirty = FileStorage.__dirty.keys() | (saving or {}).keys()
+        fragments = FileStorage.__fragments
+        on_disk = set()
+        if os.path.exists(FileStorage.__file_path):
+            with open(FileStorage.__file_path, "rb") as f:
+                for key, instance in self._read_items(f):
+                    on_disk.add(key)
+                    cls = classes.get(instance.get("__class__"))
+                    if key in dirty or cls is None:
+                        continue
+                    fragment = self._encode(key, instance)
+                    if self._same_version(key, fragment, instance):
+                        continue
+                    FileStorage.__raw.pop(key, None)
+                    self._intern(instance)
+                    if FileStorage.__lazy:
+                        FileStorage.__objects.pop(key, None)
+                        FileStorage.__raw[key] = instance
+                        self._index(key, instance)
+                    else:
+                        obj = cls(**instance)
+                        FileStorage.__objects[key] = obj
+                        self._index(key, obj)
+                    fragments[key] = fragment
+
+        indexes = self._indexes()
+        for key in list(FileStorage.__objects) + list(FileStorage.__raw):
+            if key not in on_disk and key not in dirty:
+                # Deleted by another process
+                FileStorage.__objects.pop(key, None)
+                FileStorage.__raw.pop(key, None)
+                fragments.pop(key, None)
+                for index in indexes.values():
+                    index.remove(key)
+
+    def _same_version(self, key, fragment, instance):
+        """Checks if the instance stored under `key` in this process
+        is the version `instance` (encoded as `fragment`) read from
+        the file
+        """
+        if key in FileStorage.__fragments:
+            return FileStorage.__fragments[key] == fragment
+        record = self._record(key)
+        if record is None:
+            return False
+        if not isinstance(record, dict):
+            record = record.to_dict()
+        return self._encode(key, record) == fragment
+
+    def _write_objects(self, dirty):
+        """Writes every instance to `__file_path`, re-encoding only
+        the `dirty` ones (`{key: obj}`, or None once deleted)
+        """
+        # Copies: a delayed save runs in another thread
+        keys = list(FileStorage.__objects) + list(FileStorage.__raw)
+        items = [(key, self._fragment(key, dirty)) for key in keys]
+        # Instances deleted meanwhile are written by the next save
+        items = [(key, member) for key, member in items
+                 if member is not None]
+        members = [member for _, member in items]
+        self._drop_fragments(dirty)
+
+        if FileStorage.__format == "binary":
+            # The name table is complete once every record is encoded
+            data = FileStorage.__encoder.header() + b"".join(members)
+        else:
+            data = "{" + ", ".join(members) + "}"
+        self._write_file(FileStorage.__file_path, data)
+        if FileStorage.__lazy:
+            # The next lazy start needs not scan the file
+            try:
+                record_map.save_keys(
+                        FileStorage.__file_path, self._disk_stamp(),
+                        FileStorage.__format,
+                        FileStorage.__encoder.names, items)
+            except OSError:
+                pass
+
+    def _write_shards(self, dirty):
+        """Sharded mode: rewrites the file of every class with an
+        instance added, changed or deleted since the last save (the
+        keys of `dirty`)
         """
-        obj_dict = {}
+        indexes = self._indexes()
+        os.makedirs(FileStorage.__shard_dir, exist_ok=True)
 
-        for key, value in FileStorage.__objects.items():
-            # All stored instances are either of class BaseModel or inherited
-            # from BaseModel so have the to_dict() method
-            obj_dict[key] = value.to_dict()
+        for class_name in {key.split(".", 1)[0] for key in list(dirty)}:
+            # What was never read from the file would be lost
+            self._load_shards(class_name)
+            keys = list(indexes["__class__"].get(class_name))
+            members = [self._fragment(key, dirty) for key in keys]
+            members = [member for member in members if member is not None]
+            self._write_file(self._shard_path(class_name),
+                             "{" + ", ".join(members) + "}")
+        self._drop_fragments(dirty)
 
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as f:
-            json.dump(obj_dict, f)
+    def _fragment(self, key, dirty):
+        """Returns the encoded instance stored under `key` (see
+        `_encode()`), encoding it only if it is new or dirty, or None
+        if it was deleted (by another thread) since
+        """
+        fragment = FileStorage.__fragments.get(key)
+        number = FileStorage.__raw.get(key)
+        if type(number) is int and key not in dirty:
+            # Unchanged since read: copied from the mapped file (not
+            # cached, the file holds it)
+            return FileStorage.__mapped.fragment(number)
+        if fragment is None or key in dirty:
+            record = self._record(key)
+            if record is None:
+                return None
+            if not isinstance(record, dict):
+                # All stored instances are either of class BaseModel or
+                # inherited from BaseModel so have the to_dict() method
+                record = record.to_dict()
+            fragment = self._encode(key, record)
+            FileStorage.__fragments[key] = fragment
+        return fragment
+
+    def _encode(self, key, record):
+        """Returns the dictionary `record` stored under `key` as a
+        `"<key>": {...}` JSON member, or as a binary record
+        """
+        if FileStorage.__format == "binary" and not (
+                FileStorage.__journal or FileStorage.__shard_dir):
+            return FileStorage.__encoder.record(key, record)
+        return "{}: {}".format(json.dumps(key), json.dumps(record))
+
+    def _drop_fragments(self, dirty):
+        """Forgets the JSON members of the deleted instances"""
+        for key, value in list(dirty.items()):
+            if value is None:
+                FileStorage.__fragments.pop(key, None)
+
+    def _write_file(self, path, data):
+        """Replaces the file `path` atomically: `data` (text or bytes)
+        is written to a temporary file (fsync-ed if enabled) which is
+        then renamed, so readers and crashes only ever see a complete
+        file
+        """
+        tmp_path = path + ".tmp"
+        if isinstance(data, bytes):
+            f = open(tmp_path, "wb")
+        else:
+            f = open(tmp_path, "w", encoding="utf-8")
+        with f:
+            f.write(data)
+            if FileStorage.__fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if FileStorage.__fsync and hasattr(os, "O_DIRECTORY"):
+            # Make the rename itself durable
+            fd = os.open(os.path.dirname(os.path.abspath(path)),
+                         os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    @contextmanager
+    def batch(self):
+        """Context manager deferring every `save()` made inside it to
+        one save when the (outermost) block exits, e.g.
+        `with storage.batch(): ...`. Changes are saved even if the
+        block raises, as they are already applied in memory
+        """
+        FileStorage.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            FileStorage.__batch_depth -= 1
+            if not FileStorage.__batch_depth and FileStorage.__batch_saved:
+                FileStorage.__batch_saved = False
+                self.save()
 
     def reload(self):
         """Deserializes the JSON file specified in `__file_path`
         and returns/stores it to/in the dictionary specified in
-        `__objects`
-        """
-        file_exists = os.path.exists(FileStorage.__file_path)
-
-        if file_exists:
-            with open(FileStorage.__file_path, "r", encoding="utf-8") as f:
-                # 'Load' the string from JSON file to a dictionary
-                FileStorage.__objects = json.load(f)
-
-                # Convert all dictionarys back to objects/instances
-                for instance in FileStorage.__objects.values():
-                    # instance represents objects stored in the file/dict
-                    class_name = instance["__class__"]
-                    # Check if `__class__` attribute is a string and if the
-                    # corresponding class can be evaluated using eval
-                    # i.e. (the class exists and is a valid type)
-                    if (
-                        isinstance(class_name, str) and
-                        type(eval(class_name)) == type
-                    ):
-                        # Recreate the class instance and add it to storage
-                        self.new(eval(class_name)(**instance))
+        `__objects`. The file is decoded one instance at a time. In
+        lazy mode the file is only mapped (see `_map_file()`), and each
+        instance is recreated the first time it is needed
+        """
+        if (
+            not FileStorage.__journal and
+            not FileStorage.__shard_dir and
+            not os.path.exists(FileStorage.__file_path)
+        ):
+            return
+
+        FileStorage.__objects = {}
+        FileStorage.__raw = {}
+        FileStorage.__mapped = None
+        FileStorage.__loaded_shards = set()
+        if FileStorage.__shard_dir:
+            if not FileStorage.__lazy:
+                # Read and decode the files of all classes in parallel
+                names = list(classes)
+                with ThreadPoolExecutor() as pool:
+                    for class_name, records in zip(
+                            names, pool.map(self._read_shard, names)):
+                        for key, instance in records:
+                            self._add_record(key, instance)
+                        FileStorage.__loaded_shards.add(class_name)
+        else:
+            with self._file_lock(exclusive=False):
+                if FileStorage.__lazy and not FileStorage.__journal:
+                    self._map_file()
+                else:
+                    for key, instance in self._records():
+                        self._add_record(key, instance)
+                    FileStorage.__disk_stamp = self._disk_stamp()
+            if not FileStorage.__journal:
+                self._load_texts()
+        FileStorage.__dirty = {}
+        FileStorage.__fragments = {}
+        # Mapped binary records are copied as they are: same name table
+        mapped = FileStorage.__mapped
+        FileStorage.__encoder = binary_format.Encoder(
+                mapped.names if mapped is not None else ())
+
+    def _map_file(self):
+        """Lazy mode: maps `__file_path` (see `record_map`) and keeps
+        the number of each instance in `__raw`, without decoding them
+        """
+        mapped = record_map.open_map(FileStorage.__file_path)
+        FileStorage.__mapped = mapped
+        FileStorage.__format = mapped.format
+        FileStorage.__disk_stamp = mapped.stamp
+        for class_name, (first, keys) in mapped.classes.items():
+            # Skip records whose `__class__` is not a model class
+            if class_name in classes:
+                FileStorage.__raw.update(
+                        zip(keys, range(first, first + len(keys))))
+
+    def _add_record(self, key, instance):
+        """Stores the instance read from disk as `instance` under `key`
+        (only as a dictionary in lazy mode)
+        """
+        # instance represents objects stored in the file/dict
+        class_name = instance["__class__"]
+        # Skip records whose `__class__` is not a model class
+        cls = classes.get(class_name) if isinstance(
+                class_name, str) else None
+        if cls is None:
+            return
+        self._intern(instance)
+        if FileStorage.__lazy:
+            FileStorage.__raw[key] = instance
+            self._index(key, instance)
+        else:
+            # Recreate the class instance and add it to storage
+            obj = cls(**instance)
+            FileStorage.__objects[key] = obj
+            self._index(key, obj)
+
+    def _intern(self, instance):
+        """Interns the class name and the foreign keys of the
+        dictionary `instance` read from disk: the ids of a few
+        thousand States, Places, ... repeat across millions of
+        records, which then share one string per id
+        """
+        class_name = instance["__class__"]
+        instance["__class__"] = sys.intern(class_name)
+        for attr in FileStorage.__foreign_keys.get(class_name, ()):
+            value = instance.get(attr)
+            if type(value) is str:
+                instance[attr] = sys.intern(value)
+
+    def _shard_path(self, class_name):
+        """Returns the path of the file of the class `class_name`"""
+        return os.path.join(FileStorage.__shard_dir, class_name + ".json")
+
+    def _read_shard(self, class_name):
+        """Returns the `(key, dictionary)` pairs of the file of the
+        class `class_name`
+        """
+        try:
+            with open(self._shard_path(class_name), "r",
+                      encoding="utf-8") as f:
+                return list(iter_items(f))
+        except FileNotFoundError:
+            return []
+
+    def _load_shards(self, class_name=None):
+        """Sharded mode: reads the file of the class `class_name` (of
+        every class if None) the first time it is needed. Instances
+        already in memory (e.g. just created) are kept
+        """
+        if not FileStorage.__shard_dir:
+            return
+        names = [class_name] if class_name is not None else list(classes)
+        for name in names:
+            if name in FileStorage.__loaded_shards:
+                continue
+            FileStorage.__loaded_shards.add(name)
+            for key, instance in self._read_shard(name):
+                if (
+                    key not in FileStorage.__objects and
+                    key not in FileStorage.__dirty
+                ):
+                    self._add_record(key, instance)
+
+    def _records(self):
+        """Yields the `(key, dictionary)` pairs stored on disk"""
+        if FileStorage.__journal:
+            with FileStorage.__journal_lock:
+                records = self._read_snapshot()
+                self._replay(self._journal_path() + ".compacting", records)
+                self._replay(self._journal_path(), records)
+            yield from records.items()
+        else:
+            with open(FileStorage.__file_path, "rb") as f:
+                yield from self._read_items(f)
+
+    def _read_items(self, f):
+        """Yields the `(key, dictionary)` pairs of `__file_path`,
+        opened in binary mode as `f`, and records its format
+        """
+        if binary_format.is_binary(f.peek(len(binary_format.MAGIC))):
+            FileStorage.__format = "binary"
+            yield from binary_format.iter_items(f)
+        else:
+            FileStorage.__format = "json"
+            # Stream the members instead of `json.load()`-ing the
+            # whole file next to the instances built from it
+            yield from iter_items(io.TextIOWrapper(f, encoding="utf-8"))
+
+    def _record(self, key):
+        """Returns the instance stored under `key`, or its raw
+        dictionary if it was not materialized yet
+        """
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            obj = FileStorage.__raw.get(key)
+            if type(obj) is int:
+                obj = self._unmap(obj)
+        return obj
+
+    def _materialize(self, key):
+        """Returns the instance stored under `key` (or None), building
+        it from its raw dictionary the first time it is needed
+        """
+        obj = FileStorage.__objects.get(key)
+        if obj is None and key in FileStorage.__raw:
+            instance = FileStorage.__raw.pop(key)
+            if type(instance) is int:
+                instance = self._unmap(instance)
+            obj = classes[instance["__class__"]](**instance)
+            FileStorage.__objects[key] = obj
+        return obj
+
+    def _unmap(self, number):
+        """Returns the dictionary of the mapped instance `number`"""
+        instance = FileStorage.__mapped.record(number)[1]
+        self._intern(instance)
+        return instance
+
+    @staticmethod
+    def _value(record, attr):
+        """Returns the attribute `attr` of an instance or of the raw
+        dictionary of a not yet materialized instance (or else the
+        class default, as for an instance)
+        """
+        if isinstance(record, dict):
+            if attr in record:
+                return record[attr]
+            return getattr(classes.get(record.get("__class__")), attr, None)
+        if attr == "__class__":
+            return record.__class__.__name__
+        return getattr(record, attr, None)
+
+    def _indexes(self):
+        """Returns the indexes of `__objects`, rebuilding them first
+        if `__objects` was replaced as a whole (e.g. by `reload()`)
+        """
+        if FileStorage.__indexed is not FileStorage.__objects:
+            FileStorage.__index_names = {}
+            indexes = {"__class__": Index(
+                    lambda record: self._value(record, "__class__"))}
+            for class_name, attrs in FileStorage.__foreign_keys.items():
+                for attr in attrs:
+                    indexes[class_name + "." + attr] = Index(
+                            lambda record, attr=attr: self._value(record,
+                                                                  attr))
+            for class_name, attrs in (
+                    FileStorage.__sorted_attributes.items()):
+                for attr in attrs:
+                    indexes[class_name + "." + attr] = SortedIndex(
+                            lambda record, attr=attr: self._value(record,
+                                                                  attr))
+            for class_name, attrs in FileStorage.__locations.items():
+                indexes[class_name + "." + ",".join(attrs)] = GridIndex(
+                        lambda record, attrs=attrs: tuple(
+                            self._value(record, attr) for attr in attrs))
+            for class_name, attrs in FileStorage.__texts.items():
+                indexes["text:" + class_name] = TextIndex(
+                        lambda record, attrs=attrs: self._text(record,
+                                                               attrs))
+            FileStorage.__indexes = indexes
+            FileStorage.__indexed = FileStorage.__objects
+            FileStorage.__unindexed = {}
+            raw = FileStorage.__raw
+            mapped = FileStorage.__mapped
+            if mapped is not None:
+                # Indexed by class from the keys alone; the attribute
+                # indexes wait until they are queried (see `_filled()`)
+                for class_name, (_, keys) in mapped.classes.items():
+                    keys = [key for key in keys if key in raw]
+                    if keys:
+                        indexes["__class__"].extend(class_name, keys)
+                        for name in self._index_names(class_name):
+                            FileStorage.__unindexed[name] = class_name
+            for key, record in FileStorage.__objects.items():
+                self._index(key, record)
+            for key, record in raw.items():
+                if type(record) is not int:
+                    self._index(key, record)
+        return FileStorage.__indexes
+
+    def _index(self, key, record):
+        """Adds (or refreshes) an instance - or the raw dictionary of
+        a not yet materialized one - in every index of its class
+        """
+        indexes = self._indexes()
+        indexes["__class__"].add(key, record)
+        for name in self._index_names(self._value(record, "__class__")):
+            indexes[name].add(key, record)
+
+    def _index_names(self, class_name):
+        """Returns the names (in `__indexes`) of the attribute indexes
+        of the class `class_name`
+        """
+        names = FileStorage.__index_names.get(class_name)
+        if names is None:
+            names = [class_name + "." + attr for attr in (
+                FileStorage.__foreign_keys.get(class_name, ()) +
+                FileStorage.__sorted_attributes.get(class_name, ()))]
+            if class_name in FileStorage.__locations:
+                names.append(class_name + "." +
+                             ",".join(FileStorage.__locations[class_name]))
+            if class_name in FileStorage.__texts:
+                names.append("text:" + class_name)
+            FileStorage.__index_names[class_name] = names
+        return names
+
+    def _filled(self, name):
+        """Returns the index `name` of `__indexes` (or None), adding
+        first the mapped instances of its class if they were not
+        indexed yet. They are decoded once for all the attribute
+        indexes of the class, but text indexes, which keep what they
+        index until they are searched, are filled alone
+        """
+        indexes = self._indexes()
+        class_name = FileStorage.__unindexed.get(name)
+        if class_name is not None:
+            text = name.startswith("text:")
+            names = [other for other in self._index_names(class_name)
+                     if other.startswith("text:") == text and
+                     FileStorage.__unindexed.pop(other, None)]
+            for key in list(indexes["__class__"].get(class_name)):
+                record = self._record(key)
+                for other in names:
+                    indexes[other].add(key, record)
+        return indexes.get(name)
+
+    def _text(self, record, attrs):
+        """Returns the text indexed for an instance (or raw
+        dictionary): its string attributes `attrs`, joined
+        """
+        values = (self._value(record, attr) for attr in attrs)
+        return " ".join(value for value in values if isinstance(value, str))
+
+    def _texts_path(self):
+        """Returns the path of the saved text indexes"""
+        return FileStorage.__file_path + ".text"
+
+    def _save_texts(self):
+        """Saves the text indexes (registered to run at exit once
+        they are searched), if they changed and match `__file_path`:
+        every change is saved and the file was not changed by another
+        process. Journaled and sharded stores are not covered
+        """
+        stamp = self._disk_stamp()
+        if (
+            FileStorage.__journal or FileStorage.__shard_dir or
+            FileStorage.__texts_live is not FileStorage.__indexes or
+            FileStorage.__dirty or FileStorage.__save_pending or
+            stamp is None or stamp != FileStorage.__disk_stamp or
+            stamp == FileStorage.__texts_stamp
+        ):
+            return
+        indexes = FileStorage.__indexes
+        for class_name in FileStorage.__texts:
+            self._filled("text:" + class_name)
+        state = {"stamp": stamp, "texts": FileStorage.__texts,
+                 "indexes": {class_name: indexes["text:" + class_name].dump()
+                             for class_name in FileStorage.__texts}}
+        self._write_file(self._texts_path(), marshal.dumps(state))
+        FileStorage.__texts_stamp = stamp
+
+    def _load_texts(self):
+        """Loads the text indexes saved for the current version of
+        `__file_path`, if any (else they are rebuilt when searched)
+        """
+        try:
+            with open(self._texts_path(), "rb") as f:
+                # One read: marshal.load() reads a file in small pieces
+                state = marshal.loads(f.read())
+            if (
+                state["stamp"] != FileStorage.__disk_stamp or
+                state["texts"] != FileStorage.__texts
+            ):
+                return
+            indexes = self._indexes()
+            for class_name in FileStorage.__texts:
+                indexes["text:" + class_name].load(
+                        state["indexes"][class_name])
+                # Complete: the lazy mode needs not add the instances
+                FileStorage.__unindexed.pop("text:" + class_name, None)
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return
+        FileStorage.__texts_stamp = FileStorage.__disk_stamp
+        self._live_texts(indexes)
+
+    def _live_texts(self, indexes):
+        """Marks the text indexes of `indexes` as worth saving at exit
+        """
+        if FileStorage.__texts_live is None:
+            atexit.register(self._save_texts)
+        FileStorage.__texts_live = indexes
+
+    def _journal_path(self):
+        """Returns the path of the append-only journal"""
+        return FileStorage.__file_path + ".journal"
+
+    def _append_journal(self, dirty):
+        """Appends a `put` or `del` record for every instance
+        added, updated or deleted since the last save (`dirty`). The
+        cost only depends on the number of changed instances
+        """
+        if not dirty:
+            return
+
+        lines = []
+        for key, obj in list(dirty.items()):
+            if obj is None:
+                record = {"op": "del", "key": key}
+            else:
+                record = {"op": "put", "key": key, "obj": obj.to_dict()}
+            lines.append(json.dumps(record) + "\n")
+
+        journal_path = self._journal_path()
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            if FileStorage.__fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        if os.path.getsize(journal_path) > FileStorage.__journal_limit:
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """Moves the journal aside and folds it into the snapshot
+        in a background thread. New records go to a fresh journal
+        in the meantime
+        """
+        compactor = FileStorage.__compactor
+        if compactor is not None and compactor.is_alive():
+            return
+
+        compacting_path = self._journal_path() + ".compacting"
+        with FileStorage.__journal_lock:
+            # A leftover from an interrupted compaction is folded in
+            # first; the current journal is rotated on a later save
+            if not os.path.exists(compacting_path):
+                os.replace(self._journal_path(), compacting_path)
+
+        FileStorage.__compactor = threading.Thread(
+                target=self._compact, args=(compacting_path,))
+        FileStorage.__compactor.start()
+
+    def _compact(self, compacting_path):
+        """Writes snapshot + rotated journal to a new snapshot. Works
+        from the files only, so it never touches live instances
+        """
+        records = self._read_snapshot()
+        self._replay(compacting_path, records)
+        text = json.dumps(records)
+
+        with FileStorage.__journal_lock:
+            self._write_file(FileStorage.__file_path, text)
+            os.remove(compacting_path)
+
+    def _read_snapshot(self):
+        """Returns the dictionaries stored in `__file_path`"""
+        if not os.path.exists(FileStorage.__file_path):
+            return {}
+        with open(FileStorage.__file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _replay(self, journal_path, records):
+        """Applies the journal records in `journal_path`, in order,
+        to the dictionary `records`
+        """
+        if not os.path.exists(journal_path):
+            return
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-append
+                    break
+                if record["op"] == "put":
+                    records[record["key"]] = record["obj"]
+                else:
+                    records.pop(record["key"], None)
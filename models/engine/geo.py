@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""
+This module provides location searches over the storage, used by
+the console commands `<class_name>.near(...)` and
+`<class_name>.within(...)`, e.g.
+    near("Place", 48.8566, 2.3522, 5, limit=10)
+    within("Place", 48.80, 2.25, 48.90, 2.42)
+
+Instances are located by their `latitude` and `longitude`
+attributes, in degrees. The storage engine answers a bounding box
+from a spatial index when it has one (see the `box()` method of the
+engines); otherwise the instances of the class are scanned once, as
+a stream. Distances are great-circle distances, in kilometers
+"""
+import heapq
+import math
+from itertools import islice
+import models
+from models.engine.index import point
+
+# Mean radius of the Earth, in kilometers
+EARTH_RADIUS = 6371.0088
+
+
+def distance(latitude1, longitude1, latitude2, longitude2):
+    """Returns the great-circle distance in kilometers between two
+    locations given in degrees (haversine formula)
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = math.radians(longitude2 - longitude1) / 2
+    a = (math.sin(half_dphi) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounds(latitude, longitude, km):
+    """Returns the bounding box `(south, west, north, east)` of the
+    circle of radius `km` around a location (`west > east` when it
+    crosses the 180th meridian)
+    """
+    angle = km / EARTH_RADIUS
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        # A pole is in the circle: every longitude is
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    ratio = math.sin(angle) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return south, -180.0, north, 180.0
+    delta = math.degrees(math.asin(ratio))
+    west, east = longitude - delta, longitude + delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def near(class_name, latitude, longitude, km, limit=None, storage=None):
+    """Returns the `(obj, distance)` pairs of the instances of class
+    `class_name` at most `km` kilometers away from a location, nearest
+    first, at most `limit` of them. Raises ValueError if the location,
+    the radius or the limit is invalid
+    """
+    storage = storage if storage is not None else models.storage
+    center = point(latitude, longitude)
+    if center is None:
+        raise ValueError("Invalid location: {}, {}".format(
+            latitude, longitude))
+    if not isinstance(km, (int, float)) or not km >= 0:
+        raise ValueError("Invalid radius: {}".format(km))
+    _check_limit(limit)
+    found = []
+    for obj in _in_box(storage, class_name, *bounds(*center, km)):
+        km_away = distance(*center, *_location(obj))
+        if km_away <= km:
+            found.append((obj, km_away))
+    if limit is not None:
+        return heapq.nsmallest(max(limit, 0), found,
+                               key=lambda pair: pair[1])
+    return sorted(found, key=lambda pair: pair[1])
+
+
+def within(class_name, south, west, north, east, limit=None,
+           storage=None):
+    """Returns an iterator over the instances of class `class_name`
+    located in a bounding box, at most `limit` of them (`west > east`
+    for a box crossing the 180th meridian). Raises ValueError if the
+    box or the limit is invalid
+    """
+    storage = storage if storage is not None else models.storage
+    corners = point(south, west), point(north, east)
+    if None in corners or corners[0][0] > corners[1][0]:
+        raise ValueError("Invalid box: {}, {}, {}, {}".format(
+            south, west, north, east))
+    _check_limit(limit)
+    objs = _in_box(storage, class_name, *corners[0], *corners[1])
+    if limit is not None:
+        objs = islice(objs, max(limit, 0))
+    return objs
+
+
+def _check_limit(limit):
+    """Raises ValueError if `limit` is neither None nor an integer"""
+    if limit is not None and (
+            not isinstance(limit, int) or isinstance(limit, bool)):
+        raise ValueError("Invalid limit: {}".format(limit))
+
+
+def _in_box(storage, class_name, south, west, north, east):
+    """Returns an iterator over the instances of class `class_name`
+    in a bounding box, from the spatial index of `storage` if it has
+    one, else from a scan
+    """
+    found = storage.box(class_name, south, west, north, east)
+    if found is not None:
+        return iter(found.values())
+    return (obj for _, obj in storage.stream(class_name)
+            if _inside(_location(obj), south, west, north, east))
+
+
+def _location(obj):
+    """Returns the `(latitude, longitude)` of an instance, or None"""
+    return point(getattr(obj, "latitude", None),
+                 getattr(obj, "longitude", None))
+
+
+def _inside(location, south, west, north, east):
+    """Checks if a location (or None) is in a bounding box"""
+    if location is None:
+        return False
+    latitude, longitude = location
+    if not south <= latitude <= north:
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
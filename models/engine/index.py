@@ -0,0 +1,417 @@
+#!/usr/bin/python3
+"""
+This module provides the classes `Index`, `SortedIndex`,
+`GridIndex` and `TextIndex` used by `FileStorage` to find stored
+instances by the value of one of their attributes (or by their
+location, or the words of their text) without scanning every
+instance
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from operator import itemgetter
+
+_word = re.compile(r"\w+")
+# Words too common to tell documents apart, left out of `TextIndex`
+STOPWORDS = frozenset(
+        "a an and are as at be but by for from has have in is it its of "
+        "on or so that the this to was were with".split())
+# Free-text attributes of each class, indexed by `TextIndex` (by
+# `FileStorage`) and searched by `models/engine/text_search.py`
+TEXTS = {"Place": ("name", "description"), "Review": ("text",)}
+
+
+def tokenize(text):
+    """Returns the list of the words of `text`, case-folded, without
+    the `STOPWORDS`
+    """
+    return [word for word in _word.findall(text.casefold())
+            if word not in STOPWORDS]
+
+
+def point(latitude, longitude):
+    """Returns `(latitude, longitude)` as floats (numeric strings are
+    converted), or None if they are not valid coordinates in degrees
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None     # Out of range, or NaN
+
+
+class Index:
+    """Maps a value computed from each instance (its class name,
+    its id, a foreign key, ...) to the keys of the instances having it
+    """
+    def __init__(self, value_of):
+        """`value_of` is a function returning the indexed value
+        of an instance
+        """
+        self.value_of = value_of
+        self.__buckets = {}     # value -> {key: None}, in insertion order
+        self.__values = {}      # key -> value
+
+    def __len__(self):
+        """Returns the number of indexed instances"""
+        return len(self.__values)
+
+    def add(self, key, obj):
+        """Indexes (or re-indexes, if its value changed) the
+        instance `obj` stored under `key`
+        """
+        value = self.value_of(obj)
+        if key in self.__values:
+            if self.__values[key] == value:
+                return
+            self.remove(key)
+        self.__values[key] = value
+        self.__buckets.setdefault(value, {})[key] = None
+
+    def extend(self, value, keys):
+        """Indexes under `value` the instances stored under `keys`
+        (not indexed yet), without computing their values
+        """
+        self.__values.update(dict.fromkeys(keys, value))
+        self.__buckets.setdefault(value, {}).update(dict.fromkeys(keys))
+
+    def remove(self, key):
+        """Removes the instance stored under `key` from the index"""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        bucket = self.__buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.__buckets[value]
+
+    def get(self, value):
+        """Returns the keys of the instances having `value`, in the
+        order they were indexed
+        """
+        return self.__buckets.get(value, {}).keys()
+
+    def values(self):
+        """Returns the values of the indexed instances"""
+        return self.__buckets.keys()
+
+
+class SortedIndex:
+    """Keeps the instances sorted by a numeric value computed from
+    each of them (a price, a number of rooms, ...), to answer range
+    queries in logarithmic time plus the size of the result, and to
+    scan the instances in order (the first n of them in time n).
+    Instances without a numeric value are left out.
+    The values are kept in an array of floats and the keys in a list,
+    both sorted by (value, key). They are only sorted when first
+    queried, so that indexing a whole store costs one sort; later
+    changes are inserted in place
+    """
+    def __init__(self, value_of):
+        """`value_of` is a function returning the indexed value of
+        an instance (None when it has none)
+        """
+        self.value_of = value_of
+        self.__of = {}          # key -> value
+        self.__values = None    # array of the values, sorted
+        self.__keys = None      # keys in the order of `__values`
+
+    def __len__(self):
+        """Returns the number of indexed instances"""
+        return len(self.__of)
+
+    def add(self, key, obj):
+        """Indexes (or re-indexes, if its value changed) the
+        instance `obj` stored under `key`
+        """
+        value = self.value_of(obj)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = None
+        if value != value:
+            value = None    # NaN does not sort
+        old = self.__of.get(key)
+        if old is not None:
+            if old == value:
+                return
+            self.remove(key)
+        if value is None:
+            return
+        self.__of[key] = value
+        if self.__values is not None:
+            position = self.__position(value, key)
+            self.__values.insert(position, value)
+            self.__keys.insert(position, key)
+
+    def remove(self, key):
+        """Removes the instance stored under `key` from the index"""
+        value = self.__of.pop(key, None)
+        if value is None or self.__values is None:
+            return
+        position = self.__position(value, key)
+        del self.__values[position]
+        del self.__keys[position]
+
+    def get(self, value):
+        """Returns the keys of the instances having `value`"""
+        return self.range(value, value)
+
+    def range(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True, reverse=False):
+        """Returns the keys of the instances whose value is between
+        `low` and `high` (None: unbounded), sorted by value
+        (descending if `reverse`)
+        """
+        self.__sort()
+        values = self.__values
+        start, end = 0, len(values)
+        if low is not None:
+            find = bisect_left if low_inclusive else bisect_right
+            start = find(values, float(low))
+        if high is not None:
+            find = bisect_right if high_inclusive else bisect_left
+            end = find(values, float(high))
+        keys = self.__keys[start:end]
+        if reverse:
+            keys.reverse()
+        return keys
+
+    def scan(self, reverse=False, chunk=256):
+        """Yields the keys of the instances sorted by value (descending
+        if `reverse`), `chunk` at a time, without copying the index
+        """
+        self.__sort()
+        keys = self.__keys
+        if reverse:
+            for end in range(len(keys), 0, -chunk):
+                yield from reversed(keys[max(end - chunk, 0):end])
+        else:
+            for start in range(0, len(keys), chunk):
+                yield from keys[start:start + chunk]
+
+    def __sort(self):
+        """Sorts the instances indexed so far, the first time the
+        index is queried
+        """
+        if self.__values is None:
+            of = self.__of
+            # Stable sorts: by key, then by value
+            self.__keys = sorted(of)
+            self.__keys.sort(key=of.__getitem__)
+            self.__values = array("d", [of[key] for key in self.__keys])
+
+    def __position(self, value, key):
+        """Returns where (value, key) is, or goes, in the sorted
+        arrays: among the equal values, keys are sorted too
+        """
+        start = bisect_left(self.__values, value)
+        end = bisect_right(self.__values, value, start)
+        return bisect_left(self.__keys, key, start, end)
+
+
+class GridIndex:
+    """Buckets the instances by location, in cells of `cell` degrees
+    of latitude by `cell` degrees of longitude, to find the instances
+    in a bounding box by reading only the cells it overlaps.
+    Instances without valid coordinates are left out
+    """
+    def __init__(self, value_of, cell=0.1):
+        """`value_of` is a function returning the `(latitude,
+        longitude)` of an instance
+        """
+        self.value_of = value_of
+        self.cell = cell
+        self.__cells = {}       # (row, column) -> {key: None}
+        self.__of = {}          # key -> (latitude, longitude)
+
+    def __len__(self):
+        """Returns the number of indexed instances"""
+        return len(self.__of)
+
+    def add(self, key, obj):
+        """Indexes (or re-indexes, if it moved) the instance `obj`
+        stored under `key`
+        """
+        location = point(*self.value_of(obj))
+        old = self.__of.get(key)
+        if old is not None:
+            if old == location:
+                return
+            self.remove(key)
+        if location is None:
+            return
+        self.__of[key] = location
+        self.__cells.setdefault(self.__cell_of(*location), {})[key] = None
+
+    def remove(self, key):
+        """Removes the instance stored under `key` from the index"""
+        location = self.__of.pop(key, None)
+        if location is None:
+            return
+        cell = self.__cell_of(*location)
+        bucket = self.__cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.__cells[cell]
+
+    def box(self, south, west, north, east):
+        """Returns the keys of the instances whose latitude is between
+        `south` and `north` and longitude between `west` and `east`
+        (bounds included). A box with `west > east` crosses the
+        180th meridian
+        """
+        first_row, first_column = self.__cell_of(south, west)
+        last_row, last_column = self.__cell_of(north, east)
+        rows = range(first_row, last_row + 1)
+        if west <= east:
+            columns = [range(first_column, last_column + 1)]
+        else:
+            last = self.__cell_of(0, 180)[1]
+            columns = [range(first_column, last + 1),
+                       range(0, last_column + 1)]
+        size = len(rows) * sum(len(span) for span in columns)
+        if size > len(self.__cells):
+            # A large box: read the occupied cells instead
+            cells = [cell for cell in self.__cells if cell[0] in rows and
+                     any(cell[1] in span for span in columns)]
+        else:
+            cells = [(row, column) for row in rows
+                     for span in columns for column in span]
+        keys = []
+        for cell in cells:
+            for key in self.__cells.get(cell, ()):
+                latitude, longitude = self.__of[key]
+                if south <= latitude <= north and (
+                    west <= longitude <= east if west <= east else
+                    longitude >= west or longitude <= east
+                ):
+                    keys.append(key)
+        return keys
+
+    def __cell_of(self, latitude, longitude):
+        """Returns the `(row, column)` of the cell of a location"""
+        return (math.floor((latitude + 90) / self.cell),
+                math.floor((longitude + 180) / self.cell))
+
+
+class TextIndex:
+    """Maps the words of a text computed from each instance to the
+    keys of the instances containing them, with their number of
+    occurrences (an inverted index), and ranks the instances matching
+    a query with BM25.
+    Texts are only tokenized when the index is first queried, so that
+    indexing a whole store costs nothing until it is searched; later
+    changes are applied before each query
+    """
+    # BM25 parameters: saturation of the word counts, and weight of
+    # the length of the texts
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, value_of):
+        """`value_of` is a function returning the text of an instance
+        """
+        self.value_of = value_of
+        self.__postings = {}    # word -> {key: occurrences}
+        self.__words = {}       # key -> (word, ...)
+        self.__lengths = {}     # key -> number of words
+        self.__total = 0        # sum of `__lengths`
+        self.__pending = {}     # key -> instance not tokenized yet
+
+    def __len__(self):
+        """Returns the number of indexed instances"""
+        self.__update()
+        return len(self.__lengths)
+
+    def add(self, key, obj):
+        """Indexes (or re-indexes, if its text changed) the instance
+        `obj` stored under `key`
+        """
+        self.__pending[key] = obj
+
+    def remove(self, key):
+        """Removes the instance stored under `key` from the index"""
+        self.__pending.pop(key, None)
+        self.__unindex(key)
+
+    def search(self, text, limit=None):
+        """Returns the `(key, score)` pairs of the instances containing
+        words of `text`, best first, at most `limit` of them
+        """
+        self.__update()
+        count = len(self.__lengths)
+        if not count:
+            return []
+        average = self.__total / count
+        scores = {}
+        for word in set(tokenize(text)):
+            postings = self.__postings.get(word)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) /
+                           (len(postings) + 0.5))
+            for key, occurrences in postings.items():
+                norm = self.k1 * (1 - self.b + self.b *
+                                  self.__lengths[key] / average)
+                scores[key] = scores.get(key, 0) + idf * (
+                    occurrences * (self.k1 + 1) / (occurrences + norm))
+        if limit is not None:
+            return heapq.nlargest(max(limit, 0), scores.items(),
+                                  key=itemgetter(1))
+        return sorted(scores.items(), key=itemgetter(1), reverse=True)
+
+    def dump(self):
+        """Returns the state of the index (dictionaries, tuples,
+        strings and integers only), for `load()`
+        """
+        self.__update()
+        return {"postings": self.__postings, "words": self.__words,
+                "lengths": self.__lengths}
+
+    def load(self, state):
+        """Replaces the content of the index by a state returned by
+        `dump()`
+        """
+        self.__postings = state["postings"]
+        self.__words = state["words"]
+        self.__lengths = state["lengths"]
+        self.__total = sum(self.__lengths.values())
+        self.__pending = {}
+
+    @property
+    def pending(self):
+        """Checks if changes were not applied to the index yet"""
+        return bool(self.__pending)
+
+    def __update(self):
+        """Tokenizes the texts of the instances added or changed
+        since the last query
+        """
+        pending, self.__pending = self.__pending, {}
+        for key, obj in pending.items():
+            self.__unindex(key)
+            text = self.value_of(obj)
+            words = tokenize(text) if isinstance(text, str) else []
+            if not words:
+                continue
+            counts = Counter(words)
+            for word, occurrences in counts.items():
+                self.__postings.setdefault(word, {})[key] = occurrences
+            self.__words[key] = tuple(counts)
+            self.__lengths[key] = len(words)
+            self.__total += len(words)
+
+    def __unindex(self, key):
+        """Removes the words of the instance stored under `key`"""
+        for word in self.__words.pop(key, ()):
+            postings = self.__postings[word]
+            del postings[key]
+            if not postings:
+                del self.__postings[word]
+        self.__total -= self.__lengths.pop(key, 0)
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+"""
+This module provides `iter_items()`, which reads a JSON
+object from a file one member at a time so that a very large
+`file.json` never has to be held in memory as a whole, and
+`iter_spans()`, which also tells where each member is in the file
+"""
+import json
+import re
+import sys
+
+CHUNK_SIZE = 64 * 1024
+_whitespace = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+def iter_items(f, chunk_size=CHUNK_SIZE):
+    """Yields the `(key, value)` pairs of the top-level JSON object
+    stored in the text file `f`, in file order. Only the member
+    being decoded (plus one chunk) is kept in memory, and the names
+    in the object values are interned
+    """
+    for key, value, _, _ in iter_spans(f, chunk_size):
+        yield key, value
+
+
+def iter_spans(f, chunk_size=CHUNK_SIZE):
+    """Yields the `(key, value, start, end)` tuples of the members of
+    the top-level JSON object stored in the text file `f`, as
+    `iter_items()` does, with the position of the `"<key>": <value>`
+    text in the file: `start` and `end` count UTF-8 bytes, so `f`
+    must not translate newlines (`newline=""`)
+    """
+    reader = _Reader(f, chunk_size)
+    if reader.token() != "{":
+        raise ValueError("Expecting '{' at the start of the document")
+    reader.advance(1)
+    if reader.token() == "}":
+        return
+    while True:
+        reader.skip_whitespace()
+        start = reader.offset
+        key = reader.decode()
+        if not isinstance(key, str):
+            raise ValueError("Expecting a string key")
+        if reader.token() != ":":
+            raise ValueError("Expecting ':' after key {!r}".format(key))
+        reader.advance(1)
+        value = reader.decode()
+        if type(value) is dict:
+            # The decoder makes new strings for the member names of
+            # every object: records share one copy of each instead
+            value = {sys.intern(name): item for name, item in value.items()}
+        yield key, value, start, reader.offset
+        token = reader.token()
+        reader.advance(1)
+        if token == "}":
+            return
+        if token != ",":
+            raise ValueError("Expecting ',' or '}}' after {!r}".format(key))
+
+
+class _Reader:
+    """A read buffer over a text file that decodes one JSON value
+    at a time, reading more of the file only when needed
+    """
+    def __init__(self, f, chunk_size):
+        """Starts reading the file `f` by chunks of `chunk_size`"""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # Position of `pos` in the file, in UTF-8 bytes, and whether
+        # the chunks read so far were all ASCII (one byte per character)
+        self.offset = 0
+        self.ascii = True
+
+    def fill(self):
+        """Reads one more chunk, dropping what was already decoded.
+        Returns False at the end of the file
+        """
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.ascii = self.ascii and chunk.isascii()
+        return True
+
+    def skip_whitespace(self):
+        """Moves past whitespace, reading more of the file if needed"""
+        while True:
+            end = _whitespace.match(self.buf, self.pos).end()
+            self.offset += end - self.pos
+            self.pos = end
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def token(self):
+        """Returns the next non-whitespace character ('' at the end)"""
+        self.skip_whitespace()
+        return self.buf[self.pos:self.pos + 1]
+
+    def advance(self, size):
+        """Moves past `size` ASCII characters"""
+        self.pos += size
+        self.offset += size
+
+    def decode(self):
+        """Decodes and returns the next JSON value"""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                # Value cut by the end of the buffer
+                if not self.fill():
+                    raise
+                continue
+            # A number may continue in the next chunk
+            if end < len(self.buf) or self.eof or not self.fill():
+                if self.ascii:
+                    self.offset += end - self.pos
+                else:
+                    self.offset += len(
+                            self.buf[self.pos:end].encode("utf-8"))
+                self.pos = end
+                return value
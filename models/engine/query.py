@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+"""
+This module provides a small query engine over the storage, used by
+the console command `<class_name>.where(...)`, e.g.
+    where("Place", "price_by_night < 100 and max_guest >= 4",
+          order_by="-price_by_night", fields="name,price_by_night")
+
+A condition is a Python expression made of comparisons (`==`, `!=`,
+`<`, `<=`, `>`, `>=`, `in`, `not in`) between an attribute and a
+literal, joined by `and`; `"<value>" in <attribute>` tests a list
+attribute (e.g. `amenity_ids`). The storage engine answers a condition
+from an index when it has one (see the `select()` method of the
+engines); otherwise the instances of the class are scanned once, as a
+stream. Sorting by one attribute with a sorted index (see `ordered()`)
+reads the instances in that order instead
+"""
+import ast
+import heapq
+import operator
+from itertools import islice
+import models
+
+_operators = {
+        ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=",
+        ast.Gt: ">", ast.GtE: ">=", ast.In: "in", ast.NotIn: "not in"
+        }
+# `100 > price` is `price < 100`
+_reversed = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<",
+             ">=": "<="}
+_compare = {
+        "==": operator.eq, "!=": operator.ne, "<": operator.lt,
+        "<=": operator.le, ">": operator.gt, ">=": operator.ge
+        }
+# Conditions tried first when looking for an index to answer one
+_selectivity = ("==", "in", "contains", "<", "<=", ">", ">=")
+
+
+def parse(condition):
+    """Returns the `(attribute, operator, value)` predicates of the
+    expression `condition`. Raises ValueError if it is not made of
+    comparisons between an attribute and a literal joined by `and`
+    """
+    try:
+        tree = ast.parse(condition.strip() or "True", mode="eval").body
+    except SyntaxError:
+        raise ValueError("Invalid condition: {}".format(condition))
+    if isinstance(tree, ast.Constant) and tree.value is True:
+        return []
+    nodes = tree.values if (isinstance(tree, ast.BoolOp) and
+                            isinstance(tree.op, ast.And)) else [tree]
+    predicates = []
+    for node in nodes:
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+            raise ValueError("Invalid condition: {}".format(
+                ast.unparse(node)))
+        op = _operators.get(type(node.ops[0]))
+        left, right = node.left, node.comparators[0]
+        if isinstance(right, ast.Name) and op in _reversed:
+            left, right, op = right, left, _reversed[op]
+        elif isinstance(right, ast.Name) and op in ("in", "not in"):
+            # "<value>" in <attribute>
+            left, right = right, left
+            op = "contains" if op == "in" else "not contains"
+        if op is None or not isinstance(left, ast.Name):
+            raise ValueError("Invalid condition: {}".format(
+                ast.unparse(node)))
+        try:
+            value = ast.literal_eval(right)
+        except ValueError:
+            raise ValueError("Not a literal: {}".format(ast.unparse(right)))
+        predicates.append((left.id, op, value))
+    return predicates
+
+
+def equal(actual, expected):
+    """Checks if an attribute value equals `expected` the way a `==`
+    condition does (as used by the `count()` method of the engines)
+    """
+    return _test(actual, "==", expected)
+
+
+def matches(obj, predicates):
+    """Checks if the instance `obj` satisfies every predicate"""
+    return all(_test(getattr(obj, attr, None), op, value)
+               for attr, op, value in predicates)
+
+
+def where(class_name, condition="", order_by=None, fields=None,
+          limit=None, storage=None):
+    """Returns an iterator over the instances of class `class_name`
+    matching the expression `condition` (ValueError if it is invalid),
+    sorted by the attributes of `order_by` (a comma-separated string
+    or a list; `-name` for descending), at most `limit` of them. With
+    `fields` (a comma-separated string or a list), it yields
+    `{field: value}` dictionaries instead
+    """
+    storage = storage if storage is not None else models.storage
+    predicates = parse(condition)
+    keys = _names(order_by)
+    candidates = _candidates(storage, class_name, predicates)
+    ordered = None
+    if candidates is None and len(keys) == 1:
+        # Read in the order of a sorted index instead of sorting
+        ordered = storage.ordered(class_name, keys[0].lstrip("-"),
+                                  keys[0].startswith("-"))
+    if ordered is not None:
+        objs = (obj for obj in ordered if matches(obj, predicates))
+    else:
+        if candidates is None:
+            candidates = (obj for _, obj in storage.stream(class_name))
+        objs = (obj for obj in candidates if matches(obj, predicates))
+        if keys:
+            objs = _sort(objs, keys, limit)
+    if limit is not None:
+        objs = islice(objs, max(limit, 0))
+    fields = _names(fields)
+    if fields:
+        return ({field: getattr(obj, field, None) for field in fields}
+                for obj in objs)
+    return objs
+
+
+def _candidates(storage, class_name, predicates):
+    """Returns the instances an index of `storage` gives for the most
+    selective predicate it can answer (a lower and an upper bound of
+    the same attribute first), or None if it answers none
+    """
+    low, high = {}, {}
+    for attr, op, value in predicates:
+        if op in (">", ">="):
+            low.setdefault(attr, value)
+        elif op in ("<", "<="):
+            high.setdefault(attr, value)
+    for attr in low.keys() & high.keys():
+        # Both bounds at once; the strict ones are checked by matches()
+        found = storage.select(class_name, attr, "between",
+                               (low[attr], high[attr]))
+        if found is not None:
+            return found.values()
+    for wanted in _selectivity:
+        for attr, op, value in predicates:
+            if op == wanted:
+                found = storage.select(class_name, attr, op, value)
+                if found is not None:
+                    return found.values()
+    return None
+
+
+def _test(actual, op, expected):
+    """Compares an attribute value with a predicate value. Numbers
+    stored as strings (as `update` stores them) compare as numbers;
+    values that cannot be compared do not match
+    """
+    if op in ("contains", "not contains"):
+        try:
+            found = expected in actual
+        except TypeError:
+            return False
+        return found if op == "contains" else not found
+    if op in ("in", "not in"):
+        try:
+            found = any(_test(actual, "==", item) for item in expected)
+        except TypeError:
+            return False
+        return found if op == "in" else not found
+    if (
+        isinstance(expected, (int, float)) and
+        not isinstance(expected, bool) and isinstance(actual, str)
+    ):
+        try:
+            actual = float(actual)
+        except ValueError:
+            return op == "!="
+    try:
+        return _compare[op](actual, expected)
+    except TypeError:
+        return False
+
+
+def _names(names):
+    """Returns the list of the names in `names` (a comma-separated
+    string or a list)
+    """
+    if not names:
+        return []
+    if isinstance(names, str):
+        names = names.split(",")
+    return [name.strip() for name in names if name.strip()]
+
+
+def _sort_key(value):
+    """Orders values of mixed types: numbers, then strings, then the
+    others (by their string), then missing values
+    """
+    if value is None:
+        return (3, "")
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        try:
+            return (0, float(value))
+        except ValueError:
+            return (1, value)
+    return (2, str(value))
+
+
+def _sort(objs, keys, limit):
+    """Returns the instances sorted by the attributes `keys` (`-name`
+    for descending). With a `limit` and one key, only the first
+    `limit` instances are kept while sorting
+    """
+    if len(keys) == 1 and limit is not None:
+        attr = keys[0].lstrip("-")
+        if keys[0].startswith("-"):
+            pick = heapq.nlargest
+        else:
+            pick = heapq.nsmallest
+        return iter(pick(max(limit, 0), objs,
+                         key=lambda obj: _sort_key(getattr(obj, attr,
+                                                           None))))
+    objs = list(objs)
+    # Stable sorts, from the last key to the first
+    for key in reversed(keys):
+        attr = key.lstrip("-")
+        objs.sort(key=lambda obj: _sort_key(getattr(obj, attr, None)),
+                  reverse=key.startswith("-"))
+    return iter(objs)
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""
+This module provides `RecordMap`, which lets the lazy mode of
+`FileStorage` start without decoding the storage file: the file is
+mapped in memory, and a record is only decoded, from its position,
+when it is needed.
+
+The positions of the records are saved next to the file, in
+`<file>.keys` (see `save_keys()`), for the version of the file they
+describe. When that file is missing or stale, the storage file is
+scanned once, then the positions are saved for the next start
+"""
+import json
+import marshal
+import mmap
+import os
+from array import array
+from models.engine import binary_format
+from models.engine.json_stream import iter_spans
+
+# Size in bytes of a saved position
+_size = array("q").itemsize
+_decoder = json.JSONDecoder()
+
+
+class RecordMap:
+    """The records of a storage file (JSON or binary), by class, with
+    the position of each in the mapped file. Records are numbered
+    from 0, class after class
+    """
+    def __init__(self, data, stamp, layout):
+        """Describes the file `data` (an `mmap`, or bytes), version
+        `stamp`, from its `layout` (see `save_keys()`)
+        """
+        self.data = data
+        self.stamp = stamp
+        self.format = layout["format"]
+        self.names = layout["names"]
+        self.classes = {}       # class name -> (first number, keys)
+        self.starts = array("q")
+        self.ends = array("q")
+        for class_name, (keys, starts, ends) in layout["classes"].items():
+            self.classes[class_name] = (len(self.starts), keys)
+            self.starts.frombytes(starts)
+            self.ends.frombytes(ends)
+
+    def record(self, number):
+        """Returns the `(key, dictionary)` pair of record `number`"""
+        start = self.starts[number]
+        if self.format == "binary":
+            return binary_format.Decoder(self.data, start).record(
+                    self.names)
+        member = self.data[start:self.ends[number]].decode("utf-8")
+        return next(iter(_decoder.decode("{" + member + "}").items()))
+
+    def fragment(self, number):
+        """Returns record `number` as it is stored: a `"<key>": {...}`
+        JSON member (text), or a binary record (bytes, using the name
+        table `names`)
+        """
+        data = self.data[self.starts[number]:self.ends[number]]
+        return data if self.format == "binary" else data.decode("utf-8")
+
+
+def open_map(path):
+    """Maps the storage file `path` and returns its `RecordMap`, from
+    the positions saved in `<path>.keys` if they describe this version
+    of the file, else from a scan of the file (saved for next time)
+    """
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stat.st_size and os.name != "nt":
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # Windows cannot replace a mapped file, as `save()` does
+            data = f.read()
+    layout = _load_keys(path, stamp)
+    if layout is None:
+        layout = _scan(path, data)
+        try:
+            _write_keys(path, stamp, layout)
+        except OSError:
+            pass    # Read-only directory: scanned again next time
+    return RecordMap(data, stamp, layout)
+
+
+def save_keys(path, stamp, file_format, names, items):
+    """Saves the positions of the records of the storage file `path`,
+    version `stamp`, just written from the `(key, record)` pairs
+    `items` (in file order, as `"<key>": {...}` JSON members joined
+    by ", ", or as binary records with the name table `names`)
+    """
+    if file_format == "binary":
+        position = len(binary_format.Encoder(names).header())
+        separator = 0
+    else:
+        position = len("{")
+        separator = len(", ")
+    spans = {}
+    for key, record in items:
+        if file_format == "binary" or record.isascii():
+            size = len(record)
+        else:
+            size = len(record.encode("utf-8"))
+        _add_span(spans, key.split(".", 1)[0], key, position,
+                  position + size)
+        position += size + separator
+    _write_keys(path, stamp, _layout(file_format, names, spans))
+
+
+def _scan(path, data):
+    """Returns the layout of the storage file `path` (mapped as
+    `data`), read record by record. Records whose `__class__` is
+    not a string are left out
+    """
+    spans = {}
+    if binary_format.is_binary(data[:len(binary_format.MAGIC)]):
+        decoder = binary_format.Decoder(data, len(binary_format.MAGIC))
+        names = [decoder.str() for _ in range(decoder.uint())]
+        while decoder.pos < len(data):
+            start = decoder.pos
+            key, record = decoder.record(names)
+            _add_span(spans, record.get("__class__"), key, start,
+                      decoder.pos)
+        return _layout("binary", names, spans)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for key, record, start, end in iter_spans(f):
+            _add_span(spans, record.get("__class__"), key, start, end)
+    return _layout("json", [], spans)
+
+
+def _add_span(spans, class_name, key, start, end):
+    """Adds the position of the record stored under `key` to the
+    `spans` of its class
+    """
+    if isinstance(class_name, str):
+        keys, starts, ends = spans.setdefault(
+                class_name, ([], array("q"), array("q")))
+        keys.append(key)
+        starts.append(start)
+        ends.append(end)
+
+
+def _layout(file_format, names, spans):
+    """Returns the layout of a file, as saved in `<file>.keys`"""
+    return {"format": file_format, "names": list(names),
+            "classes": {class_name: (keys, starts.tobytes(), ends.tobytes())
+                        for class_name, (keys, starts, ends)
+                        in spans.items()}}
+
+
+def _keys_path(path):
+    """Returns the path of the saved positions of the file `path`"""
+    return path + ".keys"
+
+
+def _write_keys(path, stamp, layout):
+    """Saves `layout` for the version `stamp` of the file `path`,
+    replacing `<path>.keys` atomically
+    """
+    tmp_path = _keys_path(path) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(marshal.dumps(dict(layout, stamp=stamp)))
+    os.replace(tmp_path, _keys_path(path))
+
+
+def _load_keys(path, stamp):
+    """Returns the layout saved for the version `stamp` of the file
+    `path`, or None
+    """
+    try:
+        with open(_keys_path(path), "rb") as f:
+            # One read: marshal.load() reads a file in small pieces
+            layout = marshal.loads(f.read())
+        if layout["stamp"] != stamp:
+            return None
+        for keys, starts, ends in layout["classes"].values():
+            if not len(keys) * _size == len(starts) == len(ends):
+                return None
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        return None
+    return layout
@@ -0,0 +1,401 @@
+#!/usr/bin/python3
+"""
+This module provides read-only snapshots of the store, for the
+processes that only read it (e.g. `all`, `count` and `show`), and
+the `SnapshotStorage` engine that serves them
+(`HBNB_TYPE_STORAGE=snapshot`). A snapshot is written from the
+storage file with:
+    python3 -m models.engine.snapshot file.json file.snapshot
+
+A snapshot is memory-mapped instead of loaded: readers share the
+pages of the file in the OS page cache, start without reading it,
+and only decode the instances a command asks for. The file holds:
+    MAGIC | id width, table size | table (JSON) | index | records
+The table lists the names used by the records (see `binary_format`)
+and, for each class, the position and size of its entries in the
+index. The index has one fixed-width entry (id, offset of the record)
+per instance, sorted by class and id, so that an instance is found
+with a binary search
+"""
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from contextlib import contextmanager
+from models.engine import binary_format, query
+from models.engine.json_stream import iter_items
+from models.base_model import classes
+
+MAGIC = b"HBNBSNP1"
+_header = struct.Struct("<II")
+
+
+def write_snapshot(path, items):
+    """Writes the snapshot of the `(key, dictionary)` pairs `items`
+    to `path`. The file is replaced atomically, so readers that still
+    map the previous version keep reading it
+    """
+    by_class = {}
+    for key, record in items:
+        class_name, obj_id = key.split(".", 1)
+        if class_name in classes:
+            by_class.setdefault(class_name, []).append(
+                    (obj_id.encode("utf-8"), record))
+
+    encoder = binary_format.Encoder()
+    width = max((len(obj_id) for records in by_class.values()
+                 for obj_id, _ in records), default=0)
+    entry = struct.Struct("<{}sQ".format(width))
+    index = bytearray()
+    chunks = []
+    offset = 0
+    class_table = []
+    for class_name in sorted(by_class):
+        records = sorted(by_class[class_name], key=lambda r: r[0])
+        class_table.append([class_name, len(index) // entry.size,
+                            len(records)])
+        for obj_id, record in records:
+            chunk = encoder.record(
+                    "{}.{}".format(class_name, obj_id.decode("utf-8")),
+                    record)
+            index += entry.pack(obj_id, offset)
+            chunks.append(chunk)
+            offset += len(chunk)
+    table = json.dumps({"names": encoder.names,
+                        "classes": class_table}).encode("utf-8")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_header.pack(width, len(table)))
+        f.write(table)
+        f.write(index)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file, opened read-only"""
+    def __init__(self, path):
+        """Maps the snapshot `path` and reads its table"""
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.stamp = (stat.st_ino, stat.st_mtime_ns)
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.__map
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a snapshot file: {}".format(path))
+        start = len(MAGIC) + _header.size
+        width, table_size = _header.unpack_from(data, len(MAGIC))
+        table = json.loads(data[start:start + table_size])
+        self.__names = table["names"]
+        # class name -> (first entry, number of entries)
+        self.classes = {name: (first, count)
+                        for name, first, count in table["classes"]}
+        self.__width = width
+        self.__entry = struct.Struct("<{}sQ".format(width))
+        self.__index = start + table_size
+        self.__records = self.__index + self.__entry.size * sum(
+                count for _, count in self.classes.values())
+
+    def close(self):
+        """Unmaps the file"""
+        self.__map.close()
+
+    def count(self, class_name):
+        """Returns the number of instances of `class_name`"""
+        return self.classes.get(class_name, (0, 0))[1]
+
+    def ids(self, class_name, after=None):
+        """Yields the ids of the instances of `class_name`, in order,
+        with the position of their record. With `after`, starts after
+        that id
+        """
+        first, count = self.classes.get(class_name, (0, 0))
+        if after is not None:
+            entry = self._search(class_name, after)
+            if entry is None:
+                return
+            first, count = entry + 1, first + count - entry - 1
+        for i in range(first, first + count):
+            obj_id, offset = self.__entry.unpack_from(
+                    self.__map, self.__index + i * self.__entry.size)
+            yield (obj_id.rstrip(b"\0").decode("utf-8"),
+                   self.__records + offset)
+
+    def find(self, class_name, obj_id):
+        """Returns the position of the record of the instance of
+        `class_name` with id `obj_id`, or None
+        """
+        entry = self._search(class_name, obj_id)
+        if entry is None:
+            return None
+        return self.__records + self.__entry.unpack_from(
+                self.__map, self.__index + entry * self.__entry.size)[1]
+
+    def _search(self, class_name, obj_id):
+        """Returns the number of the index entry of the instance of
+        `class_name` with id `obj_id` (by binary search), or None
+        """
+        first, count = self.classes.get(class_name, (0, 0))
+        target = obj_id.encode("utf-8")
+        if len(target) > self.__width:
+            return None
+        target = target.ljust(self.__width, b"\0")
+        entry = self.__entry
+        low, high = first, first + count
+        while low < high:
+            middle = (low + high) // 2
+            found = entry.unpack_from(
+                    self.__map, self.__index + middle * entry.size)[0]
+            if found < target:
+                low = middle + 1
+            elif found > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def instance(self, class_name, position):
+        """Decodes the record at `position` into an instance"""
+        _, record = binary_format.Decoder(
+                self.__map, position).record(self.__names)
+        return classes[class_name](**record)
+
+
+class _View(Mapping):
+    """Read-only `{key: obj}` mapping over the instances of some
+    classes of a snapshot. Instances are decoded when accessed, and
+    its length comes from the class table
+    """
+    def __init__(self, snapshot, class_names):
+        """Views the instances of `class_names` in `snapshot`"""
+        self.__snapshot = snapshot
+        self.__class_names = [name for name in class_names
+                              if snapshot.count(name)]
+
+    def __len__(self):
+        """Returns the number of instances, without decoding them"""
+        return sum(self.__snapshot.count(name)
+                   for name in self.__class_names)
+
+    def __iter__(self):
+        """Yields the keys"""
+        for class_name in self.__class_names:
+            for obj_id, _ in self.__snapshot.ids(class_name):
+                yield class_name + "." + obj_id
+
+    def __getitem__(self, key):
+        """Returns the instance stored under `key`, decoded from the
+        snapshot
+        """
+        class_name, _, obj_id = key.partition(".")
+        position = None
+        if class_name in self.__class_names:
+            position = self.__snapshot.find(class_name, obj_id)
+        if position is None:
+            raise KeyError(key)
+        return self.__snapshot.instance(class_name, position)
+
+
+class SnapshotStorage:
+    """The class `SnapshotStorage` serves the snapshot `__path`
+    read-only. Nothing is kept in memory but the mapping of the file:
+    every lookup decodes the instance again. `refresh()` maps the
+    file again once a new snapshot replaced it
+    """
+    __path = os.getenv("HBNB_SNAPSHOT_PATH", "file.snapshot")
+    __snapshot = None
+
+    def all(self):
+        """Returns a read-only mapping `{key: obj}` of all instances"""
+        return self._view(list(classes))
+
+    def new(self, obj):
+        """Snapshots are read-only"""
+        raise PermissionError("The snapshot storage is read-only")
+
+    def mark_dirty(self, obj, attr=None):
+        """Does nothing: the snapshot owns no instance (every lookup
+        decodes a new one), so changing one only changes that copy;
+        `save()` refuses to store it
+        """
+        pass
+
+    def delete(self, obj):
+        """Snapshots are read-only"""
+        raise PermissionError("The snapshot storage is read-only")
+
+    def save(self):
+        """Snapshots are read-only"""
+        raise PermissionError("The snapshot storage is read-only")
+
+    def flush(self):
+        """Nothing is ever written"""
+        pass
+
+    def refresh(self):
+        """Maps the snapshot again if a new one replaced it. Costs one
+        `stat()` when nothing changed
+        """
+        try:
+            stat = os.stat(SnapshotStorage.__path)
+        except OSError:
+            return
+        snapshot = SnapshotStorage.__snapshot
+        if snapshot is None or snapshot.stamp != (stat.st_ino,
+                                                  stat.st_mtime_ns):
+            self.reload()
+
+    @contextmanager
+    def batch(self):
+        """Nothing is ever written: only runs the block"""
+        yield self
+
+    def reload(self):
+        """Maps the snapshot file (if it exists)"""
+        # The previous mapping is closed once the views still using
+        # it are gone
+        SnapshotStorage.__snapshot = None
+        if os.path.exists(SnapshotStorage.__path):
+            SnapshotStorage.__snapshot = Snapshot(SnapshotStorage.__path)
+
+    def get(self, class_name, obj_id):
+        """Returns the instance of class `class_name` with id
+        `obj_id`, or None
+        """
+        snapshot = SnapshotStorage.__snapshot
+        if snapshot is None or class_name not in classes:
+            return None
+        position = snapshot.find(class_name, obj_id)
+        if position is None:
+            return None
+        return snapshot.instance(class_name, position)
+
+    def by_class(self, class_name):
+        """Returns a read-only mapping `{key: obj}` of the instances
+        of class `class_name`; its length costs no decoding
+        """
+        return self._view([class_name] if class_name in classes else [])
+
+    def by_id(self, obj_id):
+        """Returns a dictionary `{key: obj}` of the instances with
+        id `obj_id`, whatever their class
+        """
+        objs = {}
+        for class_name in classes:
+            obj = self.get(class_name, obj_id)
+            if obj is not None:
+                objs[class_name + "." + obj_id] = obj
+        return objs
+
+    def lookup(self, class_name, attr, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` equals `value`
+        (snapshots have no secondary index: the class is scanned)
+        """
+        return {key: obj for key, obj in self.stream(class_name)
+                if getattr(obj, attr, None) == value}
+
+    def select(self, class_name, attr, op, value):
+        """Returns a dictionary `{key: obj}` of the instances of
+        class `class_name` whose attribute `attr` compares to `value`
+        with `op` (see `models/engine/query.py`) if the index of the
+        snapshot answers it (`id` with `==` or `in`), else None
+        """
+        if attr != "id" or op not in ("==", "in"):
+            return None
+        if op == "in" and not isinstance(value, (list, tuple, set)):
+            return {}
+        objs = {}
+        for value in [value] if op == "==" else value:
+            obj = self.get(class_name, value) if isinstance(
+                    value, str) else None
+            if obj is not None:
+                objs[class_name + "." + value] = obj
+        return objs
+
+    def ordered(self, class_name, attr, reverse=False):
+        """There is no sorted index here: returns None"""
+        return None
+
+    def box(self, class_name, south, west, north, east):
+        """There is no spatial index here: returns None"""
+        return None
+
+    def search(self, class_name, text, limit=None):
+        """There is no text index here: returns None"""
+        return None
+
+    def count(self, class_name, **filters):
+        """Returns the number of instances of class `class_name`
+        whose attributes equal `filters`: read from the class table,
+        or counted by a scan when filtered
+        """
+        snapshot = SnapshotStorage.__snapshot
+        if snapshot is None or class_name not in classes:
+            return 0
+        if not filters:
+            return snapshot.count(class_name)
+        return sum(1 for _, obj in self.stream(class_name)
+                   if all(query.equal(getattr(obj, attr, None), value)
+                          for attr, value in filters.items()))
+
+    def stream(self, class_name=None, after=None):
+        """Yields the `(key, obj)` pairs of the instances of class
+        `class_name` (of every class if None) one at a time, by class
+        then by id, starting after the key `after` if given (found by
+        binary search)
+        """
+        snapshot = SnapshotStorage.__snapshot
+        if snapshot is None:
+            return
+        names = [class_name] if class_name is not None else sorted(
+                snapshot.classes)
+        for name in names:
+            if name not in classes:
+                continue
+            cursor = None
+            if after is not None:
+                if not after.startswith(name + "."):
+                    continue    # The cursor is in a later class
+                cursor = after.split(".", 1)[1]
+                after = None
+            for obj_id, position in snapshot.ids(name, cursor):
+                yield name + "." + obj_id, snapshot.instance(name, position)
+
+    def _view(self, class_names):
+        """Returns the `_View` of `class_names` (empty if there is no
+        snapshot)
+        """
+        if SnapshotStorage.__snapshot is None:
+            return {}
+        return _View(SnapshotStorage.__snapshot, class_names)
+
+
+def _read_store(path):
+    """Returns the `(key, dictionary)` pairs of the storage file
+    `path`, in JSON or in the binary format
+    """
+    with open(path, "rb") as f:
+        if binary_format.is_binary(f.peek(len(binary_format.MAGIC))):
+            return list(binary_format.iter_items(f))
+        return list(iter_items(io.TextIOWrapper(f, encoding="utf-8")))
+
+
+def main(argv):
+    """Writes the snapshot of a storage file"""
+    if len(argv) != 3:
+        print("Usage: python3 -m models.engine.snapshot "
+              "<storage file> <snapshot>")
+        return 1
+    write_snapshot(argv[2], _read_store(argv[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
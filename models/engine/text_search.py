@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""
+This module provides full-text search over the storage, used by the
+console command `<class_name>.search(...)`, e.g.
+    search("Review", "quiet clean flat", limit=10)
+
+The text of a Place is its `name` and `description`, the text of a
+Review its `text` (see `TEXTS`). Words are case-folded and common
+English words left out (both in `models/engine/index.py`); an
+instance matches if it contains any word of the query, and the
+matches are ranked with BM25, so that rare words and instances
+containing several of the words come first. The storage engine
+answers from its inverted index when it has one (see the `search()`
+method of the engines); otherwise the instances of the class are
+indexed for the query, as a stream
+"""
+import models
+from models.engine.index import TEXTS, TextIndex
+
+
+def search(class_name, text, limit=None, storage=None):
+    """Returns the `(obj, score)` pairs of the instances of class
+    `class_name` matching the words of `text`, best first, at most
+    `limit` of them. Raises ValueError if the class has no text
+    """
+    storage = storage if storage is not None else models.storage
+    if class_name not in TEXTS:
+        raise ValueError("{} has no text to search".format(class_name))
+    found = storage.search(class_name, text, limit)
+    if found is not None:
+        return found
+    objs = {}
+    index = TextIndex(lambda obj: " ".join(
+        value for value in (getattr(obj, attr, None)
+                            for attr in TEXTS[class_name])
+        if isinstance(value, str)))
+    for key, obj in storage.stream(class_name):
+        objs[key] = obj
+        index.add(key, obj)
+    return [(objs[key], score) for key, score in index.search(text, limit)]
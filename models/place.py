@@ -3,6 +3,7 @@
 This module provides the class `Place` which inherits
 from the class `BaseModel`
 """
+import models
 from models.base_model import BaseModel
 
 
@@ -21,3 +22,20 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    @property
+    def reviews(self):
+        """Returns the list of the reviews of the place, from the
+        `place_id` index of the storage
+        """
+        return list(models.storage.lookup("Review", "place_id",
+                                          self.id).values())
+
+    @property
+    def amenities(self):
+        """Returns the list of the amenities listed in `amenity_ids`
+        (ids of deleted amenities are skipped)
+        """
+        amenities = (models.storage.get("Amenity", amenity_id)
+                     for amenity_id in self.amenity_ids)
+        return [amenity for amenity in amenities if amenity is not None]
@@ -3,6 +3,7 @@
 This module provides the class `State` which inherits
 from the class `BaseModel`
 """
+import models
 from models.base_model import BaseModel
 
 
@@ -11,3 +12,11 @@ class State(BaseModel):
     creates a sate
     """
     name = ""
+
+    @property
+    def cities(self):
+        """Returns the list of the cities of the state, from the
+        `state_id` index of the storage
+        """
+        return list(models.storage.lookup("City", "state_id",
+                                          self.id).values())
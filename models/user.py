@@ -3,6 +3,7 @@
 This module provides the class `User` which inherits
 from the class `BaseModel`
 """
+import models
 from models.base_model import BaseModel
 
 
@@ -14,3 +15,11 @@ class User(BaseModel):
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def places(self):
+        """Returns the list of the places owned by the user, from the
+        `user_id` index of the storage
+        """
+        return list(models.storage.lookup("Place", "user_id",
+                                          self.id).values())
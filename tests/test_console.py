@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for `console.py`.
+"""
+import os
+import unittest
+from io import StringIO
+from unittest import mock
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class TestHBNBCommand_update(unittest.TestCase):
+    """Provides test methods for the `update` command
+    """
+    def setUp(self):
+        """Create a Place to update, keeping any existing file.json
+        """
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.place = Place()
+
+    def tearDown(self):
+        """Restore the file.json of before the test
+        """
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def run_command(self, line):
+        """Run `line` in the console and return its output"""
+        with mock.patch("sys.stdout", new=StringIO()) as out:
+            console = HBNBCommand()
+            console.onecmd(console.precmd(line))
+        return out.getvalue().strip()
+
+    def test_update(self):
+        """Check that an attribute is set"""
+        self.run_command("update Place {} name Loft".format(self.place.id))
+        self.assertEqual(self.place.name, "Loft")
+
+    def test_update_property(self):
+        """Check that read-only properties and methods are refused"""
+        for attr in ("reviews", "amenities", "save"):
+            self.assertEqual(
+                    self.run_command("update Place {} {} 5".format(
+                        self.place.id, attr)),
+                    "** {} can't be updated **".format(attr))
+        self.assertEqual(self.place.amenities, [])
+        self.assertNotIn("reviews", self.place.to_dict())
+
+    def test_update_dictionary_property(self):
+        """Check that the dictionary form refuses properties and
+        sets the other attributes
+        """
+        output = self.run_command(
+                'Place.update("{}", {{"amenities": 1, "name": "Loft"}})'
+                .format(self.place.id))
+        self.assertEqual(output, "** amenities can't be updated **")
+        self.assertEqual(self.place.name, "Loft")
+        self.assertNotIn("amenities", self.place.to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
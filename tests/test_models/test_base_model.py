@@ -5,7 +5,7 @@ This module provides test cases for the `BaseModel` class.
 import unittest
 from datetime import datetime
 from datetime import timedelta
-from models.base_model import BaseModel
+from models.base_model import BaseModel, classes
 import json
 
 
@@ -143,6 +143,70 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(base.created_at, new_instance.created_at)
         self.assertEqual(base.updated_at, new_instance.updated_at)
 
+    def test_from_dict_without_microseconds(self):
+        """
+        Check that timestamps stored without microseconds are parsed
+        """
+        base = BaseModel(id="1", created_at="2024-01-02T03:04:05",
+                         updated_at="2024-01-02T03:04:05.000006")
+        self.assertEqual(base.created_at, datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(base.updated_at,
+                         datetime(2024, 1, 2, 3, 4, 5, 6))
+
+    def test_from_dict_keeps_datetime_values(self):
+        """
+        Check that `datetime` values are not parsed again
+        """
+        now = datetime.today()
+        base = BaseModel(id="1", created_at=now, updated_at=now)
+        self.assertIs(base.created_at, now)
+        self.assertIs(base.updated_at, now)
+
+    def test_class_registry(self):
+        """
+        Check that `BaseModel` and its subclasses are registered
+        by name, unless they opt out
+        """
+        class Registered(BaseModel):
+            pass
+
+        class NotRegistered(BaseModel, register=False):
+            pass
+
+        try:
+            self.assertIs(classes["BaseModel"], BaseModel)
+            self.assertIs(classes["Registered"], Registered)
+            self.assertNotIn("NotRegistered", classes)
+        finally:
+            classes.pop("Registered", None)
+
+    def test_to_dict_memoized(self):
+        """
+        Check that `to_dict()` is computed once until an attribute
+        changes, and returns a copy each time
+        """
+        base = BaseModel()
+        first = base.to_dict()
+        first["name"] = "changed"
+        second = base.to_dict()
+        self.assertNotIn("name", second)
+        self.assertIsNot(first, second)
+        base.name = "Betty"
+        self.assertEqual(base.to_dict()["name"], "Betty")
+        self.assertNotIn("_repr_cache", base.__dict__)
+        self.assertNotIn("_repr_cache", base.to_dict())
+
+    def test_str_memoized(self):
+        """
+        Check that `__str__()` is reused until an attribute changes
+        """
+        base = BaseModel()
+        self.assertIs(str(base), str(base))
+        self.assertNotIn("Betty", str(base))
+        base.name = "Betty"
+        self.assertIn("'name': 'Betty'", str(base))
+        self.assertNotIn("_repr_cache", str(base))
+
 
 if __name__ == "__main__":
     unittest.main()
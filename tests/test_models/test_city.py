@@ -7,6 +7,7 @@ class
 import unittest
 from datetime import datetime
 from models.city import City  # Import the City class
+from models.place import Place
 
 
 class TestCity(unittest.TestCase):
@@ -61,6 +62,16 @@ class TestCity(unittest.TestCase):
 
         self.assertNotEqual(city.updated_at, initial_updated_at)
 
+    def test_places_city(self):
+        """Check that `places` lists the places of the city only
+        """
+        city = City()
+        places = [Place(), Place(), Place()]
+        places[0].city_id = city.id
+        places[2].city_id = city.id
+        self.assertEqual(city.places, [places[0], places[2]])
+        self.assertEqual(City().places, [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for the compact model classes.
+"""
+import unittest
+from datetime import datetime
+from models.compact import compact_class
+from models.place import Place
+from models.user import User
+
+
+class TestCompact(unittest.TestCase):
+    """Provides test methods for `compact_class`
+    """
+    def setUp(self):
+        """Create a compact `Place` and a plain one with the
+        same attributes
+        """
+        self.CompactPlace = compact_class(Place)
+        self.compact = self.CompactPlace()
+        self.compact.name = "Cottage"
+        self.compact.max_guest = 4
+        self.plain = Place(**self.compact.to_dict())
+
+    def test_same_class_name(self):
+        """Check that the compact class replaces `Place` transparently
+        """
+        self.assertEqual(self.CompactPlace.__name__, "Place")
+        self.assertIsInstance(self.compact, Place)
+        self.assertEqual(self.compact.to_dict()["__class__"], "Place")
+
+    def test_declared_attributes_in_slots(self):
+        """Check that declared attributes are not kept in `__dict__`
+        """
+        self.assertIn("price_by_night", self.CompactPlace.__slots__)
+        self.assertEqual(self.compact.__dict__, {})
+
+    def test_class_defaults(self):
+        """Check that unset attributes fall back to the class defaults
+        """
+        self.assertEqual(self.compact.city_id, "")
+        self.assertEqual(self.compact.amenity_ids, [])
+        with self.assertRaises(AttributeError):
+            self.compact.not_an_attribute
+
+    def test_same_representation(self):
+        """Check that `to_dict()` and `__str__` match a plain instance
+        """
+        self.assertEqual(self.compact.to_dict(), self.plain.to_dict())
+        self.assertEqual(str(self.compact), str(self.plain))
+
+    def test_overflow_attribute(self):
+        """Check that ad-hoc attributes are kept and round-trip
+        """
+        self.compact.wifi = "yes"
+        self.assertEqual(self.compact.wifi, "yes")
+        self.assertEqual(self.compact.__dict__, {})
+        copy = self.CompactPlace(**self.compact.to_dict())
+        self.assertEqual(copy.wifi, "yes")
+        self.assertEqual(copy.to_dict(), self.compact.to_dict())
+        self.assertIsInstance(copy.created_at, datetime)
+
+    def test_user(self):
+        """Check that attributes declared by other classes get slots
+        """
+        CompactUser = compact_class(User)
+        self.assertIn("email", CompactUser.__slots__)
+        self.assertNotIn("price_by_night", CompactUser.__slots__)
+
+
+if __name__ == "__main__":
+    unittest.main()
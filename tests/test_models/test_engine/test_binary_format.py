@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for `models/engine/binary_format.py`.
+"""
+import io
+import json
+import os
+import unittest
+import uuid
+from datetime import datetime
+from models.engine import binary_format
+from models.place import Place
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """Provides test methods for the binary storage format
+    """
+    def items(self, data):
+        """Decode the bytes `data`"""
+        return list(binary_format.iter_items(io.BytesIO(data)))
+
+    def test_round_trip(self):
+        """Check that every JSON value type is decoded back, with
+        the timestamps as `datetime` objects
+        """
+        obj_id = str(uuid.uuid4())
+        record = {"id": obj_id, "created_at": "2017-09-28T21:05:54.119427",
+                  "updated_at": "2017-09-28T21:05:54",
+                  "__class__": "Place", "name": "Loft é", "rooms": 4,
+                  "debt": -300, "latitude": -12.5, "flag": True,
+                  "off": False, "none": None,
+                  "amenity_ids": [str(uuid.uuid4()), "x"],
+                  "extra": {"a": [1, 2]}, "upper": obj_id.upper()}
+        items = self.items(binary_format.dumps([("Place." + obj_id,
+                                                 record)]))
+        self.assertEqual(len(items), 1)
+        key, decoded = items[0]
+        self.assertEqual(key, "Place." + obj_id)
+        expected = dict(record)
+        expected["created_at"] = datetime(2017, 9, 28, 21, 5, 54, 119427)
+        expected["updated_at"] = datetime(2017, 9, 28, 21, 5, 54)
+        self.assertEqual(decoded, expected)
+        self.assertEqual(list(decoded), list(record))
+
+    def test_long_values(self):
+        """Check the values whose name position, length or integer
+        takes more than one byte
+        """
+        record = {"attr_{}".format(i): i for i in range(200)}
+        record.update(text="é" * 300, big=2 ** 70, small=-2 ** 40,
+                      created_at="1901-01-01T00:00:00")
+        items = self.items(binary_format.dumps([("Other", record)]))
+        expected = dict(record, created_at=datetime(1901, 1, 1))
+        self.assertEqual(items, [("Other", expected)])
+
+    def test_explicit_key(self):
+        """Check that keys not made of the class and id are kept"""
+        items = self.items(binary_format.dumps([("Other", {"id": "1"})]))
+        self.assertEqual(items, [("Other", {"id": "1"})])
+
+    def test_smaller_than_json(self):
+        """Check that names are written once and UUIDs packed"""
+        objs = [Place().to_dict() for _ in range(100)]
+        items = [("Place." + d["id"], d) for d in objs]
+        data = binary_format.dumps(items)
+        self.assertEqual(self.items(data)[5][0], items[5][0])
+        self.assertLess(len(data), len(json.dumps(dict(items))) / 2)
+
+    def test_not_binary(self):
+        """Check that a JSON file is rejected"""
+        self.assertFalse(binary_format.is_binary(b"{}"))
+        with self.assertRaises(ValueError):
+            self.items(b"{}")
+
+    def test_converter(self):
+        """Check the JSON -> binary -> JSON conversion"""
+        objs = {"Place." + d["id"]: d
+                for d in (Place().to_dict() for _ in range(3))}
+        try:
+            with open("conv.json", "w") as f:
+                json.dump(objs, f)
+            binary_format.main(["", "to-binary", "conv.json", "conv.bin"])
+            with open("conv.bin", "rb") as f:
+                self.assertTrue(binary_format.is_binary(f.read()))
+            binary_format.main(["", "to-json", "conv.bin", "conv.json"])
+            with open("conv.json") as f:
+                self.assertEqual(json.load(f), objs)
+        finally:
+            for path in ("conv.json", "conv.bin"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/db_storage.py.
+
+Unittest classes:
+    TestDBStorage_instantiation
+    TestDBStorage_methods
+"""
+import os
+import sqlite3
+import models
+import unittest
+from models.base_model import BaseModel
+from models.engine.db_storage import DBStorage
+from models.user import User
+from models.state import State
+from models.place import Place
+from models.city import City
+from models.amenity import Amenity
+from models.review import Review
+
+
+class TestDBStorage_instantiation(unittest.TestCase):
+    """Unittests for testing instantiation of the DBStorage class."""
+
+    def test_DBStorage_instantiation_no_args(self):
+        self.assertEqual(type(DBStorage()), DBStorage)
+
+    def test_DBStorage_instantiation_with_arg(self):
+        with self.assertRaises(TypeError):
+            DBStorage(None)
+
+    def test_DBStorage_db_path_is_private_str(self):
+        self.assertEqual(str, type(DBStorage._DBStorage__db_path))
+
+    def testDBStorage_objects_is_private_dict(self):
+        self.assertEqual(dict, type(DBStorage._DBStorage__objects))
+
+
+class TestDBStorage_methods(unittest.TestCase):
+    """Unittests for testing methods of the DBStorage class."""
+
+    path = "test_db_storage.db"
+
+    def setUp(self):
+        self.file_storage = models.storage
+        DBStorage._DBStorage__db_path = self.path
+        DBStorage._DBStorage__connection = None
+        models.storage = DBStorage()
+        models.storage.reload()
+
+    def tearDown(self):
+        DBStorage._DBStorage__connection.close()
+        DBStorage._DBStorage__connection = None
+        DBStorage._DBStorage__objects = {}
+        models.storage = self.file_storage
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except IOError:
+                pass
+
+    def reopen(self):
+        DBStorage._DBStorage__connection.close()
+        DBStorage._DBStorage__connection = None
+        models.storage.reload()
+
+    def create_all(self):
+        objs = [cls() for cls in (BaseModel, User, State, Place, City,
+                                  Amenity, Review)]
+        for obj in objs:
+            models.storage.new(obj)
+        return objs
+
+    def test_all(self):
+        self.assertEqual(dict, type(models.storage.all()))
+
+    def test_all_with_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.all(None)
+
+    def test_new(self):
+        for obj in self.create_all():
+            key = obj.__class__.__name__ + "." + obj.id
+            self.assertIn(key, models.storage.all().keys())
+            self.assertIn(obj, models.storage.all().values())
+
+    def test_new_with_args(self):
+        with self.assertRaises(TypeError):
+            models.storage.new(BaseModel(), 1)
+
+    def test_save_writes_rows(self):
+        objs = self.create_all()
+        models.storage.save()
+        connection = sqlite3.connect(self.path)
+        for obj in objs:
+            rows = connection.execute(
+                    'SELECT id FROM "{}"'.format(obj.__class__.__name__))
+            self.assertIn((obj.id,), list(rows))
+        connection.close()
+
+    def test_save_with_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.save(None)
+
+    def test_reload(self):
+        objs = self.create_all()
+        models.storage.save()
+        self.reopen()
+        self.assertEqual(DBStorage._DBStorage__objects, {})
+        all_objs = models.storage.all()
+        for obj in objs:
+            key = obj.__class__.__name__ + "." + obj.id
+            self.assertEqual(all_objs[key].to_dict(), obj.to_dict())
+
+    def test_reload_with_arg(self):
+        with self.assertRaises(TypeError):
+            models.storage.reload(None)
+
+    def test_update_and_delete(self):
+        us = User()
+        pl = Place()
+        models.storage.save()
+        pl.name = "Cottage"
+        models.storage.delete(us)
+        models.storage.save()
+        self.reopen()
+        self.assertIsNone(models.storage.get("User", us.id))
+        self.assertEqual(models.storage.get("Place", pl.id).name, "Cottage")
+
+    def test_count(self):
+        cy = City()
+        pls = [Place() for _ in range(3)]
+        pls[0].city_id = cy.id
+        pls[0].name = "Loft"
+        self.assertEqual(models.storage.count("Place"), 3)
+        models.storage.save()
+        self.reopen()
+        self.assertEqual(models.storage.count("Place"), 3)
+        self.assertEqual(models.storage.count("Place", city_id=cy.id), 1)
+        self.assertEqual(models.storage.count("Place", name="Loft"), 1)
+        self.assertEqual(models.storage.count("Place", city_id=[cy.id]), 0)
+        self.assertEqual(models.storage.count("Nope"), 0)
+        models.storage.delete(models.storage.get("Place", pls[1].id))
+        self.assertEqual(models.storage.count("Place"), 2)
+
+    def test_stream(self):
+        pls = [Place() for _ in range(3)]
+        models.storage.save()
+        pending = Place()
+        keys = ["Place." + pl.id for pl in pls + [pending]]
+        self.assertEqual([key for key, _ in models.storage.stream("Place")],
+                         keys)
+        self.assertEqual([key for key, _ in models.storage.stream(
+            "Place", keys[0])], keys[1:])
+        self.assertEqual([key for key, _ in models.storage.stream(
+            "Place", keys[3])], [])
+        self.reopen()
+        self.assertEqual([key for key, _ in models.storage.stream(
+            None, keys[1])], keys[2:3])
+
+    def test_lookup(self):
+        cy = City()
+        pl = Place()
+        pl.city_id = cy.id
+        found = models.storage.lookup("Place", "city_id", cy.id)
+        self.assertEqual(list(found), ["Place." + pl.id])
+        models.storage.save()
+        self.reopen()
+        found = models.storage.lookup("Place", "city_id", cy.id)
+        self.assertEqual(list(found), ["Place." + pl.id])
+        self.assertEqual(list(models.storage.by_id(cy.id)),
+                         ["City." + cy.id])
+        self.assertEqual(list(models.storage.by_class("City")),
+                         ["City." + cy.id])
+
+    def test_batch_defers_save(self):
+        us = User()
+        with models.storage.batch():
+            us.save()
+            self.assertEqual(DBStorage._DBStorage__dirty,
+                             {"User." + us.id: us})
+        self.assertEqual(DBStorage._DBStorage__dirty, {})
+        self.reopen()
+        self.assertIsNotNone(models.storage.get("User", us.id))
+
+    def test_wal_mode(self):
+        mode = DBStorage._DBStorage__connection.execute(
+                "PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+
+if __name__ == "__main__":
+    unittest.main()
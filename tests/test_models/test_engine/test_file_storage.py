@@ -4,13 +4,22 @@
 Unittest classes:
     TestFileStorage_instantiation
     TestFileStorage_methods
+    TestFileStorage_journal
+    TestFileStorage_lazy
+    TestFileStorage_shared
+    TestFileStorage_sharded
+    TestFileStorage_binary
 """
 import os
 import json
+import time
 import models
 import unittest
 from datetime import datetime
+from io import StringIO
+from unittest import mock
 from models.base_model import BaseModel
+from models.engine import binary_format, record_map
 from models.engine.file_storage import FileStorage
 from models.user import User
 from models.state import State
@@ -52,10 +61,11 @@ class TestFileStorage_methods(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
-        try:
-            os.remove("file.json")
-        except IOError:
-            pass
+        for path in ("file.json", "file.json.text"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
         try:
             os.rename("tmp", "file.json")
         except IOError:
@@ -160,10 +170,709 @@ class TestFileStorage_methods(unittest.TestCase):
         self.assertIn("Amenity." + am.id, objs)
         self.assertIn("Review." + rv.id, objs)
 
+    def test_reload_interns_foreign_keys(self):
+        place_id = "".join(["place-", "1"])
+        rv1 = Review()
+        rv1.place_id = place_id
+        rv2 = Review()
+        rv2.place_id = "".join(["place-", "1"])
+        self.assertIsNot(rv1.place_id, rv2.place_id)
+        models.storage.save()
+        models.storage.reload()
+        rv1 = models.storage.get("Review", rv1.id)
+        rv2 = models.storage.get("Review", rv2.id)
+        self.assertIs(rv1.place_id, rv2.place_id)
+
+    def test_reload_property_name(self):
+        with open("file.json", "w") as f:
+            json.dump({"Place.1": {"id": "1", "amenities": "wifi",
+                                   "__class__": "Place"}}, f)
+        models.storage.reload()
+        pl = models.storage.get("Place", "1")
+        self.assertEqual(pl.amenities, [])
+        self.assertEqual(pl.to_dict()["amenities"], "wifi")
+        pl.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(json.load(f)["Place.1"]["amenities"], "wifi")
+
     def test_reload_with_arg(self):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
+    def test_setattr_marks_dirty(self):
+        us = User()
+        models.storage.save()
+        self.assertEqual(FileStorage._FileStorage__dirty, {})
+        us.first_name = "Betty"
+        self.assertIn("User." + us.id, FileStorage._FileStorage__dirty)
+
+    def test_save_reencodes_only_dirty(self):
+        us = User()
+        pl = Place()
+        models.storage.save()
+        fragments = FileStorage._FileStorage__fragments
+        user_fragment = fragments["User." + us.id]
+        place_fragment = fragments["Place." + pl.id]
+        pl.name = "Cottage"
+        models.storage.save()
+        self.assertIs(fragments["User." + us.id], user_fragment)
+        self.assertIsNot(fragments["Place." + pl.id], place_fragment)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["Place." + pl.id]["name"], "Cottage")
+        self.assertEqual(saved["User." + us.id], us.to_dict())
+
+    def test_save_drops_deleted(self):
+        us = User()
+        models.storage.save()
+        models.storage.delete(us)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("User." + us.id, json.load(f))
+        self.assertNotIn("User." + us.id,
+                         FileStorage._FileStorage__fragments)
+
+    def test_by_class(self):
+        us = User()
+        pl = Place()
+        self.assertEqual(models.storage.by_class("User"),
+                         {"User." + us.id: us})
+        models.storage.delete(us)
+        self.assertEqual(models.storage.by_class("User"), {})
+        self.assertIn("Place." + pl.id, models.storage.by_class("Place"))
+
+    def test_by_id_and_get(self):
+        rv = Review()
+        self.assertEqual(models.storage.by_id(rv.id), {"Review." + rv.id: rv})
+        self.assertIs(models.storage.get("Review", rv.id), rv)
+        self.assertIsNone(models.storage.get("Place", rv.id))
+
+    def test_lookup_foreign_key(self):
+        cy = City()
+        pl1 = Place()
+        pl2 = Place()
+        pl1.city_id = cy.id
+        self.assertEqual(models.storage.lookup("Place", "city_id", cy.id),
+                         {"Place." + pl1.id: pl1})
+        pl2.city_id = cy.id
+        pl1.city_id = "elsewhere"
+        self.assertEqual(models.storage.lookup("Place", "city_id", cy.id),
+                         {"Place." + pl2.id: pl2})
+
+    def test_count(self):
+        cy = City()
+        pls = [Place() for _ in range(3)]
+        pls[0].city_id = cy.id
+        pls[1].city_id = cy.id
+        pls[1].name = "Loft"
+        self.assertEqual(models.storage.count("Place"), 3)
+        self.assertEqual(models.storage.count("City"), 1)
+        self.assertEqual(models.storage.count("Nope"), 0)
+        self.assertEqual(models.storage.count("Place", city_id=cy.id), 2)
+        self.assertEqual(models.storage.count("Place", city_id=cy.id,
+                                              name="Loft"), 1)
+        self.assertEqual(models.storage.count("Place", name="Loft"), 1)
+        self.assertEqual(models.storage.count("Place", city_id=[cy.id]), 0)
+        pls[2].max_guest = "4"
+        self.assertEqual(models.storage.count("Place", max_guest=4), 1)
+        models.storage.delete(pls[0])
+        self.assertEqual(models.storage.count("Place"), 2)
+        self.assertEqual(models.storage.count("Place", city_id=cy.id), 1)
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(models.storage.count("Place"), 2)
+        self.assertEqual(models.storage.count("Place", city_id=cy.id), 1)
+
+    def test_sorted_index(self):
+        FileStorage._FileStorage__sorted_attributes = {
+                "Place": ("price_by_night",)}
+        FileStorage._FileStorage__indexed = None
+        try:
+            pls = [Place() for _ in range(5)]
+            for i, pl in enumerate(pls):
+                pl.price_by_night = (5 - i) * 10
+            self.assertEqual(
+                list(models.storage.select("Place", "price_by_night", "<",
+                                           30).values()), [pls[4], pls[3]])
+            self.assertEqual(
+                list(models.storage.select("Place", "price_by_night", ">=",
+                                           40).values()), [pls[1], pls[0]])
+            self.assertIsNone(models.storage.select(
+                "Place", "price_by_night", "!=", 10))
+            pls[0].price_by_night = 5
+            models.storage.delete(pls[4])
+            self.assertEqual(
+                list(models.storage.ordered("Place", "price_by_night")),
+                [pls[0], pls[3], pls[2], pls[1]])
+            pls[1].price_by_night = "free"
+            self.assertIsNone(
+                models.storage.ordered("Place", "price_by_night"))
+        finally:
+            FileStorage._FileStorage__sorted_attributes = {}
+            FileStorage._FileStorage__indexed = None
+
+    def test_search(self):
+        rvs = [Review() for _ in range(3)]
+        rvs[0].text = "Quiet flat, very quiet street"
+        rvs[1].text = "Noisy but clean"
+        pl = Place()
+        pl.name = "Quiet loft"
+        found = models.storage.search("Review", "QUIET clean")
+        self.assertEqual([obj for obj, _ in found], [rvs[0], rvs[1]])
+        self.assertGreater(found[0][1], found[1][1])
+        self.assertEqual(models.storage.search("Place", "loft"),
+                         models.storage.search("Place", "loft", limit=1))
+        self.assertIsNone(models.storage.search("User", "quiet"))
+        rvs[2].text = "Clean"
+        models.storage.delete(rvs[1])
+        rvs[0].text = "Loud"
+        self.assertEqual(models.storage.search("Review", "quiet clean"),
+                         models.storage.search("Review", "clean"))
+        self.assertEqual(
+            [obj for obj, _ in models.storage.search("Review", "clean")],
+            [rvs[2]])
+
+    def test_search_index_saved(self):
+        rv = Review()
+        rv.text = "Quiet flat"
+        models.storage.save()
+        models.storage.search("Review", "quiet")
+        models.storage._save_texts()
+        self.assertTrue(os.path.exists("file.json.text"))
+        models.storage.reload()
+        index = models.storage._indexes()["text:Review"]
+        self.assertFalse(index.pending)     # Loaded, not rebuilt
+        found = models.storage.search("Review", "quiet")
+        self.assertEqual([obj.id for obj, _ in found], [rv.id])
+        # Saved for another version of the file: rebuilt
+        time.sleep(0.01)
+        models.storage.get("Review", rv.id).text = "Loud flat"
+        models.storage.save()
+        models.storage.reload()
+        index = models.storage._indexes()["text:Review"]
+        self.assertTrue(index.pending)
+        self.assertEqual(models.storage.search("Review", "quiet"), [])
+
+    def test_stream(self):
+        us = User()
+        pls = [Place() for _ in range(4)]
+        keys = ["Place." + pl.id for pl in pls]
+        self.assertEqual([key for key, _ in models.storage.stream("Place")],
+                         keys)
+        self.assertEqual(list(models.storage.stream("Place", keys[1])),
+                         [(key, models.storage.all()[key])
+                          for key in keys[2:]])
+        every = [key for key, _ in models.storage.stream()]
+        self.assertEqual(sorted(every), sorted(keys + ["User." + us.id]))
+        after_user = [key for key, _ in models.storage.stream(
+            None, "User." + us.id)]
+        self.assertEqual(after_user, every[every.index("User." + us.id) + 1:])
+
+    def test_lookup_without_index(self):
+        st = State()
+        st.name = "Nevada"
+        self.assertEqual(models.storage.lookup("State", "name", "Nevada"),
+                         {"State." + st.id: st})
+
+    def test_save_is_atomic(self):
+        FileStorage._FileStorage__fsync = True
+        try:
+            us = User()
+            models.storage.save()
+        finally:
+            FileStorage._FileStorage__fsync = False
+        self.assertFalse(os.path.exists("file.json.tmp"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + us.id, json.load(f))
+
+    def test_commit_window_merges_saves(self):
+        FileStorage._FileStorage__commit_window = 0.2
+        FileStorage._FileStorage__last_flush = 0.0
+        try:
+            us = User()
+            us.save()
+            with open("file.json", "r") as f:
+                self.assertIn("User." + us.id, json.load(f))
+            us.first_name = "Betty"
+            us.save()
+            us.last_name = "Holberton"
+            us.save()
+            timer = FileStorage._FileStorage__commit_timer
+            self.assertIsNotNone(timer)
+            with open("file.json", "r") as f:
+                self.assertNotIn("first_name", json.load(f)["User." + us.id])
+            timer.join()
+        finally:
+            FileStorage._FileStorage__commit_window = 0
+        with open("file.json", "r") as f:
+            saved = json.load(f)["User." + us.id]
+        self.assertEqual(saved["first_name"], "Betty")
+        self.assertEqual(saved["last_name"], "Holberton")
+
+    def test_flush_interval_writes_behind(self):
+        FileStorage._FileStorage__flush_interval = 0.05
+        try:
+            us = User()
+            us.save()
+            for _ in range(100):
+                if not FileStorage._FileStorage__save_pending:
+                    break
+                time.sleep(0.01)
+            us.first_name = "Betty"
+            us.save()
+            models.storage.flush()
+            self.assertFalse(FileStorage._FileStorage__save_pending)
+        finally:
+            FileStorage._FileStorage__flush_interval = 0
+        with open("file.json", "r") as f:
+            saved = json.load(f)["User." + us.id]
+        self.assertEqual(saved["first_name"], "Betty")
+
+    def test_flush_without_pending_save(self):
+        models.storage.flush()
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_batch_defers_save(self):
+        us = User()
+        with models.storage.batch():
+            us.save()
+            with models.storage.batch():
+                us.first_name = "Betty"
+                us.save()
+            self.assertFalse(os.path.exists("file.json"))
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["User." + us.id]["first_name"], "Betty")
+
+    def test_batch_without_save(self):
+        with models.storage.batch():
+            User()
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_fragment_of_deleted_instance(self):
+        """An instance deleted while a background save encodes the
+        store is left out of that save
+        """
+        us = User()
+        key = "User." + us.id
+        models.storage.delete(us)
+        self.assertIsNone(models.storage._fragment(key, {key: us}))
+
+    def test_failed_save_keeps_changes(self):
+        us = User()
+        models.storage.save()
+        us.first_name = "Betty"
+        with mock.patch.object(FileStorage, "_write_file",
+                               side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                models.storage.save()
+        self.assertIn("User." + us.id, FileStorage._FileStorage__dirty)
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(models.storage.get("User", us.id).first_name,
+                         "Betty")
+
+    def test_background_save_reports_errors(self):
+        def fail():
+            raise OSError("disk full")
+        with mock.patch("sys.stderr", new=StringIO()) as err:
+            models.storage._flush_reporting(fail)
+        self.assertEqual(err.getvalue(), "** save failed: disk full **\n")
+
+    def test_indexes_follow_reload(self):
+        pl = Place()
+        pl.user_id = "owner"
+        models.storage.save()
+        models.storage.reload()
+        found = models.storage.lookup("Place", "user_id", "owner")
+        self.assertEqual(list(found), ["Place." + pl.id])
+        self.assertIsNot(found["Place." + pl.id], pl)
+
+
+class TestFileStorage_journal(unittest.TestCase):
+    """Unittests for the journaled save/reload mode of FileStorage."""
+
+    path = "test_journal.json"
+
+    def setUp(self):
+        FileStorage._FileStorage__journal = True
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__dirty = {}
+
+    def tearDown(self):
+        compactor = FileStorage._FileStorage__compactor
+        if compactor is not None:
+            compactor.join()
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__journal_limit = 4 * 1024 * 1024
+        FileStorage._FileStorage__objects = {}
+        for suffix in ("", ".journal", ".journal.compacting", ".tmp"):
+            try:
+                os.remove(self.path + suffix)
+            except IOError:
+                pass
+
+    def journal_lines(self):
+        with open(self.path + ".journal", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends_only_changes(self):
+        us = User()
+        pl = Place()
+        models.storage.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(len(self.journal_lines()), 2)
+        pl.name = "Cottage"
+        pl.save()
+        lines = self.journal_lines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[-1]["op"], "put")
+        self.assertEqual(lines[-1]["key"], "Place." + pl.id)
+        self.assertEqual(lines[-1]["obj"]["name"], "Cottage")
+
+    def test_reload_replays_journal(self):
+        us = User()
+        pl = Place()
+        models.storage.save()
+        pl.name = "Cottage"
+        pl.save()
+        models.storage.delete(us)
+        models.storage.save()
+        self.assertEqual(self.journal_lines()[-1]["op"], "del")
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertNotIn("User." + us.id, objs)
+        self.assertIn("Place." + pl.id, objs)
+        self.assertEqual(objs["Place." + pl.id].name, "Cottage")
+
+    def test_compaction(self):
+        FileStorage._FileStorage__journal_limit = 0
+        us = User()
+        rv = Review()
+        models.storage.save()
+        FileStorage._FileStorage__compactor.join()
+        self.assertFalse(os.path.exists(self.path + ".journal"))
+        self.assertFalse(os.path.exists(self.path + ".journal.compacting"))
+        with open(self.path, "r") as f:
+            snapshot = json.load(f)
+        self.assertIn("User." + us.id, snapshot)
+        self.assertIn("Review." + rv.id, snapshot)
+        models.storage.reload()
+        self.assertIn("Review." + rv.id, models.storage.all())
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Unittests for the lazy reload mode of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.pl = Place()
+        self.pl.city_id = "city"
+        self.rv = Review()
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__objects = {}
+        for path in ("file.json", "file.json.keys"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_reload_decodes_nothing(self):
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(len(FileStorage._FileStorage__raw), 2)
+        self.assertEqual(models.storage.count("Place"), 1)
+        self.assertIn("Place.city_id", FileStorage._FileStorage__unindexed)
+        models.storage.lookup("Place", "city_id", "city")
+        self.assertNotIn("Place.city_id",
+                         FileStorage._FileStorage__unindexed)
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["Place." + self.pl.id])
+
+    def test_reload_reads_saved_keys(self):
+        self.assertTrue(os.path.exists("file.json.keys"))
+        with mock.patch.object(record_map, "_scan") as scan:
+            models.storage.reload()
+        scan.assert_not_called()
+        self.assertIsNotNone(models.storage.get("Review", self.rv.id))
+
+    def test_save_keeps_keys(self):
+        models.storage.get("Place", self.pl.id).name = "Café ∑"
+        Review().save()
+        with mock.patch.object(record_map, "_scan") as scan:
+            models.storage.reload()
+        scan.assert_not_called()
+        self.assertEqual(models.storage.count("Review"), 2)
+        self.assertEqual(models.storage.get("Place", self.pl.id).name,
+                         "Café ∑")
+        self.assertEqual(models.storage.get("Review", self.rv.id).id,
+                         self.rv.id)
+
+    def test_stale_keys_are_rebuilt(self):
+        with open("file.json", "w") as f:
+            json.dump({"User.1": {"id": "1", "__class__": "User",
+                                  "first_name": "Zoé"}}, f, indent=4)
+        models.storage.reload()
+        self.assertEqual(list(FileStorage._FileStorage__raw), ["User.1"])
+        self.assertEqual(models.storage.get("User", "1").first_name, "Zoé")
+
+    def test_reload_property_name(self):
+        with open("file.json", "w") as f:
+            json.dump({"Place.1": {"id": "1", "reviews": 5,
+                                   "__class__": "Place"}}, f)
+        models.storage.reload()
+        pl = models.storage.get("Place", "1")
+        self.assertEqual(pl.reviews, [])
+        self.assertEqual(pl.to_dict()["reviews"], 5)
+
+    def test_get_materializes_one(self):
+        pl = models.storage.get("Place", self.pl.id)
+        self.assertIsInstance(pl, Place)
+        self.assertEqual(pl.city_id, "city")
+        self.assertIs(models.storage.get("Place", self.pl.id), pl)
+        self.assertEqual(list(FileStorage._FileStorage__objects),
+                         ["Place." + self.pl.id])
+
+    def test_indexes_cover_raw(self):
+        found = models.storage.lookup("Place", "city_id", "city")
+        self.assertEqual(list(found), ["Place." + self.pl.id])
+        self.assertEqual(list(models.storage.by_id(self.rv.id)),
+                         ["Review." + self.rv.id])
+
+    def test_all_materializes_everything(self):
+        objs = models.storage.all()
+        self.assertIsInstance(objs["Review." + self.rv.id], Review)
+        self.assertEqual(FileStorage._FileStorage__raw, {})
+
+    def test_save_keeps_raw_instances(self):
+        models.storage.get("Place", self.pl.id).name = "Cottage"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["Place." + self.pl.id]["name"], "Cottage")
+        self.assertEqual(saved["Review." + self.rv.id]["id"], self.rv.id)
+
+
+class TestFileStorage_shared(unittest.TestCase):
+    """Unittests for the multi-process (shared file) mode of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__shared = True
+        FileStorage._FileStorage__objects = {}
+        self.us = User()
+        self.pl = Place()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.records = json.load(f)
+
+    def tearDown(self):
+        FileStorage._FileStorage__shared = False
+        FileStorage._FileStorage__objects = {}
+        for path in ("file.json", "file.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def write_as_other_process(self):
+        with open("file.json.tmp", "w") as f:
+            json.dump(self.records, f)
+        os.replace("file.json.tmp", "file.json")
+
+    def test_refresh_without_change(self):
+        models.storage.refresh()
+        self.assertIs(models.storage.get("User", self.us.id), self.us)
+
+    def test_refresh_merges_other_process(self):
+        self.records["User." + self.us.id]["first_name"] = "Betty"
+        del self.records["Place." + self.pl.id]
+        st = State()
+        self.records["State." + st.id] = st.to_dict()
+        models.storage.delete(st)
+        FileStorage._FileStorage__dirty = {}
+        self.write_as_other_process()
+        models.storage.refresh()
+        self.assertEqual(models.storage.get("User", self.us.id).first_name,
+                         "Betty")
+        self.assertIsNone(models.storage.get("Place", self.pl.id))
+        self.assertEqual(list(models.storage.by_class("State")),
+                         ["State." + st.id])
+
+    def test_save_keeps_both_changes(self):
+        self.records["User." + self.us.id]["first_name"] = "Betty"
+        self.write_as_other_process()
+        self.pl.name = "Cottage"
+        self.pl.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["User." + self.us.id]["first_name"], "Betty")
+        self.assertEqual(saved["Place." + self.pl.id]["name"], "Cottage")
+
+    def test_unsaved_change_wins(self):
+        self.records["Place." + self.pl.id]["name"] = "Theirs"
+        self.write_as_other_process()
+        self.pl.name = "Ours"
+        models.storage.refresh()
+        self.assertIs(models.storage.get("Place", self.pl.id), self.pl)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["Place." + self.pl.id]["name"], "Ours")
+
+
+class TestFileStorage_sharded(unittest.TestCase):
+    """Unittests for the sharded (one file per class) mode of FileStorage."""
+
+    shard_dir = "test_shards"
+
+    def setUp(self):
+        FileStorage._FileStorage__shard_dir = self.shard_dir
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__loaded_shards = set()
+        self.us = User()
+        self.pl = Place()
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__shard_dir = None
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__objects = {}
+        for name in os.listdir(self.shard_dir):
+            os.remove(os.path.join(self.shard_dir, name))
+        os.rmdir(self.shard_dir)
+
+    def shard(self, class_name):
+        with open(os.path.join(self.shard_dir, class_name + ".json")) as f:
+            return json.load(f)
+
+    def test_one_file_per_class(self):
+        self.assertEqual(sorted(os.listdir(self.shard_dir)),
+                         ["Place.json", "User.json"])
+        self.assertEqual(list(self.shard("User")), ["User." + self.us.id])
+        self.assertEqual(list(self.shard("Place")), ["Place." + self.pl.id])
+
+    def test_save_rewrites_changed_classes_only(self):
+        user_stat = os.stat(os.path.join(self.shard_dir, "User.json"))
+        self.pl.name = "Cottage"
+        self.pl.save()
+        self.assertEqual(self.shard("Place")["Place." + self.pl.id]["name"],
+                         "Cottage")
+        self.assertEqual(
+                os.stat(os.path.join(self.shard_dir, "User.json")).st_ino,
+                user_stat.st_ino)
+
+    def test_delete_rewrites_shard(self):
+        models.storage.delete(self.us)
+        models.storage.save()
+        self.assertEqual(self.shard("User"), {})
+
+    def test_reload(self):
+        models.storage.reload()
+        self.assertIn("User." + self.us.id, models.storage.all())
+        self.assertIn("Place." + self.pl.id, models.storage.all())
+
+    def test_lazy_reload_reads_shards_on_demand(self):
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__loaded_shards, set())
+        self.assertIsNotNone(models.storage.get("Place", self.pl.id))
+        self.assertEqual(FileStorage._FileStorage__loaded_shards, {"Place"})
+        us = User()
+        us.save()
+        self.assertEqual(sorted(self.shard("User")),
+                         sorted(["User." + self.us.id, "User." + us.id]))
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """Unittests for FileStorage stores in the binary format."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__format = "binary"
+        self.pl = Place()
+        self.pl.city_id = "city"
+        self.rv = Review()
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__objects = {}
+        for path in ("file.json", "file.json.keys"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_save_writes_binary(self):
+        with open("file.json", "rb") as f:
+            self.assertTrue(binary_format.is_binary(f.read()))
+
+    def test_reload(self):
+        models.storage.reload()
+        pl = models.storage.get("Place", self.pl.id)
+        self.assertEqual(pl.city_id, "city")
+        self.assertEqual(pl.created_at, self.pl.created_at)
+        self.assertIn("Review." + self.rv.id, models.storage.all())
+
+    def test_lazy_reload(self):
+        FileStorage._FileStorage__lazy = True
+        models.storage.reload()
+        self.assertEqual(list(models.storage.lookup("Place", "city_id",
+                                                    "city")),
+                         ["Place." + self.pl.id])
+        models.storage.get("Review", self.rv.id).text = "Nice"
+        models.storage.save()
+        models.storage.reload()
+        self.assertEqual(models.storage.get("Review", self.rv.id).text,
+                         "Nice")
+        self.assertEqual(models.storage.get("Place", self.pl.id).city_id,
+                         "city")
+
+    def test_existing_store_keeps_format(self):
+        FileStorage._FileStorage__format = "json"
+        models.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__format, "binary")
+        FileStorage._FileStorage__objects = {}
+        with open("file.json", "w") as f:
+            f.write("{}")
+        FileStorage._FileStorage__format = "binary"
+        models.storage.reload()
+        self.assertEqual(FileStorage._FileStorage__format, "json")
+
 
 if __name__ == "__main__":
     unittest.main()
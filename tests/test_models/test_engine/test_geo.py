@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/geo.py.
+
+Unittest classes:
+    TestGeo_distance
+    TestGeo_search
+"""
+import os
+import models
+import unittest
+from models.engine import geo
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+class TestGeo_distance(unittest.TestCase):
+    """Unittests for distances and bounding boxes."""
+
+    def test_distance(self):
+        self.assertAlmostEqual(geo.distance(48.8566, 2.3522, 51.5074,
+                                            -0.1278), 343.5, delta=1)
+        self.assertEqual(geo.distance(10, 20, 10, 20), 0)
+
+    def test_bounds(self):
+        south, west, north, east = geo.bounds(48.8566, 2.3522, 10)
+        self.assertAlmostEqual(north - 48.8566, 0.0899, places=3)
+        self.assertLess(west, 2.3522 - 0.0899)
+        self.assertGreater(east, 2.3522 + 0.0899)
+
+    def test_bounds_meridian_and_pole(self):
+        south, west, north, east = geo.bounds(-17, 179.9, 50)
+        self.assertGreater(west, east)
+        self.assertEqual(geo.bounds(89.9, 0, 50)[1:4:2], (-180.0, 180.0))
+
+
+class TestGeo_search(unittest.TestCase):
+    """Unittests for location searches against FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.pls = {}
+        for name, latitude, longitude in (
+                ("Louvre", 48.8606, 2.3376), ("Eiffel", 48.8584, 2.2945),
+                ("Versailles", 48.8049, 2.1204), ("Lyon", 45.764, 4.8357),
+                ("Fiji", -17.7134, 178.065), ("Samoa", -13.759, -172.1)):
+            pl = Place()
+            pl.name = name
+            pl.latitude = latitude
+            pl.longitude = longitude
+            self.pls[name] = pl
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def near(self, *args, **kwargs):
+        return [obj.name for obj, _ in geo.near("Place", *args, **kwargs)]
+
+    def test_near(self):
+        self.assertEqual(self.near(48.8566, 2.3522, 5), ["Louvre", "Eiffel"])
+        self.assertEqual(self.near(48.8566, 2.3522, 20),
+                         ["Louvre", "Eiffel", "Versailles"])
+        self.assertEqual(self.near(48.8566, 2.3522, 20, limit=1),
+                         ["Louvre"])
+        self.assertEqual(self.near(0, 0, 10), [])
+
+    def test_near_across_meridian(self):
+        self.assertEqual(self.near(-15, 180, 1000), ["Fiji", "Samoa"])
+
+    def test_within(self):
+        names = {obj.name for obj in geo.within("Place", 45, 2, 49, 5)}
+        self.assertEqual(names, {"Louvre", "Eiffel", "Versailles", "Lyon"})
+        names = {obj.name for obj in geo.within("Place", -20, 170, -10,
+                                                -170)}
+        self.assertEqual(names, {"Fiji", "Samoa"})
+
+    def test_moved(self):
+        """A Place moved through its attributes (as `update` does, with
+        strings) is found at its new location only
+        """
+        self.pls["Lyon"].latitude = "48.857"
+        self.pls["Lyon"].longitude = "2.352"
+        self.assertEqual(self.near(48.8566, 2.3522, 1), ["Lyon"])
+        self.assertEqual(self.near(45.764, 4.8357, 10), [])
+        models.storage.delete(self.pls["Louvre"])
+        self.assertEqual(self.near(48.8566, 2.3522, 5), ["Lyon", "Eiffel"])
+
+    def test_scan_without_index(self):
+        """Engines without a spatial index are scanned"""
+        class Unindexed:
+            def box(self, *args):
+                return None
+
+            def stream(self, class_name):
+                return models.storage.stream(class_name)
+        self.assertEqual(
+            [obj.name for obj, _ in geo.near("Place", 48.8566, 2.3522, 5,
+                                             storage=Unindexed())],
+            ["Louvre", "Eiffel"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            geo.near("Place", 91, 0, 1)
+        with self.assertRaises(ValueError):
+            geo.near("Place", 0, 0, -1)
+        with self.assertRaises(ValueError):
+            list(geo.within("Place", 10, 0, 5, 1))
+        with self.assertRaises(ValueError):
+            geo.near("Place", 1, 2, 3, limit="a")
+        with self.assertRaises(ValueError):
+            list(geo.within("Place", 0, 0, 1, 1, limit=1.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for the `Index`, `SortedIndex`,
+`GridIndex` and `TextIndex` classes.
+"""
+import unittest
+from models.engine.index import (GridIndex, Index, SortedIndex,
+                                 TextIndex, tokenize)
+from models.city import City
+
+
+class TestIndex(unittest.TestCase):
+    """Provides test methods for the `Index` class
+    """
+    def setUp(self):
+        """Create an index of cities by `state_id`
+        """
+        self.index = Index(lambda obj: obj.state_id)
+        self.city = City()
+        self.city.state_id = "CA"
+        self.key = "City." + self.city.id
+
+    def test_add_and_get(self):
+        """Check that an added instance is found by its value
+        """
+        self.index.add(self.key, self.city)
+        self.assertEqual(list(self.index.get("CA")), [self.key])
+        self.assertEqual(list(self.index.get("NV")), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_add_changed_value(self):
+        """Check that re-adding an instance moves it to its new value
+        """
+        self.index.add(self.key, self.city)
+        self.city.state_id = "NV"
+        self.index.add(self.key, self.city)
+        self.assertEqual(list(self.index.get("CA")), [])
+        self.assertEqual(list(self.index.get("NV")), [self.key])
+        self.assertEqual(len(self.index), 1)
+
+    def test_remove(self):
+        """Check that a removed instance is no longer found
+        """
+        self.index.add(self.key, self.city)
+        self.index.remove(self.key)
+        self.index.remove(self.key)
+        self.assertEqual(list(self.index.get("CA")), [])
+        self.assertEqual(len(self.index), 0)
+
+    def test_extend(self):
+        """Check that instances indexed by key alone are found, moved
+        and removed like added ones
+        """
+        self.index.extend("CA", ["City.1", self.key])
+        self.assertEqual(list(self.index.get("CA")), ["City.1", self.key])
+        self.assertEqual(list(self.index.values()), ["CA"])
+        self.city.state_id = "NV"
+        self.index.add(self.key, self.city)
+        self.index.remove("City.1")
+        self.assertEqual(list(self.index.get("CA")), [])
+        self.assertEqual(list(self.index.values()), ["NV"])
+        self.assertEqual(len(self.index), 1)
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Provides test methods for the `SortedIndex` class
+    """
+    def setUp(self):
+        """Index prices given as a dictionary `key -> price`
+        """
+        self.prices = {"P.{}".format(i): price for i, price in
+                       enumerate([50, 10, 30, 10, "20", None, "x", 40])}
+        self.index = SortedIndex(lambda key: self.prices[key])
+        for key in self.prices:
+            self.index.add(key, key)
+
+    def test_non_numbers_left_out(self):
+        """Check that only numeric values (or numeric strings) are
+        indexed
+        """
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index.range(), ["P.1", "P.3", "P.4", "P.2",
+                                              "P.7", "P.0"])
+
+    def test_range(self):
+        """Check the bounds, inclusive or not, and the order
+        """
+        self.assertEqual(self.index.range(10, 30), ["P.1", "P.3", "P.4",
+                                                    "P.2"])
+        self.assertEqual(self.index.range(10, 30, low_inclusive=False,
+                                          high_inclusive=False), ["P.4"])
+        self.assertEqual(self.index.range(low=40), ["P.7", "P.0"])
+        self.assertEqual(self.index.range(high=10, reverse=True),
+                         ["P.3", "P.1"])
+        self.assertEqual(self.index.get(10), ["P.1", "P.3"])
+        self.assertEqual(self.index.range(60, 70), [])
+
+    def test_scan(self):
+        """Check that scanning yields every key in order, across chunks
+        """
+        self.assertEqual(list(self.index.scan(chunk=4)), self.index.range())
+        self.assertEqual(list(self.index.scan(reverse=True, chunk=4)),
+                         self.index.range(reverse=True))
+
+    def test_changes_after_sorting(self):
+        """Check that changes made once the index is sorted are
+        inserted in place
+        """
+        self.index.range()
+        self.prices["P.0"] = 5
+        self.index.add("P.0", "P.0")
+        self.prices["P.8"] = 35
+        self.index.add("P.8", "P.8")
+        self.index.remove("P.3")
+        self.index.remove("P.3")
+        self.prices["P.7"] = None
+        self.index.add("P.7", "P.7")
+        self.assertEqual(self.index.range(), ["P.0", "P.1", "P.4", "P.2",
+                                              "P.8"])
+        self.assertEqual(len(self.index), 5)
+
+
+class TestGridIndex(unittest.TestCase):
+    """Provides test methods for the `GridIndex` class
+    """
+    def setUp(self):
+        """Index locations given as a dictionary `key -> (lat, lon)`
+        """
+        self.locations = {
+                "Paris": (48.8566, 2.3522), "Versailles": (48.8049, 2.1204),
+                "Lyon": ("45.764", "4.8357"), "Fiji": (-17.7134, 178.065),
+                "Samoa": (-13.759, -172.1046), "Nowhere": (None, None),
+                "Bad": (95, 10)}
+        self.index = GridIndex(lambda key: self.locations[key])
+        for key in self.locations:
+            self.index.add(key, key)
+
+    def test_invalid_left_out(self):
+        """Check that only valid coordinates are indexed
+        """
+        self.assertEqual(len(self.index), 5)
+
+    def test_box(self):
+        """Check the bounds and the boxes crossing the 180th meridian
+        """
+        self.assertEqual(sorted(self.index.box(48, 2, 49, 3)),
+                         ["Paris", "Versailles"])
+        self.assertEqual(self.index.box(48.85, 2.3, 48.86, 2.36),
+                         ["Paris"])
+        self.assertEqual(sorted(self.index.box(-20, 170, -10, -170)),
+                         ["Fiji", "Samoa"])
+        self.assertEqual(len(self.index.box(-90, -180, 90, 180)), 5)
+        self.assertEqual(self.index.box(0, 0, 1, 1), [])
+
+    def test_changes(self):
+        """Check that moved and removed instances are re-indexed
+        """
+        self.locations["Paris"] = (45.75, 4.85)
+        self.index.add("Paris", "Paris")
+        self.index.remove("Lyon")
+        self.index.remove("Lyon")
+        self.assertEqual(self.index.box(45, 4, 46, 5), ["Paris"])
+        self.assertEqual(self.index.box(48, 2, 49, 3), ["Versailles"])
+        self.assertEqual(len(self.index), 4)
+
+
+class TestTextIndex(unittest.TestCase):
+    """Provides test methods for the `TextIndex` class
+    """
+    def setUp(self):
+        """Index texts given as a dictionary `key -> text`
+        """
+        self.texts = {
+                "R.0": "A quiet flat in a quiet street",
+                "R.1": "Clean, but the street is noisy",
+                "R.2": "Quiet? Not really. Clean though, and cheap",
+                "R.3": None}
+        self.index = TextIndex(lambda key: self.texts[key])
+        for key in self.texts:
+            self.index.add(key, key)
+
+    def keys(self, text, limit=None):
+        return [key for key, _ in self.index.search(text, limit)]
+
+    def test_tokenize(self):
+        """Check that words are case-folded, without punctuation and
+        stopwords
+        """
+        self.assertEqual(tokenize("The QUIET flat, in Paris!"),
+                         ["quiet", "flat", "paris"])
+
+    def test_search(self):
+        """Check the matches and their ranking
+        """
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.keys("quiet"), ["R.0", "R.2"])
+        self.assertEqual(self.keys("quiet cheap"), ["R.2", "R.0"])
+        self.assertEqual(self.keys("quiet cheap", limit=1), ["R.2"])
+        self.assertEqual(self.keys("the"), [])
+        self.assertEqual(self.keys("castle"), [])
+
+    def test_changes(self):
+        """Check that changed and removed texts are re-indexed
+        """
+        self.index.search("quiet")
+        self.texts["R.0"] = "Noisy"
+        self.index.add("R.0", "R.0")
+        self.index.remove("R.2")
+        self.index.remove("R.2")
+        self.assertEqual(self.keys("quiet"), [])
+        self.assertEqual(sorted(self.keys("noisy")), ["R.0", "R.1"])
+        self.assertEqual(len(self.index), 2)
+
+    def test_dump_load(self):
+        """Check that a loaded index answers as the dumped one
+        """
+        copy = TextIndex(self.index.value_of)
+        copy.load(self.index.dump())
+        self.assertEqual(copy.search("quiet street"),
+                         self.index.search("quiet street"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for `models/engine/json_stream.py`.
+"""
+import io
+import json
+import re
+import unittest
+from models.engine.json_stream import iter_items, iter_spans
+
+
+class TestIterItems(unittest.TestCase):
+    """Provides test methods for the `iter_items` function
+    """
+    def items(self, text, chunk_size=3):
+        """Decode `text` with a tiny chunk size so that every
+        value is split across reads
+        """
+        return list(iter_items(io.StringIO(text), chunk_size))
+
+    def test_empty_object(self):
+        """Check that an empty object yields nothing
+        """
+        self.assertEqual(self.items("{}"), [])
+        self.assertEqual(self.items("  { }\n"), [])
+
+    def test_matches_json_load(self):
+        """Check that the members are the ones `json.load` returns,
+        in the same order
+        """
+        data = {
+                "User.1": {"id": "1", "name": "Betty \"B\" {x}",
+                           "__class__": "User"},
+                "Place.2": {"id": "2", "price_by_night": 12345,
+                            "latitude": -12.5, "amenity_ids": ["a", "b"]},
+                "Number": 1234567890
+                }
+        for text in (json.dumps(data), json.dumps(data, indent=4)):
+            self.assertEqual(self.items(text), list(data.items()))
+            self.assertEqual(self.items(text, 1 << 16), list(data.items()))
+
+    def test_shared_names(self):
+        """Check that the records of the stream share their attribute
+        names instead of owning copies
+        """
+        text = json.dumps({"User.{}".format(n): {"first_name": "x"}
+                           for n in range(3)})
+        (_, first), (_, second), _ = self.items(text)
+        self.assertIs(next(iter(first)), next(iter(second)))
+
+    def test_spans(self):
+        """Check that the spans are the UTF-8 byte positions of the
+        members in the file, whatever the chunk size
+        """
+        data = b'{"a": {"name": "caf\xc3\xa9"},\r\n "b": [1, 2] }'
+        for chunk_size in (1, 4, 1 << 16):
+            f = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8",
+                                 newline="")
+            spans = [data[start:end] for _, _, start, end
+                     in iter_spans(f, chunk_size)]
+            self.assertEqual(spans, ['"a": {"name": "café"}'.encode(),
+                                     b'"b": [1, 2]'])
+
+    def test_invalid_document(self):
+        """Check that malformed documents raise ValueError, with the
+        parse error as message
+        """
+        for text, message in (
+                ("[]", "Expecting '{' at the start"),
+                ('{"a" 1}', "Expecting ':' after key 'a'"),
+                ('{"a": 1 "b": 2}', "Expecting ',' or '}' after 'a'"),
+                ('{"a": {"id": "1"}', "Expecting ',' or '}' after 'a'"),
+                ('{"a": {', "Expecting property name"),
+                ("", "Expecting '{' at the start")):
+            with self.assertRaisesRegex(ValueError, re.escape(message)):
+                self.items(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
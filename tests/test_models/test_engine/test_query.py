@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/query.py.
+
+Unittest classes:
+    TestQuery_parse
+    TestQuery_where
+"""
+import os
+import models
+import unittest
+from models.engine import query
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.place import Place
+
+
+class TestQuery_parse(unittest.TestCase):
+    """Unittests for parsing query conditions."""
+
+    def test_predicates(self):
+        self.assertEqual(
+            query.parse("price_by_night < 100 and max_guest >= 4 and "
+                        "city_id in ['a', 'b'] and 3 <= number_rooms and "
+                        "'x' in amenity_ids and name != 'Loft'"),
+            [("price_by_night", "<", 100), ("max_guest", ">=", 4),
+             ("city_id", "in", ["a", "b"]), ("number_rooms", ">=", 3),
+             ("amenity_ids", "contains", "x"), ("name", "!=", "Loft")])
+
+    def test_empty(self):
+        self.assertEqual(query.parse(""), [])
+
+    def test_invalid(self):
+        for condition in ("a or b", "a < b", "f(x) == 1", "1 < a < 3",
+                          "a ==", "a == b.c"):
+            with self.assertRaises(ValueError):
+                query.parse(condition)
+
+
+class TestQuery_where(unittest.TestCase):
+    """Unittests for running queries against FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.cy = City()
+        self.pls = []
+        for i in range(10):
+            pl = Place()
+            pl.name = "p{}".format(i)
+            pl.price_by_night = i * 20
+            pl.max_guest = i % 5
+            if i % 2:
+                pl.city_id = self.cy.id
+            self.pls.append(pl)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def names(self, *args, **kwargs):
+        return [obj.name for obj in query.where("Place", *args, **kwargs)]
+
+    def test_range_scan(self):
+        self.assertEqual(self.names("price_by_night < 100 and max_guest >= 2"),
+                         ["p2", "p3", "p4"])
+
+    def test_index_and_sort(self):
+        self.assertEqual(
+            self.names("city_id == '{}'".format(self.cy.id),
+                       order_by="-price_by_night", limit=2),
+            ["p9", "p7"])
+        self.assertIsNotNone(
+            models.storage.select("Place", "city_id", "==", self.cy.id))
+        self.assertIsNone(
+            models.storage.select("Place", "name", "==", "p1"))
+
+    def test_in_and_id(self):
+        self.assertEqual(self.names("name in ['p1', 'p2']"), ["p1", "p2"])
+        self.assertEqual(
+            self.names("id in {!r}".format([self.pls[4].id, self.cy.id])),
+            ["p4"])
+
+    def test_multiple_sort_keys(self):
+        self.assertEqual(self.names("", order_by="max_guest,-name",
+                                    limit=4), ["p5", "p0", "p6", "p1"])
+
+    def test_projection(self):
+        rows = list(query.where("Place", "max_guest == 4",
+                                fields="name,price_by_night"))
+        self.assertEqual(rows, [{"name": "p4", "price_by_night": 80},
+                                {"name": "p9", "price_by_night": 180}])
+
+    def test_sorted_index(self):
+        FileStorage._FileStorage__sorted_attributes = {
+                "Place": ("price_by_night",)}
+        FileStorage._FileStorage__indexed = None
+        try:
+            self.assertEqual(self.names("price_by_night >= 140"),
+                             ["p7", "p8", "p9"])
+            self.assertEqual(self.names("max_guest > 2",
+                                        order_by="-price_by_night",
+                                        limit=3), ["p9", "p8", "p4"])
+            self.assertEqual(
+                    self.names("price_by_night > 40 and "
+                               "price_by_night <= 100"), ["p3", "p4", "p5"])
+        finally:
+            FileStorage._FileStorage__sorted_attributes = {}
+            FileStorage._FileStorage__indexed = None
+
+    def test_numbers_stored_as_strings(self):
+        self.pls[0].price_by_night = "500"
+        self.assertEqual(self.names("price_by_night > 400"), ["p0"])
+        self.assertEqual(self.names("price_by_night == 500"), ["p0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+This module provides test cases for `models/engine/record_map.py`.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+from models.engine import binary_format, record_map
+
+
+class TestRecordMap(unittest.TestCase):
+    """Provides test methods for the `RecordMap` class and the
+    saved positions of the records
+    """
+    records = {"User.1": {"id": "1", "first_name": "Zoé",
+                          "__class__": "User"},
+               "Place.2": {"id": "2", "city_id": "c", "__class__": "Place"},
+               "User.3": {"id": "3", "__class__": "User"}}
+
+    def setUp(self):
+        """Write the records as JSON"""
+        self.path = "record_map_test.json"
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=2, ensure_ascii=False)
+
+    def tearDown(self):
+        """Remove the files"""
+        for path in (self.path, self.path + ".keys"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def decoded(self, mapped):
+        """Return `{key: record}` for every record of `mapped`"""
+        found = {}
+        for class_name, (first, keys) in mapped.classes.items():
+            for number, key in enumerate(keys, first):
+                self.assertEqual(mapped.record(number)[0], key)
+                found[key] = mapped.record(number)[1]
+        return found
+
+    def test_scan_json(self):
+        """Check that a JSON file is mapped by class, and that every
+        record decodes to what is stored
+        """
+        mapped = record_map.open_map(self.path)
+        self.assertEqual(mapped.format, "json")
+        self.assertEqual({name: keys for name, (_, keys)
+                          in mapped.classes.items()},
+                         {"User": ["User.1", "User.3"], "Place": ["Place.2"]})
+        self.assertEqual(self.decoded(mapped), self.records)
+
+    def test_scan_binary(self):
+        """Check that binary records decode and are copied as stored"""
+        with open(self.path, "wb") as f:
+            f.write(binary_format.dumps(self.records.items()))
+        mapped = record_map.open_map(self.path)
+        self.assertEqual(mapped.format, "binary")
+        self.assertEqual(self.decoded(mapped), self.records)
+        encoder = binary_format.Encoder(mapped.names)
+        self.assertEqual(mapped.fragment(0),
+                         encoder.record("User.1", self.records["User.1"]))
+
+    def test_saved_keys(self):
+        """Check that the positions are read back instead of scanning
+        the file again, unless the file changed
+        """
+        record_map.open_map(self.path)
+        with mock.patch.object(record_map, "_scan") as scan:
+            mapped = record_map.open_map(self.path)
+        scan.assert_not_called()
+        self.assertEqual(self.decoded(mapped), self.records)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"User.1": self.records["User.1"]}, f)
+        mapped = record_map.open_map(self.path)
+        self.assertEqual(self.decoded(mapped),
+                         {"User.1": self.records["User.1"]})
+
+    def test_save_keys(self):
+        """Check that the positions saved for a written file match it"""
+        members = ["{}: {}".format(json.dumps(key),
+                                   json.dumps(record, ensure_ascii=False))
+                   for key, record in self.records.items()]
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{" + ", ".join(members) + "}")
+        stat = os.stat(self.path)
+        record_map.save_keys(self.path,
+                             (stat.st_ino, stat.st_mtime_ns, stat.st_size),
+                             "json", [], zip(self.records, members))
+        with mock.patch.object(record_map, "_scan") as scan:
+            mapped = record_map.open_map(self.path)
+        scan.assert_not_called()
+        self.assertEqual(self.decoded(mapped), self.records)
+        self.assertEqual(mapped.fragment(0), members[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/snapshot.py.
+
+Unittest classes:
+    TestSnapshotStorage_instantiation
+    TestSnapshotStorage_methods
+"""
+import os
+import models
+import unittest
+from models.engine import snapshot
+from models.engine.file_storage import FileStorage
+from models.engine.snapshot import SnapshotStorage
+from models.city import City
+from models.place import Place
+from models.user import User
+
+
+class TestSnapshotStorage_instantiation(unittest.TestCase):
+    """Unittests for testing instantiation of the SnapshotStorage class."""
+
+    def test_SnapshotStorage_instantiation_no_args(self):
+        self.assertEqual(type(SnapshotStorage()), SnapshotStorage)
+
+    def test_SnapshotStorage_instantiation_with_arg(self):
+        with self.assertRaises(TypeError):
+            SnapshotStorage(None)
+
+    def test_SnapshotStorage_path_is_private_str(self):
+        self.assertEqual(str, type(SnapshotStorage._SnapshotStorage__path))
+
+
+class TestSnapshotStorage_methods(unittest.TestCase):
+    """Unittests for testing methods of the SnapshotStorage class."""
+
+    path = "test_snapshot.snapshot"
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place() for _ in range(20)]
+        self.places[3].city_id = "city"
+        self.places[3].name = "Loft"
+        self.us = User()
+        models.storage.save()
+        snapshot.main(["", "file.json", self.path])
+        self.file_storage = models.storage
+        SnapshotStorage._SnapshotStorage__path = self.path
+        models.storage = SnapshotStorage()
+        models.storage.reload()
+
+    def tearDown(self):
+        models.storage = self.file_storage
+        SnapshotStorage._SnapshotStorage__snapshot = None
+        FileStorage._FileStorage__objects = {}
+        for path in ("file.json", self.path):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_get(self):
+        pl = models.storage.get("Place", self.places[3].id)
+        self.assertIsInstance(pl, Place)
+        self.assertEqual(pl.name, "Loft")
+        self.assertEqual(pl.created_at, self.places[3].created_at)
+        self.assertEqual(pl.to_dict(), self.places[3].to_dict())
+        self.assertIsNone(models.storage.get("Place", self.us.id))
+        self.assertIsNone(models.storage.get("Place", "x" * 100))
+        self.assertIsNone(models.storage.get("City", self.us.id))
+
+    def test_every_instance_found(self):
+        for pl in self.places:
+            self.assertEqual(models.storage.get("Place", pl.id).id, pl.id)
+
+    def test_by_class(self):
+        places = models.storage.by_class("Place")
+        self.assertEqual(len(places), 20)
+        self.assertEqual(sorted(places),
+                         sorted("Place." + pl.id for pl in self.places))
+        self.assertEqual(places["Place." + self.places[0].id].id,
+                         self.places[0].id)
+        self.assertEqual(len(models.storage.by_class("City")), 0)
+        self.assertEqual(len(models.storage.by_class("Nope")), 0)
+
+    def test_all_by_id_lookup(self):
+        self.assertEqual(len(models.storage.all()), 21)
+        self.assertIn("User." + self.us.id, models.storage.all())
+        self.assertEqual(list(models.storage.by_id(self.us.id)),
+                         ["User." + self.us.id])
+        self.assertEqual(list(models.storage.lookup("Place", "city_id",
+                                                    "city")),
+                         ["Place." + self.places[3].id])
+
+    def test_count(self):
+        self.assertEqual(models.storage.count("Place"), 20)
+        self.assertEqual(models.storage.count("City"), 0)
+        self.assertEqual(models.storage.count("Place", city_id="city"), 1)
+
+    def test_stream(self):
+        keys = [key for key, _ in models.storage.stream("Place")]
+        self.assertEqual(keys, sorted("Place." + pl.id for pl in self.places))
+        self.assertEqual([key for key, _ in models.storage.stream(
+            "Place", keys[9])], keys[10:])
+        self.assertEqual([key for key, _ in models.storage.stream(
+            None, keys[-1])], ["User." + self.us.id])
+
+    def test_read_only(self):
+        with self.assertRaises(PermissionError):
+            City()
+        pl = models.storage.get("Place", self.places[0].id)
+        pl.name = "x"
+        with self.assertRaises(PermissionError):
+            pl.save()
+        self.assertNotEqual(
+                models.storage.get("Place", self.places[0].id).name, "x")
+        with self.assertRaises(PermissionError):
+            models.storage.save()
+
+    def test_refresh_maps_new_snapshot(self):
+        stamp = os.stat(self.path)
+        models.storage.refresh()
+        snap = SnapshotStorage._SnapshotStorage__snapshot
+        self.assertIsNotNone(snap)
+        snapshot.write_snapshot(self.path, [])
+        os.utime(self.path, ns=(stamp.st_atime_ns,
+                                stamp.st_mtime_ns + 1000))
+        models.storage.refresh()
+        self.assertIsNot(SnapshotStorage._SnapshotStorage__snapshot, snap)
+        self.assertEqual(len(models.storage.all()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/text_search.py.
+
+Unittest classes:
+    TestTextSearch
+"""
+import os
+import models
+import unittest
+from models.engine import text_search
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+class TestTextSearch(unittest.TestCase):
+    """Unittests for searching texts against FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.pls = []
+        for name, description in (("Quiet loft", "Near the park"),
+                                  ("Studio", "A quiet studio, quiet area"),
+                                  ("Villa", None)):
+            pl = Place()
+            pl.name = name
+            if description is not None:
+                pl.description = description
+            self.pls.append(pl)
+        self.rv = Review()
+        self.rv.text = "Quiet indeed"
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def names(self, *args, **kwargs):
+        return [obj.name for obj, _ in
+                text_search.search("Place", *args, **kwargs)]
+
+    def test_search(self):
+        self.assertEqual(self.names("quiet"), ["Studio", "Quiet loft"])
+        self.assertEqual(self.names("quiet park", limit=1), ["Quiet loft"])
+        self.assertEqual(self.names("villa"), ["Villa"])
+        found = text_search.search("Review", "quiet")
+        self.assertEqual([obj for obj, _ in found], [self.rv])
+
+    def test_scan_without_index(self):
+        """Engines without a text index are scanned"""
+        class Unindexed:
+            def search(self, *args):
+                return None
+
+            def stream(self, class_name):
+                return models.storage.stream(class_name)
+        self.assertEqual(
+            [obj.name for obj, _ in text_search.search(
+                "Place", "quiet park", storage=Unindexed())],
+            self.names("quiet park"))
+
+    def test_no_text(self):
+        with self.assertRaises(ValueError):
+            text_search.search("User", "quiet")
+
+
+if __name__ == "__main__":
+    unittest.main()
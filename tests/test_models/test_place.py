@@ -8,6 +8,8 @@ from models.place import Place
 from models.city import City
 from models.user import User
 from models.amenity import Amenity
+from models.review import Review
+import models
 
 
 class TestPlace(unittest.TestCase):
@@ -187,6 +189,27 @@ class TestPlace(unittest.TestCase):
         self.assertEqual(self.my_place.number_bathrooms,
                          new_instance.number_bathrooms)
 
+    def test_reviews_place(self):
+        """Check that `reviews` lists the reviews of the place only
+        """
+        place = Place()
+        reviews = [Review(), Review()]
+        reviews[1].place_id = place.id
+        self.assertEqual(place.reviews, [reviews[1]])
+
+    def test_amenities_place(self):
+        """Check that `amenities` follows `amenity_ids` and skips
+        deleted amenities
+        """
+        place = Place()
+        amenities = [Amenity(), Amenity()]
+        self.assertEqual(place.amenities, [])
+        place.amenity_ids = [amenities[1].id, amenities[0].id]
+        self.assertEqual(place.amenities, [amenities[1], amenities[0]])
+        models.storage.delete(amenities[1])
+        self.assertEqual(place.amenities, [amenities[0]])
+        self.assertNotIn("amenities", place.to_dict())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,9 @@ import unittest
 from datetime import datetime
 from datetime import timedelta
 from models.state import State
+from models.city import City
+from models.place import Place
+from models.review import Review
 import json
 
 
@@ -133,6 +136,24 @@ class TestState(unittest.TestCase):
         self.assertEqual(self.my_state.created_at, new_instance.created_at)
         self.assertEqual(self.my_state.updated_at, new_instance.updated_at)
 
+    def test_cities_state(self):
+        """Check that `cities` follows the changes of `state_id`, and
+        that reviews are reached through cities and places
+        """
+        cities = [City(), City()]
+        for city in cities:
+            city.state_id = self.my_state.id
+        self.assertEqual(self.my_state.cities, cities)
+        cities[0].state_id = "elsewhere"
+        self.assertEqual(self.my_state.cities, [cities[1]])
+        place = Place()
+        place.city_id = cities[1].id
+        review = Review()
+        review.place_id = place.id
+        self.assertEqual([rv for city in self.my_state.cities
+                          for pl in city.places for rv in pl.reviews],
+                         [review])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,7 @@ import unittest
 from datetime import datetime
 from datetime import timedelta
 from models.user import User
+from models.place import Place
 import json
 
 
@@ -153,6 +154,14 @@ class TestUser(unittest.TestCase):
         self.assertEqual(self.user.created_at, new_instance.created_at)
         self.assertEqual(self.user.updated_at, new_instance.updated_at)
 
+    def test_places_user(self):
+        """Check that `places` lists the places owned by the user
+        """
+        place = Place()
+        place.user_id = self.user.id
+        Place()
+        self.assertEqual(self.user.places, [place])
+
 
 if __name__ == "__main__":
     unittest.main()